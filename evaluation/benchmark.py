@@ -0,0 +1,193 @@
+"""
+Throughput benchmark for the dbgbench framework.
+
+For each grep subject, it measures
+  - container start time (cold: a new container, warm: leased from the pool),
+  - per-sample latency of execute_sample,
+  - throughput of execute_samples for several batch sizes, and
+  - the cost of the oracle on a batch of results,
+and writes the results to a JSON file, so that runs of different releases can be compared.
+
+    python evaluation/benchmark.py --backend fake --output bench.json
+
+`--backend docker` runs the real containers and `--backend local` prebuilt subjects on the host
+(see LocalContainer). `--backend fake` needs neither: it runs the real runner script and protocol,
+but answers every sample with a canned output (see fake_runner.py).
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dbgbench.framework import pool, tracing
+from dbgbench.framework.local import LocalContainer
+from dbgbench.framework.pool import ContainerPool
+from dbgbench.resources import get_grep_samples
+from dbgbench.subjects import Grep3c3bdace, Grep5fa8c7c9, Grep7aa698d3, Grep3220317a, Grepc96b0f2c
+
+SUBJECTS = [Grep3c3bdace, Grep5fa8c7c9, Grep7aa698d3, Grep3220317a, Grepc96b0f2c]
+FAKE_RUNNER = Path(__file__).parent / "fake_runner.py"
+
+
+class FakeContainer(LocalContainer):
+    """
+    A local container that needs no built subjects: runner scripts are started through fake_runner.py.
+    """
+
+    backend = "fake"
+
+    def __init__(self, subject: str, container_name: str):
+        super().__init__(subject, container_name, subjects_dir=Path("/nonexistent"))
+
+    def _wrap(self, cmd: list[str]) -> list[str]:
+        if 2 <= len(cmd) and "python3" == cmd[0] and str(cmd[1]).endswith(".py"):
+            return [sys.executable, str(FAKE_RUNNER)] + cmd[1:]
+        return cmd
+
+    def popen(self, cmd, cwd=None):
+        return super().popen(self._wrap(cmd), cwd)
+
+    async def popen_async(self, cmd, cwd=None):
+        return await super().popen_async(self._wrap(cmd), cwd)
+
+
+pool.backends[FakeContainer.backend] = FakeContainer
+
+
+def distinct_inputs(count: int) -> list[str]:
+    """
+    Return `count` different grep inputs, derived from the shipped samples by varying the printf payload.
+    """
+    samples = [sample for sample in get_grep_samples() if sample.startswith("printf '")]
+    return [samples[i % len(samples)].replace("printf '", f"printf '{i} ", 1) for i in range(count)]
+
+
+def summarize(seconds: list[float]) -> dict:
+    ordered = sorted(seconds)
+    return {
+        "count": len(ordered),
+        "mean": statistics.fmean(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1],
+    }
+
+
+def bench_subject(bug_type, backend: str, latency_samples: int, batch_sizes: list[int], repeat: int) -> dict:
+    result = {}
+    container_pool = ContainerPool()
+    try:
+        # container start
+        bug = bug_type(pool=container_pool, backend=backend)
+        start = time.perf_counter()
+        bug.container()
+        result["cold_start"] = time.perf_counter() - start
+        bug.tear_down()
+        start = time.perf_counter()
+        bug.container()
+        result["warm_start"] = time.perf_counter() - start
+
+        # the first batch also starts the persistent runner
+        start = time.perf_counter()
+        bug.execute_samples(distinct_inputs(1))
+        result["runner_start"] = time.perf_counter() - start
+
+        # per-sample latency
+        latencies = []
+        for inp in distinct_inputs(latency_samples):
+            start = time.perf_counter()
+            bug.execute_sample(inp)
+            latencies.append(time.perf_counter() - start)
+        result["sample_latency"] = summarize(latencies)
+
+        # batch throughput
+        result["batches"] = {}
+        for size in batch_sizes:
+            durations = []
+            for _ in range(repeat):
+                inputs = distinct_inputs(size)
+                start = time.perf_counter()
+                bug.execute_samples(inputs)
+                durations.append(time.perf_counter() - start)
+            best = min(durations)
+            result["batches"][str(size)] = {
+                "seconds": summarize(durations),
+                "samples_per_second": size / best if best > 0 else None,
+            }
+
+        # oracle cost, without execution
+        inputs = distinct_inputs(max(batch_sizes))
+        rows = bug._runner(bug.container()).execute(bug.subject(), inputs)
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            bug._oracle.apply_batch(bug, rows)
+            durations.append(time.perf_counter() - start)
+        result["oracle"] = {
+            "name": bug._oracle.name(),
+            "rows": len(rows),
+            "seconds_per_row": min(durations) / len(rows),
+        }
+        bug.tear_down()
+    finally:
+        container_pool.clear()
+    return result
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=Path(__file__).parent,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", choices=sorted(pool.backends), default="fake")
+    parser.add_argument("--subjects", nargs="*", help="bug ids, e.g. grep.3c3bdace; all grep bugs by default")
+    parser.add_argument("--latency-samples", type=int, default=20)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="JSON file; benchmark-<backend>-<time>.json by default")
+    parser.add_argument("--trace", type=Path, help="also write a Chrome trace of all pipeline phases to this file")
+    args = parser.parse_args(argv)
+
+    now = datetime.now(timezone.utc)
+    report = {
+        "time": now.isoformat(),
+        "revision": git_revision(),
+        "backend": args.backend,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "latency_samples": args.latency_samples,
+            "batch_sizes": args.batch_sizes,
+            "repeat": args.repeat,
+        },
+        "subjects": {},
+    }
+    tracer = tracing.enable() if args.trace else None
+    for bug_type in SUBJECTS:
+        bug_id = bug_type().subject()
+        if args.subjects and bug_id not in args.subjects:
+            continue
+        print(f"Benchmarking {bug_id} ({args.backend})...", file=sys.stderr)
+        report["subjects"][bug_id] = bench_subject(bug_type, args.backend, args.latency_samples,
+                                                   args.batch_sizes, args.repeat)
+    if tracer is not None:
+        tracing.disable()
+        tracer.export_chrome_trace(args.trace)
+
+    output = args.output or Path(f"benchmark-{args.backend}-{now.strftime('%Y%m%dT%H%M%S')}.json")
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Wrote {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""
+Stand-in for a sample runner, used by benchmark.py with `--backend fake`.
+
+Usage: python3 fake_runner.py <runner script> <runner arguments...>
+
+It runs the given runner script with its real protocol handling, input extraction, and worker pool,
+but replaces the execution of the subject by a canned answer after FAKE_SAMPLE_SECONDS (default: 0).
+If FAKE_SAMPLE_LOG is set, the command line of every executed sample is appended to that file.
+This measures the framework overhead without Docker or built subjects.
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+
+def fake_execute_sample(identifier, cli):
+    time.sleep(float(os.environ.get("FAKE_SAMPLE_SECONDS", "0")))
+    if "FAKE_SAMPLE_LOG" in os.environ:
+        with open(os.environ["FAKE_SAMPLE_LOG"], "a") as log:
+            log.write(cli.replace("\n", " ") + "\n")
+    return 0, b"fake output\n\nGrep terminated\n", False
+
+
+if __name__ == "__main__":
+    runner = Path(sys.argv[1])
+    sys.path.insert(0, str(runner.parent))
+    module = __import__(runner.stem)
+    module.execute_sample = fake_execute_sample
+    sys.exit(module.runner_main(module.run, [str(runner)] + sys.argv[2:], sys.stdin.buffer, sys.stdout.buffer))
@@ -1,12 +1,13 @@
 import random
 from typing import Collection
 
+from dbgbench.framework import external_exec
+from dbgbench.framework.adapter import BatchingOracle
 from dbgbench.framework.oraclesresult import OracleResult
-from dbgbench.resources import get_grep_grammar_path, get_grep_samples
+from dbgbench.resources import get_grep_grammar, get_grep_samples
 from dbgbench.framework.util import escape_non_ascii_utf8
 from dbgbench.subjects import Grep3c3bdace, Grepc96b0f2c
 
-from fandangoLearner.interface.fandango import parse
 from fandangoLearner.data.input import FandangoInput
 from fandangoLearner.learner import FandangoLearner
 from fandangoLearner.logger import LoggerLevel
@@ -14,13 +15,7 @@ from fandangoLearner.resources.patterns import Pattern
 from fandangoLearner.refinement.mutation import MutationFuzzer
 
 
-def generate_more_failing(bug_type_, grammar_, samples_: Collection[FandangoInput]) -> tuple[list[FandangoInput], list[FandangoInput]]:
-
-    def bug_oracle(inp):
-        with bug_type_() as bug:
-            res = bug.execute_sample(str(inp))
-        return res
-
+def generate_more_failing(bug_oracle, grammar_, samples_: Collection[FandangoInput]) -> tuple[list[FandangoInput], list[FandangoInput]]:
     seeds = [inp for inp in samples_ if inp.oracle == OracleResult.FAILING]
 
     mutation_fuzzer = MutationFuzzer(grammar_, seed_inputs=seeds, oracle=bug_oracle)
@@ -28,24 +23,23 @@ def generate_more_failing(bug_type_, grammar_, samples_: Collection[FandangoInpu
     positive_inputs = []
     negative_inputs = []
 
-    while len(positive_inputs) < 5:
-        try:
-            inp = next(mutation_fuzzer.run(yield_negatives=True))
-            if inp.oracle == OracleResult.FAILING:
-                positive_inputs.append(inp)
-            else:
-                negative_inputs.append(inp)
-        except StopIteration:
-            break
+    for inp in mutation_fuzzer.run(yield_negatives=True):
+        if inp.oracle == OracleResult.FAILING:
+            positive_inputs.append(inp)
+            if len(positive_inputs) >= 5:
+                break
+        else:
+            negative_inputs.append(inp)
 
     return positive_inputs, negative_inputs
 
 if __name__ == "__main__":
+    # start docker commands from a small helper, not from the learner once it has grown
+    external_exec.setup()
     random.seed(1)
     bug_type = Grepc96b0f2c
 
-    grep_grammar = get_grep_grammar_path()
-    grammar, _ = parse(grep_grammar)
+    grammar, _ = get_grep_grammar()
 
     samples = get_grep_samples()
     with bug_type() as bug:
@@ -60,7 +54,8 @@ if __name__ == "__main__":
         FandangoInput.from_str(grammar, inp, oracle) for inp, oracle in test_inputs
     }
 
-    pos_inputs, neg_inputs = generate_more_failing(bug_type, grammar, initial_inputs)
+    with BatchingOracle(bug_type()) as bug_oracle:
+        pos_inputs, neg_inputs = generate_more_failing(bug_oracle, grammar, initial_inputs)
     print(f"Positive inputs: {len(pos_inputs)}")
     print(f"Negative inputs: {len(neg_inputs)}")
     initial_inputs.update(pos_inputs)
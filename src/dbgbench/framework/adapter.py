@@ -0,0 +1,154 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Iterable
+
+from dbgbench.framework.base import BaseDbgbenchBug
+from dbgbench.framework.oraclesresult import OracleResult
+
+
+class BatchingOracle:
+    """
+    Oracle for learners and fuzzers that keeps one bug environment open across calls.
+
+    Inputs can be evaluated one at a time (`oracle(inp)`, as FandangoLearner-like consumers expect),
+    as futures (`submit`), or as a whole batch (`evaluate`). Either way, pending inputs are collected
+    into micro-batches of up to `max_batch` inputs. A batch is dispatched as soon as it is full, or
+    `max_latency` seconds after its first input arrived, so no input waits longer than that for its batch.
+    It is dispatched at once if nothing else is queued and no other caller could add to it: every input
+    whose result is still outstanding is in the batch, and no evaluate() is still submitting.
+    A learner that calls the oracle sequentially thus pays no batching latency, while callers that
+    submit() from several threads and wait for their futures share batches like `oracle(inp)` callers do.
+    Once closed, the oracle accepts no more inputs.
+
+    Inputs may be anything whose str() is a command line, e.g. FandangoInputs.
+
+        with BatchingOracle(Grep3c3bdace()) as oracle:
+            result = oracle(inp)
+    """
+
+    def __init__(self, bug: BaseDbgbenchBug, max_batch: int = 64, max_latency: float = 0.05):
+        """
+        :param bug: the bug to run the inputs on; it is set up on first use and torn down by close().
+        :param max_batch: maximum number of inputs executed as one batch.
+        :param max_latency: seconds a batch waits for more inputs after its first one arrived.
+        """
+        self._bug = bug
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self._closed = False
+        # submitted inputs without a result yet, and evaluate() calls still submitting their inputs
+        self._outstanding = 0
+        self._submitting = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __call__(self, inp) -> OracleResult:
+        return self.submit(inp).result()
+
+    def submit(self, inp) -> Future:
+        """
+        Queue an input for the next batch and return a future for its OracleResult.
+        :raise RuntimeError: if the oracle is closed.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The oracle is closed.")
+            # counted before the input is queued, so that a batch waits for a caller on its way
+            self._outstanding += 1
+        future = Future()
+        future.add_done_callback(self._resolved)
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._work, name="dbgbench-oracle", daemon=True)
+                    self._worker.start()
+                self._queue.put((str(inp), future))
+        if closed:
+            # closed meanwhile; cancelling resolves the future, which takes the lock
+            future.cancel()
+            raise RuntimeError("The oracle is closed.")
+        return future
+
+    def evaluate(self, inputs: Iterable) -> list[OracleResult]:
+        """
+        Evaluate all inputs and return their results in order.
+        """
+        with self._lock:
+            self._submitting += 1
+        try:
+            futures = [self.submit(inp) for inp in inputs]
+        finally:
+            with self._lock:
+                self._submitting -= 1
+        return [future.result() for future in futures]
+
+    def close(self) -> None:
+        """
+        Finish all pending inputs and tear down the bug environment.
+        """
+        with self._lock:
+            self._closed = True
+            worker = self._worker
+            self._worker = None
+            if worker is not None:
+                self._queue.put(None)
+        if worker is not None:
+            worker.join()
+        self._bug.tear_down()
+
+    def _work(self) -> None:
+        closing = False
+        while not closing:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_latency
+            while len(batch) < self.max_batch:
+                if self._queue.empty() and self._complete(batch):
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+            self._run(batch)
+
+    def _complete(self, batch: list) -> bool:
+        """
+        :return whether no other caller could add an input to the batch
+        """
+        with self._lock:
+            return 0 == self._submitting and self._outstanding <= len(batch)
+
+    def _resolved(self, future: Future) -> None:
+        with self._lock:
+            self._outstanding -= 1
+
+    def _run(self, batch: list[tuple[str, Future]]) -> None:
+        live = [(inp, future) for inp, future in batch if future.set_running_or_notify_cancel()]
+        if 0 == len(live):
+            return
+        try:
+            results = self._bug.execute_samples([inp for inp, _ in live])
+        except BaseException as ex:
+            logging.exception(f"Could not execute a batch of {len(live)} inputs.")
+            for _, future in live:
+                future.set_exception(ex)
+            return
+        for (_, future), (_, oracle) in zip(live, results):
+            future.set_result(oracle)
@@ -1,15 +1,40 @@
-import tempfile
+import asyncio
+import contextlib
+import itertools
 import logging
-import pandas as pd
 import subprocess
-import io
+import os
+import shutil
+import sys
+import threading
+import time
 import uuid
 from abc import ABC, abstractmethod
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Iterable, Iterator
 
+from dbgbench.framework import helpers, tracing
 from dbgbench.framework.bug_class import Bug
-from dbgbench.framework.docker import DBGBenchContainer
+from dbgbench.framework.cache import ResultCache, fingerprint
+from dbgbench.framework.daemon import AsyncRunnerDaemon, RunnerDaemon, runner_options
+from dbgbench.framework.docker import AbstractContainer, runner_support_files
+from dbgbench.framework.helpers import cli_timeout, read_records, with_timeout
 from dbgbench.framework.oraclesresult import OracleResult
+from dbgbench.framework.pool import ContainerPool, default_pool
+from dbgbench.framework.results import ResultBatch
+from dbgbench.framework.timeouts import TIMEOUT_RETURN_CODE, Timeouts
+
+
+def link_or_copy(src: Path, dst: Path) -> None:
+    """
+    Hard-link src to dst, or copy it if they are on different file systems.
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
 
 
 class BaseDbgbenchBug(Bug, ABC):
@@ -17,11 +42,31 @@ class BaseDbgbenchBug(Bug, ABC):
     Base class for a dbgbench bug/subject running inside a Docker container.
     """
 
-    def __init__(self, bug_id, oracle):
+    def __init__(self, bug_id, oracle, pool: ContainerPool = None, cache: ResultCache = None,
+                 backend: str = "docker", timeouts: Timeouts = None, output_limit: int = None):
+        """
+        :param pool: the container pool to lease from; the process-wide pool by default.
+        :param cache: if given, oracle results are looked up there before anything is executed.
+        :param backend: "docker" runs the samples in dbgbench containers,
+                        "local" runs prebuilt subjects directly on the host (see LocalContainer).
+        :param timeouts: if given, the `timeout` of each cli is rewritten to run in two tiers
+                         (see Timeouts and calibrate_timeouts()); otherwise clis run as they are.
+        :param output_limit: bytes of output after which a sample is killed and its row marked as truncated;
+                             the runner's default (1 MiB) if None. Truncated samples neither finished nor
+                             timed out, so no oracle can judge them: their result is UNDEFINED (and not cached).
+        """
         super().__init__()
         self._bug_id = bug_id
         self._oracle = oracle
+        self._pool = pool
+        self._cache = cache
+        self._backend = backend
+        self.timeouts = timeouts
+        self._output_limit = output_limit
+        self._cache_version = None
         self._container = None
+        # concurrent executions (e.g. of execute_samples_async) must lease a single container
+        self._container_lock = threading.Lock()
 
     def subject(self) -> str:
         return self._bug_id
@@ -32,7 +77,7 @@ class BaseDbgbenchBug(Bug, ABC):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.tear_down()
+        self.tear_down(discard=exc_type is not None)
 
     def grammar_file(self) -> Path:
         """:return the path to the grammar to be used."""
@@ -43,41 +88,94 @@ class BaseDbgbenchBug(Bug, ABC):
         raise NotImplementedError()
 
     @abstractmethod
-    def _setup_container_files(self):
+    def benign_samples(self) -> list[str]:
+        """:return distinct command lines that do not trigger any bug of this subject, e.g. for calibration."""
+        pass
+
+    @abstractmethod
+    def _setup_container_files(self, container: AbstractContainer):
         """
         Hook for child classes to copy specialized runner scripts or
-        other needed files into the container once it's started.
+        other needed files into the given container once it's started.
         """
         pass
 
     @abstractmethod
     def _sample_runner_path(self) -> str:
         """
-        Return the path to the script that will execute samples in the container.
+        Return the path to the script that will execute samples in the container,
+        relative to the container's root directory.
+        """
+        pass
+
+    def _runner_in(self, container: AbstractContainer) -> str:
+        """
+        Return the absolute path of the runner script in the given container.
+        """
+        return str(container.container_root_dir("root") / self._sample_runner_path())
+
+    @abstractmethod
+    def _local_runner_path(self) -> Path:
+        """
+        Return the path to the runner script on the host.
         """
         pass
 
-    def tear_down(self):
+    def _code_version(self) -> str:
         """
-        Cleanup after ourselves.
+        Fingerprint of the code that determines an oracle result; cache entries of other versions are ignored.
+        """
+        if self._cache_version is None:
+            oracle_module = sys.modules[type(self._oracle).__module__]
+            # the framework modules shipped to the runners: input extraction (printf.py), output capture, ...
+            support = {Path(helpers.__file__).parent / name for name in runner_support_files}
+            self._cache_version = fingerprint(sorted(support | {Path(oracle_module.__file__), self._local_runner_path()}))
+        version = self._cache_version
+        if self.timeouts is not None:
+            # whether an input hangs depends on the full timeout
+            version = f"{version}-timeout{self.timeouts.full:g}"
+        if self._output_limit is not None:
+            version = f"{version}-output{self._output_limit}"
+        return version
+
+    def tear_down(self, discard: bool = False):
+        """
+        Cleanup after ourselves: hand the container back to the pool.
+        If `discard` is set (e.g. after an error), the container is stopped instead of reused.
         """
         logging.info("Tearing down Dbgbench bug environment.")
-        if self._container is not None:
-            self._container.stop()
+        with self._container_lock:
+            container, self._container = self._container, None
+        if container is not None:
+            self._stop_async_runners(container)
+            self._container_pool().release(container, discard=discard)
+
+    def _container_pool(self) -> ContainerPool:
+        if self._pool is None:
+            return default_pool()
+        return self._pool
+
+    def _lease_container(self) -> AbstractContainer:
+        """
+        Lease a running container for this bug's subject and make sure the runner is installed.
+        """
+        # By convention, remove .suffix from subject
+        short_subject = self._bug_id.split('.', maxsplit=1)[0]
+        container = self._container_pool().lease(short_subject, self._backend)
+        if self._sample_runner_path() not in container.installed:
+            self._setup_container_files(container)
+            container.installed.add(self._sample_runner_path())
+        return container
 
     def _ensure_container_started(self):
         """
-        Create and start the container if not already done.
+        Lease a running container from the pool if not already done.
         """
-        if self._container is None:
-            # By convention, remove .suffix from subject
-            short_subject = self._bug_id.split('.', maxsplit=1)[0]
-            name = f"dbgbench_{self._bug_id}_{uuid.uuid4()}"
-            self._container = DBGBenchContainer(short_subject, name)
-            self._container.start(username="root")
-            self._setup_container_files()
+        with self._container_lock:
+            if self._container is None:
+                self._container = self._lease_container()
 
-    def container(self) -> DBGBenchContainer:
+    def container(self) -> AbstractContainer:
         """
         Access the underlying container object.
         """
@@ -93,84 +191,385 @@ class BaseDbgbenchBug(Bug, ABC):
             if file.is_file():
                 files.append(file)
 
-        if 0 != len(list(sample_dir.iterdir())):
-            self.container().copy_into(files, self.container().container_root_dir("root") / "alhazen_samples")
-            return self._execute_samples_in_container()
-        return self._empty_result_df()
+        if 0 == len(files):
+            return ResultBatch()
+
+        # Every batch gets its own directory, so that batches in a reused container do not mix
+        container = self.container()
+        batch = f"samples_{uuid.uuid4().hex}"
+        if container.shared_dir() is not None:
+            with tracing.span("link_samples", samples=len(files)):
+                target = container.shared_dir() / batch
+                target.mkdir()
+                for file in files:
+                    link_or_copy(file, target / file.name)
+            container_dir = container.container_shared_dir() / batch
+        else:
+            container_dir = container.container_root_dir("root") / "alhazen_samples" / batch
+            container.copy_into(files, container_dir)
+        return self._execute_samples_in_container(container_dir)
+
+    def execute_samples(self, test_inputs: list[str], shards: int = 1):
+        """
+        Execute the inputs and return a list of (input, OracleResult) pairs in input order.
+        Cached results are reused, and duplicate inputs are executed only once.
+        With `shards` > 1, the inputs are split into that many contiguous chunks which run
+        concurrently in separate containers of the same subject. The cores of the host are split
+        between the shards, so each shard's runner executes fewer samples in parallel.
+        """
+        with tracing.span("execute_samples", bug=self.subject(), samples=len(test_inputs)) as span:
+            results = self._cached_results(test_inputs)
+            missing = list(dict.fromkeys(inp for inp in test_inputs if inp not in results))
+            span.set(executed=len(missing))
+            if 0 != len(missing):
+                fresh = self._run_samples(missing, shards)
+                results.update(fresh)
+                self._cache_results(fresh)
+            return [(inp, results[inp]) for inp in test_inputs]
+
+    async def execute_samples_async(self, test_inputs: list[str], shards: int = 1):
+        """
+        The asyncio version of execute_samples. The event loop stays free while the samples run,
+        so a caller can generate the next inputs or drive other bugs in the meantime.
+        Cancelling it kills the runners involved; their containers remain usable.
+        """
+        with tracing.span("execute_samples_async", bug=self.subject(), samples=len(test_inputs)) as span:
+            results = await asyncio.to_thread(self._cached_results, test_inputs)
+            missing = list(dict.fromkeys(inp for inp in test_inputs if inp not in results))
+            span.set(executed=len(missing))
+            if 0 != len(missing):
+                fresh = await self._run_samples_async(missing, shards)
+                results.update(fresh)
+                await asyncio.to_thread(self._cache_results, fresh)
+            return [(inp, results[inp]) for inp in test_inputs]
+
+    def execute_samples_iter(self, test_inputs: Iterable[str], chunk_size: int = 100,
+                             stop_after_failing: int = None, budget: float = None
+                             ) -> Iterator[tuple[str, OracleResult]]:
+        """
+        Execute the inputs and yield (input, OracleResult) pairs as the samples finish, i.e.,
+        not necessarily in input order. Cached results are yielded first.
+
+        The inputs are consumed lazily, `chunk_size` at a time, so even unbounded input streams
+        run in constant memory. Iteration ends after `stop_after_failing` failing results, or
+        after the first sample that finishes once `budget` seconds have passed. Samples of the
+        current chunk that are still running are then abandoned.
+        """
+        deadline = None if budget is None else time.monotonic() + budget
+        failing = 0
+        inputs = iter(test_inputs)
+        while True:
+            chunk = list(itertools.islice(inputs, chunk_size))
+            if 0 == len(chunk):
+                return
+            with contextlib.closing(self._stream_chunk(chunk)) as results:
+                for inp, oracle in results:
+                    yield inp, oracle
+                    if oracle == OracleResult.FAILING:
+                        failing += 1
+                        if stop_after_failing is not None and failing >= stop_after_failing:
+                            return
+                    if deadline is not None and time.monotonic() >= deadline:
+                        return
+
+    def _stream_chunk(self, chunk: list[str]) -> Iterator[tuple[str, OracleResult]]:
+        counts = Counter(chunk)
+        cached = self._cached_results(chunk)
+        for inp, oracle in cached.items():
+            for _ in range(counts[inp]):
+                yield inp, oracle
+        missing = [inp for inp in counts if inp not in cached]
+        if 0 == len(missing):
+            return
+        self._ensure_container_started()
+        fresh = []
+        if self.timeouts is None:
+            rows = self._runner(self._container).stream(self.subject(), missing)
+        else:
+            rows = self._stream_tiered(missing)
+        try:
+            # closing the rows right away releases the runner when the caller stops early
+            with contextlib.closing(rows):
+                for idx, row in rows:
+                    oracle = self._apply_oracle(ResultBatch.from_records([row]))[0]
+                    fresh.append((missing[idx], oracle))
+                    for _ in range(counts[missing[idx]]):
+                        yield missing[idx], oracle
+        finally:
+            # also keep what finished before the caller stopped
+            self._cache_results(fresh)
+
+    def _stream_tiered(self, clis: list[str]) -> Iterator[tuple[int, dict]]:
+        """
+        Like RunnerDaemon.stream, but in two tiers: the samples that hit the short timeout
+        run again with the full one after all others, and are yielded last.
+        """
+        hung = []
+        with contextlib.closing(self._runner(self._container).stream(self.subject(), self._short_clis(clis))) as rows:
+            for idx, row in rows:
+                if self.timeouts.tiered() and TIMEOUT_RETURN_CODE == row["return code"] \
+                        and cli_timeout(clis[idx]) is not None:
+                    hung.append(idx)
+                    continue
+                row["line"] = clis[idx]
+                yield idx, row
+        if 0 == len(hung):
+            return
+        with contextlib.closing(self._runner(self._container).stream(
+                self.subject(), [self._full_cli(clis[idx]) for idx in hung])) as rows:
+            for idx, row in rows:
+                row["line"] = clis[hung[idx]]
+                yield hung[idx], row
+
+    def _cached_results(self, test_inputs: list[str]) -> dict[str, OracleResult]:
+        if self._cache is None:
+            return {}
+        with tracing.span("cache_get", samples=len(test_inputs)) as span:
+            found = self._cache.get_many(self.subject(), self._oracle.name(), self._code_version(), test_inputs)
+            span.set(hits=len(found))
+        return found
+
+    def _cache_results(self, fresh: list[tuple[str, OracleResult]]) -> None:
+        if self._cache is not None:
+            # undefined results usually mean the run itself went wrong; try again next time
+            with tracing.span("cache_put", samples=len(fresh)):
+                self._cache.put_many(self.subject(), self._oracle.name(), self._code_version(),
+                                     [(inp, oracle) for inp, oracle in fresh if oracle != OracleResult.UNDEFINED])
 
+    @staticmethod
+    def _shard_chunks(test_inputs: list[str], shards: int) -> list[list[str]]:
+        shards = max(1, min(shards, len(test_inputs)))
+        bounds = [len(test_inputs) * i // shards for i in range(shards + 1)]
+        return [test_inputs[bounds[i]:bounds[i + 1]] for i in range(shards)]
+
+    @staticmethod
+    def _shard_workers(shards: int) -> int:
+        """
+        Return the number of workers for the runner of each of `shards` shards; 0 (all cores) for a single one.
+        The containers share the host's cores, and a runner with all of them in each would overcommit the host.
+        """
+        if shards <= 1:
+            return 0
+        return max(1, (os.cpu_count() or 1) // shards)
 
-    def execute_samples(self, test_inputs: list[str]):
+    def _run_samples(self, test_inputs: list[str], shards: int) -> list[tuple[str, OracleResult]]:
         self._ensure_container_started()
         logging.info("Executing samples with oracle.")
 
-        mapping = dict()
-        # Create temporary directory for sample files
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            samples_dir = Path(tmp_dir)
-            samples_dir.mkdir(exist_ok=True)
+        chunks = self._shard_chunks(test_inputs, shards)
+        if 1 == len(chunks):
+            batch = self._execute(self._runner(self._container), test_inputs)
+        else:
+            workers = itertools.repeat(self._shard_workers(len(chunks)))
+            with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+                batch = ResultBatch.concat(list(executor.map(self._execute_shard, range(len(chunks)), chunks,
+                                                             workers)))
+        batch.oracle = self._apply_oracle(batch)
+        return list(zip(test_inputs, batch.oracle))
+
+    async def _run_samples_async(self, test_inputs: list[str], shards: int) -> list[tuple[str, OracleResult]]:
+        await asyncio.to_thread(self._ensure_container_started)
+        logging.info("Executing samples with oracle.")
+
+        chunks = self._shard_chunks(test_inputs, shards)
+        workers = self._shard_workers(len(chunks))
+        # a task group cancels the other shards as soon as one of them fails
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(self._execute_shard_async(shard, chunk, workers))
+                     for shard, chunk in enumerate(chunks)]
+        batch = ResultBatch.concat(task.result() for task in tasks)
+        batch.oracle = self._apply_oracle(batch)
+        return list(zip(test_inputs, batch.oracle))
+
+    def _apply_oracle(self, batch: ResultBatch) -> list[OracleResult]:
+        with tracing.span("oracle", oracle=self._oracle.name(), samples=len(batch)):
+            results = self._oracle.apply_batch(self, batch)
+        # a sample killed for its output was cut off before it could finish or time out
+        return [OracleResult.UNDEFINED if truncated else result for truncated, result in zip(batch.truncated, results)]
+
+    def _execute_shard(self, shard: int, test_inputs: list[str], workers: int) -> ResultBatch:
+        """
+        Run one shard: the first one in this bug's container, all others in extra leased containers.
+        """
+        if 0 == shard:
+            return self._execute(self._runner(self._container, workers), test_inputs)
+        container = self._lease_container()
+        failed = True
+        try:
+            batch = self._execute(self._runner(container, workers), test_inputs)
+            failed = False
+            return batch
+        finally:
+            self._container_pool().release(container, discard=failed)
+
+    async def _execute_shard_async(self, shard: int, test_inputs: list[str], workers: int) -> ResultBatch:
+        if 0 == shard:
+            return await self._execute_async(self._async_runner(self._container, workers), test_inputs)
+        container = await asyncio.to_thread(self._lease_container)
+        failed = True
+        try:
+            batch = await self._execute_async(self._async_runner(container, workers), test_inputs)
+            failed = False
+            return batch
+        finally:
+            self._stop_async_runners(container)
+            await asyncio.to_thread(self._container_pool().release, container, discard=failed)
 
-            # Write each test string to a separate file
-            for idx, content in enumerate(test_inputs):
-                sample_file = samples_dir / Path(f"sample_{idx}.cli")
-                sample_file.write_text(content, encoding="utf-8")
-                mapping[sample_file.name] = content
+    def _execute(self, daemon: RunnerDaemon, clis: list[str]) -> ResultBatch:
+        """
+        Run the clis on the given runner, in two tiers if timeouts are set.
+        """
+        if self.timeouts is None:
+            return daemon.execute(self.subject(), clis)
+        with tracing.span("timeout_short", samples=len(clis)):
+            batch = daemon.execute(self.subject(), self._short_clis(clis))
+        hung = self._timed_out(clis, batch)
+        if 0 != len(hung):
+            with tracing.span("timeout_full", samples=len(hung)):
+                batch.replace(hung, daemon.execute(self.subject(), [self._full_cli(clis[idx]) for idx in hung]))
+        batch.line[:] = clis
+        return batch
 
-            # Now call the existing execute_samples method on the temp directory
-            data = self.execute_samples_dir(samples_dir)
+    async def _execute_async(self, daemon: AsyncRunnerDaemon, clis: list[str]) -> ResultBatch:
+        if self.timeouts is None:
+            return await daemon.execute(self.subject(), clis)
+        with tracing.span("timeout_short", samples=len(clis)):
+            batch = await daemon.execute(self.subject(), self._short_clis(clis))
+        hung = self._timed_out(clis, batch)
+        if 0 != len(hung):
+            with tracing.span("timeout_full", samples=len(hung)):
+                batch.replace(hung, await daemon.execute(self.subject(), [self._full_cli(clis[idx]) for idx in hung]))
+        batch.line[:] = clis
+        return batch
 
-            result = []
-            for _, row in data.iterrows():
-                inp_str = mapping[row["file"]]
-                oracle = row["oracle"] if [row["input"]] else OracleResult.UNDEFINED
-                result.append((inp_str, oracle))
+    def _short_clis(self, clis: list[str]) -> list[str]:
+        return [with_timeout(cli, self.timeouts.short) for cli in clis]
 
-        return result
+    def _full_cli(self, cli: str) -> str:
+        return with_timeout(cli, self.timeouts.full)
+
+    def _timed_out(self, clis: list[str], batch: ResultBatch) -> list[int]:
+        """
+        :return the indices of the samples that hit the short timeout and need to run again with the full one.
+        """
+        if not self.timeouts.tiered():
+            return []
+        return [idx for idx, rc in enumerate(batch.return_code)
+                if TIMEOUT_RETURN_CODE == rc and cli_timeout(clis[idx]) is not None]
+
+    def calibrate_timeouts(self, samples: list[str] = None, repeat: int = 10, **kwargs) -> Timeouts:
+        """
+        Measure the runtime of benign inputs on this subject and set the timeouts derived from it
+        (see Timeouts.calibrate, which also takes the keyword arguments).
+        All following executions first run each sample with the short timeout.
+
+        The runtimes of several distinct inputs make up the distribution, so it covers the work the
+        subject does on ordinary inputs, not just the noise of starting a single one.
+
+        :param samples: distinct benign command lines; benign_samples() by default.
+        :param repeat: how often each sample is run.
+        :return the new timeouts.
+        """
+        if samples is None:
+            samples = self.benign_samples()
+        full = [cli_timeout(cli) for cli in samples if cli_timeout(cli) is not None]
+        if 0 == len(full):
+            raise AssertionError("The samples do not use `timeout`; there is nothing to calibrate.")
+        self._ensure_container_started()
+        with tracing.span("calibrate", samples=len(samples) * repeat):
+            batch = self._runner(self._container).execute(self.subject(), samples * repeat)
+        durations = [duration for duration, rc in zip(batch.duration, batch.return_code)
+                     if TIMEOUT_RETURN_CODE != rc]
+        self.timeouts = Timeouts.calibrate(durations, max(full), **kwargs)
+        logging.info(f"Calibrated timeouts of {self.subject()}: {self.timeouts}.")
+        return self.timeouts
 
     def execute_sample(self, test_input: str) -> OracleResult:
         _, oracle = self.execute_samples([test_input])[0]
         return oracle
 
-    # def execute_sample_list(self, sample_files: list[Path]) -> pd.DataFrame:
+    async def execute_sample_async(self, test_input: str) -> OracleResult:
+        _, oracle = (await self.execute_samples_async([test_input]))[0]
+        return oracle
+
+    def _runner(self, container: AbstractContainer, workers: int = 0) -> RunnerDaemon:
+        """
+        Return the persistent runner of the given container, starting it if necessary.
+        A runner with another number of workers is replaced.
+        """
+        daemon = container.daemons.get(self._sample_runner_path())
+        if daemon is not None and daemon.workers != workers:
+            daemon.stop()
+            daemon = None
+        if daemon is None:
+            daemon = RunnerDaemon(container, self._runner_in(container), workers=workers,
+                                  output_limit=self._output_limit)
+            container.daemons[self._sample_runner_path()] = daemon
+        return daemon
+
+    @staticmethod
+    def _stop_async_runners(container: AbstractContainer) -> None:
+        """
+        Async runners are bound to their event loop, so they do not go back to the pool with their container.
+        """
+        for key in [key for key in container.daemons if isinstance(key, tuple) and "async" == key[0]]:
+            container.daemons.pop(key).stop()
+
+    def _async_runner(self, container: AbstractContainer, workers: int = 0) -> AsyncRunnerDaemon:
+        """
+        Return the asyncio runner of the given container for the running event loop, starting it if necessary.
+        A runner with another number of workers is replaced.
+        """
+        key = ("async", self._sample_runner_path())
+        daemon = container.daemons.get(key)
+        if daemon is not None and daemon.loop is not None and daemon.loop is not asyncio.get_running_loop():
+            # left over from another event loop
+            daemon.stop()
+            daemon = None
+        if daemon is not None and daemon.workers != workers:
+            daemon.stop()
+            daemon = None
+        if daemon is None:
+            daemon = AsyncRunnerDaemon(container, self._runner_in(container), workers=workers,
+                                       output_limit=self._output_limit)
+            container.daemons[key] = daemon
+        return daemon
+
+    # def execute_sample_list(self, sample_files: list[Path]) -> ResultBatch:
     #     """
     #     Alternative method if we have a list of sample files rather than one directory.
     #     """
     #     self._ensure_container_started()
     #
     #     if not sample_files:
-    #         return self._empty_result_df()
+    #         return ResultBatch()
     #
     #     target_dir = self.container().container_root_dir("root") / "alhazen_samples" / "samples"
     #     self.container().check_output(["mkdir", "-p", str(target_dir)])
     #     self.container().copy_into(sample_files, target_dir, username="root")
     #     return self._execute_samples_in_container(exec_dir=target_dir)
 
-    def _execute_samples_in_container(self) -> pd.DataFrame:
-        output = b""
+    def _execute_samples_in_container(self, container_dir: Path) -> ResultBatch:
+        with tracing.span("runner_start"):
+            process = self.container().popen(["python3",
+                                              self._runner_in(self.container()),
+                                              self.subject(),
+                                              str(container_dir), "rm",
+                                              *runner_options(0, self._output_limit)])
+            process.stdin.close()
+        batch = ResultBatch()
         try:
-            output = self.container().check_output(["python3",
-                                                    self._sample_runner_path(),
-                                                    self.subject(),
-                                                    (self.container().container_root_dir(
-                                                        "root") / "alhazen_samples").resolve(), "rm"])
-            prefix = "# csv #- "
-            text = output.decode()
-            lines = [line[len(prefix):] for line in text.split('\n') if line.startswith(prefix)]
-            df = pd.read_csv(io.StringIO("\n".join(lines)), keep_default_na=False, lineterminator='\n')
-            df["oracle"] = df.apply(lambda r: self._oracle.apply_oracle(self, r), axis=1)
-            return df
-        except subprocess.CalledProcessError as ex:
-            logging.exception("Process failed")
-            logging.error(ex.output)
-            raise
-        except:
-            logging.exception("Process failed")
-            logging.error(output.decode())
-            raise
-
-    @staticmethod
-    def _empty_result_df() -> pd.DataFrame:
-        """
-        Helper to create an empty DataFrame with the correct columns.
-        """
-        return pd.DataFrame(columns=["file", "line", "subject", "return code", "output", "oracle"])
-
+            # decode the records while the runner is still producing them
+            with tracing.span("runner_batch") as span:
+                for record in read_records(process.stdout):
+                    record["subject"] = self.subject()
+                    batch.append(record)
+                span.set(samples=len(batch))
+        finally:
+            process.stdout.close()
+            returncode = process.wait()
+        if 0 != returncode:
+            logging.error(f"Runner failed after {len(batch)} samples.")
+            raise subprocess.CalledProcessError(returncode, process.args)
+        batch.oracle = self._apply_oracle(batch)
+        return batch
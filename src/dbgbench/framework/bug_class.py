@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
 from pathlib import Path
 from typing import Generator
-from pandas import DataFrame
+
+from dbgbench.framework.results import ResultBatch
 
 
 class Bug(ABC):
@@ -31,7 +32,7 @@ class Bug(ABC):
         sample = next(g)
         return sample.suffix
 
-    def execute_samples(self, sample_dir) -> DataFrame:
+    def execute_samples(self, sample_dir) -> ResultBatch:
         """helper method to execute all samples in a given directory."""
         raise NotImplementedError("Overwrite in subclass.")
 
@@ -0,0 +1,105 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+
+from dbgbench.framework.oraclesresult import OracleResult
+
+
+def cache_dir() -> Path:
+    """
+    Return the directory for dbgbench's on-disk caches ($XDG_CACHE_HOME/dbgbench by default),
+    creating it if necessary. It can be moved with the DBGBENCH_CACHE_DIR environment variable.
+    """
+    if "DBGBENCH_CACHE_DIR" in os.environ:
+        path = Path(os.environ["DBGBENCH_CACHE_DIR"])
+    else:
+        path = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "dbgbench"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def fingerprint(files: Iterable[Path]) -> str:
+    """
+    Hash the contents of the given files, e.g. the runner script and the oracle sources,
+    so that cached results are not reused once that code changes.
+    """
+    digest = hashlib.sha256()
+    for file in files:
+        digest.update(Path(file).read_bytes())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Persistent cache of oracle results, keyed by bug id, oracle, code version and the hash of the cli.
+
+    The cache is a SQLite database in WAL mode, so several processes can share it.
+    Once it grows beyond `max_entries`, the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: Path = None, max_entries: int = 1_000_000):
+        self._path = cache_dir() / "results.sqlite" if path is None else Path(path)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self._path), timeout=60, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, result TEXT NOT NULL, last_used REAL NOT NULL)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS results_lru ON results (last_used)")
+
+    @staticmethod
+    def _key(bug_id: str, oracle: str, version: str, cli: str) -> str:
+        cli_hash = hashlib.sha256(cli.encode("utf-8")).hexdigest()
+        return hashlib.sha256("\0".join([bug_id, oracle, version, cli_hash]).encode("utf-8")).hexdigest()
+
+    def get_many(self, bug_id: str, oracle: str, version: str, clis: list[str]) -> dict[str, OracleResult]:
+        """
+        Look up all clis and return the cached results of the hits.
+        """
+        keys = {self._key(bug_id, oracle, version, cli): cli for cli in set(clis)}
+        found = {}
+        key_list = list(keys)
+        with self._lock, self._connection:
+            # stay below SQLite's limit on the number of host parameters
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._connection.execute(
+                    f"SELECT key, result FROM results WHERE key IN ({placeholders})", chunk).fetchall()
+                self._connection.execute(
+                    f"UPDATE results SET last_used = ? WHERE key IN ({placeholders})", [time.time()] + chunk)
+                for key, result in rows:
+                    found[keys[key]] = OracleResult[result]
+        return found
+
+    def put_many(self, bug_id: str, oracle: str, version: str, results: list[tuple[str, OracleResult]]) -> None:
+        """
+        Store results and evict the least recently used entries if the cache is full.
+        """
+        now = time.time()
+        entries = [(self._key(bug_id, oracle, version, cli), result.name, now) for cli, result in results]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO results (key, result, last_used) VALUES (?, ?, ?)", entries)
+            count = self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            if count > self.max_entries:
+                self._connection.execute(
+                    "DELETE FROM results WHERE key IN "
+                    "(SELECT key FROM results ORDER BY last_used LIMIT ?)", (count - self.max_entries,))
+
+    def clear(self) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM results")
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
@@ -0,0 +1,305 @@
+import asyncio
+import contextlib
+import logging
+import os
+import subprocess
+import threading
+from typing import Iterator
+
+from dbgbench.framework import tracing
+from dbgbench.framework.docker import AbstractContainer
+from dbgbench.framework.helpers import frame_header, none_field, read_frame, write_frame
+from dbgbench.framework.results import ResultBatch
+
+
+def runner_options(workers: int, output_limit: int = None) -> list[str]:
+    """
+    :return the command line options of a sample runner for the given settings.
+    """
+    options = ["--workers", str(workers)]
+    if output_limit is not None:
+        options += ["--output-limit", str(output_limit)]
+    return options
+
+
+class RunnerDaemon:
+    """
+    A long-lived sample runner inside a container.
+
+    The runner script is started once with `--serve`. Each sample is then sent as a framed
+    (request id, bug id, cli) request on its stdin and answered with a framed
+    (request id, return code, output, input, duration, truncated) record, so no interpreter is started per batch.
+    Answers may arrive out of order when the runner uses several workers; they are matched by request id.
+
+    One batch runs at a time: while a stream is open, other threads wait for it to finish.
+    Streams are not reentrant; the thread that holds one open cannot run another batch on the same daemon.
+    """
+
+    def __init__(self, container: AbstractContainer, runner_path: str, workers: int = 0, output_limit: int = None):
+        """
+        :param workers: number of samples the runner executes in parallel; 0 uses all cores of the container.
+        :param output_limit: bytes of output after which a sample is killed; the runner's default if None.
+        """
+        self._container = container
+        self._runner_path = runner_path
+        self.workers = workers
+        self._output_limit = output_limit
+        self._process = None
+        self._next_id = 0
+        self._lock = threading.Lock()
+        # the thread whose stream holds the lock
+        self._owner = None
+
+    def start(self) -> None:
+        logging.info(f"Starting persistent runner {self._runner_path} in '{self._container.name}'.")
+        with tracing.span("runner_start", container=self._container.name):
+            self._process = self._container.popen(["python3", self._runner_path, "--serve",
+                                                   *runner_options(self.workers, self._output_limit)])
+
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def stop(self, kill: bool = False) -> None:
+        """
+        Close the runner's pipes and reap the process. The runner then drops the samples it has not
+        answered yet, including those queued for its workers, and exits (see helpers.serve).
+        It is killed if it does not exit in time; with `kill`, that is after a short grace period.
+        """
+        if self._process is None:
+            return
+        # stdout first: a runner blocked on writing an answer gets an error instead of waiting for us
+        self._process.stdout.close()
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self._process.wait(timeout=1 if kill else 5)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+        self._process = None
+
+    def execute(self, identifier: str, clis: list[str]) -> ResultBatch:
+        """
+        Run all command lines for the given bug and return one row per cli, in order.
+        """
+        rows = dict(self.stream(identifier, clis))
+        return ResultBatch.from_records(rows[idx] for idx in range(len(clis)))
+
+    def stream(self, identifier: str, clis: list[str]) -> Iterator[tuple[int, dict]]:
+        """
+        Run all command lines for the given bug and yield (index into clis, row) pairs as the samples finish.
+        If the caller stops iterating early, the runner is stopped and drops the remaining samples;
+        the next call starts a new one.
+
+        The daemon stays locked until the stream is exhausted or closed, so close streams that are
+        not consumed to the end (e.g. with contextlib.closing) instead of leaving them to the garbage collector.
+        :raise RuntimeError: if the calling thread already holds a stream of this daemon open.
+        """
+        if threading.get_ident() == self._owner:
+            raise RuntimeError(f"A stream of runner {self._runner_path} is still open in this thread; "
+                               f"streams are not reentrant.")
+        with self._lock:
+            self._owner = threading.get_ident()
+            try:
+                yield from self._stream(identifier, clis)
+            finally:
+                self._owner = None
+
+    def _stream(self, identifier: str, clis: list[str]) -> Iterator[tuple[int, dict]]:
+        if not self.is_alive():
+            self.start()
+        first_id = self._next_id
+        self._next_id += len(clis)
+
+        # Requests are written from a separate thread so that neither side can block
+        # on a full pipe while the other one is waiting.
+        cancelled = threading.Event()
+        sender = threading.Thread(target=self._send, args=(identifier, first_id, clis, cancelled), daemon=True)
+        sender.start()
+        complete = False
+        # while the caller consumes results, the span of the batch stays open
+        with tracing.span("runner_batch", bug=identifier, samples=len(clis)):
+            try:
+                for answered in range(len(clis)):
+                    frame = read_frame(self._process.stdout)
+                    if frame is None:
+                        raise AssertionError(
+                            f"Runner {self._runner_path} exited with {self._process.wait()} "
+                            f"after {answered} of {len(clis)} samples.")
+                    request_id, rc, output, inp, duration, truncated = frame
+                    idx = int(request_id) - first_id
+                    yield idx, {
+                        "line": clis[idx],
+                        "subject": identifier,
+                        "output": output,
+                        "input": inp,
+                        "return code": int(rc),
+                        "duration": float(duration),
+                        "truncated": b"1" == truncated,
+                    }
+                complete = True
+            finally:
+                if not complete:
+                    cancelled.set()
+                    self.stop(kill=True)
+                sender.join()
+
+    def _send(self, identifier: str, first_id: int, clis: list[str], cancelled: threading.Event) -> None:
+        stdin = self._process.stdin
+        try:
+            for offset, cli in enumerate(clis):
+                if cancelled.is_set():
+                    return
+                write_frame(stdin, [str(first_id + offset).encode("ascii"),
+                                    identifier.encode("utf-8"),
+                                    cli.encode("utf-8")])
+                stdin.flush()
+        except (OSError, ValueError):
+            if not cancelled.is_set():
+                # the runner died; the reader reports the failure
+                logging.exception("Could not send samples to runner.")
+
+
+async def read_frame_async(stream: asyncio.StreamReader) -> list:
+    """
+    Like helpers.read_frame, but for an asyncio stream.
+    :return the list of fields, or None if the stream ended before the frame started.
+    """
+    try:
+        header = await stream.readexactly(frame_header.size)
+    except asyncio.IncompleteReadError as ex:
+        if 0 == len(ex.partial):
+            return None
+        raise AssertionError(f"Truncated frame: expected {frame_header.size} bytes, got {len(ex.partial)}.")
+    try:
+        fields = []
+        for _ in range(frame_header.unpack(header)[0]):
+            length = frame_header.unpack(await stream.readexactly(frame_header.size))[0]
+            if none_field == length:
+                fields.append(None)
+            else:
+                fields.append(await stream.readexactly(length))
+        return fields
+    except asyncio.IncompleteReadError as ex:
+        raise AssertionError(f"Truncated frame: expected {ex.expected} bytes, got {len(ex.partial)}.")
+
+
+class AsyncRunnerDaemon:
+    """
+    The asyncio counterpart of RunnerDaemon: the same persistent runner and protocol, driven through
+    an asyncio subprocess, so that one event loop can keep many runners busy.
+    A daemon belongs to the event loop it was started in.
+
+    If an execution is cancelled, the runner is killed. With the Docker backend this kills the
+    `docker exec` client; the runner inside the container then sees its stdin close and exits.
+    The next execution starts a fresh runner.
+
+    A watcher task reaps the runner once it exits. asyncio.run() cancels the watcher before it closes
+    the loop, and the watcher then kills and reaps the runner, so a daemon that is still running then
+    leaves neither a zombie nor an open transport behind.
+    """
+
+    def __init__(self, container: AbstractContainer, runner_path: str, workers: int = 0, output_limit: int = None):
+        """
+        :param workers: number of samples the runner executes in parallel; 0 uses all cores of the container.
+        :param output_limit: bytes of output after which a sample is killed; the runner's default if None.
+        """
+        self._container = container
+        self._runner_path = runner_path
+        self.workers = workers
+        self._output_limit = output_limit
+        self._process = None
+        self._next_id = 0
+        self._lock = asyncio.Lock()
+        self._watcher = None
+        self.loop = None
+
+    async def start(self) -> None:
+        logging.info(f"Starting persistent runner {self._runner_path} in '{self._container.name}'.")
+        self.loop = asyncio.get_running_loop()
+        with tracing.span("runner_start", container=self._container.name):
+            self._process = await self._container.popen_async(["python3", self._runner_path, "--serve",
+                                                               *runner_options(self.workers, self._output_limit)])
+        self._watcher = self.loop.create_task(self._watch(self._process))
+
+    @staticmethod
+    async def _watch(process: asyncio.subprocess.Process) -> None:
+        try:
+            await process.wait()
+        except asyncio.CancelledError:
+            # the loop is shutting down
+            with contextlib.suppress(ProcessLookupError):
+                process.kill()
+            await process.wait()
+            raise
+
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.returncode is None
+
+    def stop(self) -> None:
+        """
+        Kill the runner. This does not need the event loop, so containers can stop it from any thread.
+        The watcher reaps the runner in the loop; once the loop is closed, the runner is reaped right here.
+        """
+        process, self._process = self._process, None
+        if process is None:
+            return
+        with contextlib.suppress(ProcessLookupError):
+            process.kill()
+        if self.loop.is_closed() and process.returncode is None:
+            with contextlib.suppress(ChildProcessError):
+                os.waitpid(process.pid, 0)
+
+    async def execute(self, identifier: str, clis: list[str]) -> ResultBatch:
+        """
+        Run all command lines for the given bug and return one row per cli, in order.
+        """
+        async with self._lock:
+            if not self.is_alive():
+                await self.start()
+            process = self._process
+            first_id = self._next_id
+            self._next_id += len(clis)
+
+            sender = asyncio.create_task(self._send(process.stdin, identifier, first_id, clis))
+            with tracing.span("runner_batch", bug=identifier, samples=len(clis)):
+                try:
+                    rows = {}
+                    while len(rows) < len(clis):
+                        frame = await read_frame_async(process.stdout)
+                        if frame is None:
+                            raise AssertionError(
+                                f"Runner {self._runner_path} exited with {await process.wait()} "
+                                f"after {len(rows)} of {len(clis)} samples.")
+                        request_id, rc, output, inp, duration, truncated = frame
+                        idx = int(request_id) - first_id
+                        rows[idx] = {
+                            "line": clis[idx],
+                            "subject": identifier,
+                            "output": output,
+                            "input": inp,
+                            "return code": int(rc),
+                            "duration": float(duration),
+                            "truncated": b"1" == truncated,
+                        }
+                    await sender
+                except BaseException:
+                    # including cancellation: the runner may still be busy with our samples
+                    sender.cancel()
+                    self.stop()
+                    raise
+        return ResultBatch.from_records(rows[idx] for idx in range(len(clis)))
+
+    @staticmethod
+    async def _send(stdin: asyncio.StreamWriter, identifier: str, first_id: int, clis: list[str]) -> None:
+        try:
+            for offset, cli in enumerate(clis):
+                write_frame(stdin, [str(first_id + offset).encode("ascii"),
+                                    identifier.encode("utf-8"),
+                                    cli.encode("utf-8")])
+                await stdin.drain()
+        except (OSError, ValueError):
+            # the runner died; the reader reports the failure
+            logging.exception("Could not send samples to runner.")
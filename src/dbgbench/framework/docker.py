@@ -1,10 +1,18 @@
 from abc import ABC, abstractmethod
+import asyncio
+import hashlib
+import io
 import logging
 import pkgutil
+import shutil
+import subprocess
+import tarfile
 import tempfile
+import threading
 from pathlib import Path
 
-from . import external_exec as execute
+from . import external_exec as execute, tracing
+from .cache import cache_dir, fingerprint
 
 
 def dbgbench_dir() -> Path:
@@ -21,6 +29,23 @@ def dbgbench_dir() -> Path:
 
 RESOURCE_DIR = (Path(__file__).parent.parent / "resources").resolve()
 
+# framework modules the runner scripts import from the `alhazen` package
+runner_support_files = ["helpers.py", "oracles.py", "external_exec.py", "printf.py"]
+
+# serializes image builds, e.g. when the pool starts several containers of a new subject at once
+_image_lock = threading.Lock()
+
+
+def image_cache_dir() -> Path:
+    """
+    Return the directory for saved images and toolchains, a subdirectory of cache_dir().
+    Copying it to another host (or pointing DBGBENCH_CACHE_DIR to a shared location)
+    lets that host provision its containers without building or downloading anything.
+    """
+    path = cache_dir() / "images"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
 
 class AbstractContainer(ABC):
     """
@@ -31,6 +56,10 @@ class AbstractContainer(ABC):
         self._image_name = image_name
         self._container_name = container_name
         self._running = False
+        # runner scripts that have already been copied into this container
+        self.installed = set()
+        # persistent runner processes attached to this container, keyed by runner script
+        self.daemons = {}
 
     @abstractmethod
     def create_image(self) -> None:
@@ -69,43 +98,97 @@ class AbstractContainer(ABC):
         """
         return self._container_name
 
+    def exec_command(self, cmd: list[str], cwd: Path = None, interactive: bool = False) -> list[str]:
+        """
+        Return the host command line that executes `cmd` within the container.
+        With `interactive`, the command's stdin stays attached.
+        """
+        full_cmd = ["docker", "exec"]
+        if interactive:
+            full_cmd.append("-i")
+        if cwd:
+            full_cmd += ["-w", str(cwd)]
+        return full_cmd + [self._container_name] + cmd
+
     def run_in_container(self, cmd: list[str], cwd: Path = None) -> bytes:
         """
         Execute a command within the container and return its stdout as bytes.
         """
         if not self._running:
             raise RuntimeError("Cannot run command. Container is not running.")
+        return execute.check_output(self.exec_command(cmd, cwd))
 
-        full_cmd = ["docker", "exec"]
-        if cwd:
-            full_cmd += ["-w", str(cwd)]
-        full_cmd += [self._container_name] + cmd
-        return execute.check_output(full_cmd)
+    def popen(self, cmd: list[str], cwd: Path = None) -> subprocess.Popen:
+        """
+        Start a long-running command within the container, with pipes to its stdin and stdout.
+        """
+        if not self._running:
+            raise RuntimeError("Cannot run command. Container is not running.")
+        return execute.popen(self.exec_command(cmd, cwd, interactive=True),
+                             stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    async def popen_async(self, cmd: list[str], cwd: Path = None) -> asyncio.subprocess.Process:
+        """
+        Like popen, but start the command as an asyncio subprocess.
+        """
+        if not self._running:
+            raise RuntimeError("Cannot run command. Container is not running.")
+        return await asyncio.create_subprocess_exec(*execute.make_cmd(self.exec_command(cmd, cwd, interactive=True)),
+                                                    stdin=subprocess.PIPE, stdout=subprocess.PIPE)
 
     def copy_into(self, local_paths: list[Path], dst_path: Path, username: str = "root") -> None:
         """
         Copy files or directories from the host into the container. Adjust ownership after copy.
+        All paths are uploaded as one tar stream, so this costs a single docker invocation.
         """
         if not self._running:
             raise RuntimeError("Cannot copy files. Container is not running.")
 
-        for lp in local_paths:
+        with tracing.span("copy_into", files=len(local_paths)):
+            archive = io.BytesIO()
+            with tarfile.open(fileobj=archive, mode="w") as tar:
+                for lp in local_paths:
+                    tar.add(str(lp.resolve()), arcname=lp.name)
+
+            # Create the target, unpack, and fix ownership (failing to chown is not an error)
+            script = 'mkdir -p "$1" && tar -x -C "$1" && (chown -R "$2:$2" "$1" || true)'
             execute.run(
                 [
-                    "docker", "cp", str(lp.resolve()),
-                    f"{self._container_name}:{str(dst_path)}/"
+                    "docker", "exec", "-i", "-u", "root", self._container_name,
+                    "sh", "-c", script, "sh", str(dst_path), username
                 ],
-                None, check=True
+                None, check=True, input=archive.getvalue()
             )
 
-        # Fix ownership (optional if not needed)
-        execute.run(
-            [
-                "docker", "exec", "-u", "root", self._container_name, "chown", "-R",
-                f"{username}:{username}", str(dst_path)
-            ],
-            None, check=False
-        )
+    def install_support_files(self, username: str = "root") -> None:
+        """
+        Copy the framework modules the runner scripts import (as package `alhazen`)
+        into alhazen_scripts below container_root_dir().
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            scripts_dir = Path(tmpdir, "alhazen")
+            scripts_dir.mkdir(parents=True, exist_ok=True)
+
+            # Example: copying some "framework" scripts
+            for fname in runner_support_files:
+                data = pkgutil.get_data("dbgbench.framework", fname)
+                if data is None:
+                    continue
+                (scripts_dir / fname).write_bytes(data)
+
+            self.copy_into(
+                [scripts_dir],
+                self.container_root_dir(username) / "alhazen_scripts",
+                username=username
+            )
+
+    def container_root_dir(self, username: str = "root") -> Path:
+        """
+        Return the home directory for the specified user in the container.
+        """
+        if username == "root":
+            return Path("/root/Desktop/")
+        return Path(f"/home/{username}/")
 
 
 class Container(AbstractContainer):
@@ -121,6 +204,7 @@ class Container(AbstractContainer):
         basedir = basedir.resolve()
         super().__init__(image_name=basedir.name, container_name=container_name)
         self._basedir = basedir
+        self._shared_dir = None
 
     def create_image(self) -> None:
         """
@@ -141,31 +225,28 @@ class Container(AbstractContainer):
         """
         self.create_image()
         logging.info(f"Starting container '{self._container_name}' from image '{self._image_name}'...")
+        self._shared_dir = Path(tempfile.mkdtemp(prefix=f"{self._container_name}_"))
         proc = execute.run(
-            ["docker", "run", "-dt", "--name", self._container_name, self._image_name],
+            ["docker", "run", "-dt", "--name", self._container_name,
+             "-v", f"{self._shared_dir}:{self.container_shared_dir()}", self._image_name],
             None
         )
+        if 0 != proc.returncode:
+            logging.warning(f"Could not bind-mount {self._shared_dir}, falling back to uploads: {proc.stdout}")
+            self._remove_shared_dir()
+            execute.run(["docker", "rm", "-f", self._container_name], None)
+            proc = execute.run(
+                ["docker", "run", "-dt", "--name", self._container_name, self._image_name],
+                None
+            )
         proc.check_returncode()
         self._running = True
+        if self._shared_dir is not None and not self._shared_dir_visible():
+            logging.warning(f"{self._shared_dir} is not visible in the container, falling back to uploads.")
+            self._remove_shared_dir()
 
         # Optionally copy default Python scripts into /root/Desktop/alhazen_scripts (or home/username)
-        with tempfile.TemporaryDirectory() as tmpdir:
-            scripts_dir = Path(tmpdir, "alhazen")
-            scripts_dir.mkdir(parents=True, exist_ok=True)
-
-            # Example: copying some "framework" scripts
-            needed_files = ["helpers.py", "oracles.py", "external_exec.py"]
-            for fname in needed_files:
-                data = pkgutil.get_data("dbgbench.framework", fname)
-                if data is None:
-                    continue
-                (scripts_dir / fname).write_bytes(data)
-
-            self.copy_into(
-                [scripts_dir],
-                self.container_root_dir(username) / "alhazen_scripts",
-                username=username
-            )
+        self.install_support_files(username)
 
         logging.info(f"Container '{self._container_name}' is running.")
 
@@ -174,20 +255,57 @@ class Container(AbstractContainer):
         Kill and remove the running container.
         """
         if self._running:
+            for daemon in self.daemons.values():
+                daemon.stop()
+            self.daemons.clear()
             logging.info(f"Stopping container '{self._container_name}'...")
             kill_out = execute.check_output(["docker", "kill", self._container_name])
             logging.info(f"Kill result: {kill_out}")
             rm_out = execute.check_output(["docker", "rm", self._container_name])
             logging.info(f"Remove result: {rm_out}")
             self._running = False
+            self._remove_shared_dir()
 
-    def container_root_dir(self, username: str = "root") -> Path:
+    def shared_dir(self) -> Path:
         """
-        Return the home directory for the specified user in the container.
+        Return the host directory that is bind-mounted into the container,
+        or None if the container could not be started with the mount.
+        Files written there are visible at container_shared_dir() without copying.
         """
-        if username == "root":
-            return Path("/root/Desktop/")
-        return Path(f"/home/{username}/")
+        return self._shared_dir
+
+    def container_shared_dir(self) -> Path:
+        """
+        Return the mount point of the shared directory inside the container.
+        """
+        return self.container_root_dir("root") / "alhazen_shared"
+
+    def _shared_dir_visible(self) -> bool:
+        """
+        Check that the mount really shows the host directory (it does not, e.g., with a remote Docker daemon).
+        """
+        probe = self._shared_dir / ".dbgbench_probe"
+        probe.touch()
+        proc = execute.run(self.exec_command(["test", "-f", str(self.container_shared_dir() / probe.name)]), None)
+        probe.unlink()
+        return 0 == proc.returncode
+
+    def _remove_shared_dir(self) -> None:
+        if self._shared_dir is not None:
+            shutil.rmtree(self._shared_dir, ignore_errors=True)
+            self._shared_dir = None
+
+    def is_running(self) -> bool:
+        """
+        Health check: ask Docker whether the container is still up.
+        """
+        if not self._running:
+            return False
+        proc = execute.run(
+            ["docker", "inspect", "-f", "{{.State.Running}}", self._container_name],
+            None
+        )
+        return 0 == proc.returncode and proc.stdout.strip() == b"true"
 
 
 class DBGBenchContainer(Container):
@@ -196,6 +314,8 @@ class DBGBenchContainer(Container):
     DBGBench-specific logic (creating ephemeral containers, etc.).
     """
 
+    backend = "docker"
+
     def __init__(self, subject: str, container_name: str):
         """
         :param subject: e.g. "grep", "find", etc.
@@ -208,50 +328,122 @@ class DBGBenchContainer(Container):
         )
         self._subject = subject
 
+    @property
+    def subject(self) -> str:
+        """
+        Returns the subject (e.g. "grep") whose image this container runs.
+        """
+        return self._subject
+
     def create_image(self) -> None:
         """
         Override: DBGBench may have a different procedure to create (or re-create)
         the Docker image.
+
+        Provisioning is cached on the host (see image_cache_dir()): a finished image is saved with
+        `docker save` under the hash of its setup inputs and loaded from there on the next host,
+        and the Python/OpenSSL toolchain built for one subject is reused for all others on the same OS.
         """
         image_name = f"alhazen_{self._subject}"
-        existing = execute.check_output(['docker', 'images', '-q', image_name])
-        if not existing:
-            logging.info(f"[DBGBench] Re-creating the image '{image_name}' for subject '{self._subject}'...")
-
-            # Start an "original" ephemeral container for setup
-            ephemeral_name = f"{self._container_name}_orig"
-            cmd = ["bash", "run.sh", self._subject, ephemeral_name, "exit"]
-            self._running = True
-            # run.sh presumably lives in dbgbench_dir()/docker
-            docker_dir = dbgbench_dir() / "docker"
-            execute.run(cmd, None, cwd=str(docker_dir))
-
-            # Copy in a setup script to ephemeral container
-            self.copy_into_orig(
-                [RESOURCE_DIR / "machine_setup.sh"],
-                self.container_root_dir("root")
-            )
+        with _image_lock:
+            existing = execute.check_output(['docker', 'images', '-q', image_name])
+            if existing:
+                logging.info(f"[DBGBench] Image '{image_name}' already exists (ID: {existing.strip()}).")
+                return
+            if self.load_image():
+                return
+            self._provision_image(image_name)
+            self.save_image()
+
+    def image_archive(self) -> Path:
+        """
+        Return the path under which the image of this subject is saved, keyed by the hash of its setup inputs:
+        the setup script, and the Dockerfile and run.sh that DBGBench builds the base image `debugstudy<subject>`
+        from. The image ID of the base image is no key, since it differs between hosts that build the same image.
+        """
+        docker_dir = dbgbench_dir() / "docker"
+        setup_hash = fingerprint([RESOURCE_DIR / "machine_setup.sh",
+                                  docker_dir / "run.sh",
+                                  docker_dir / "scripts" / f"docker.{self._subject}"])
+        return image_cache_dir() / f"alhazen_{self._subject}-{setup_hash[:16]}.tar"
 
-            # Execute that script
-            execute.run(
-                [
-                    "docker", "exec", ephemeral_name,
-                    "bash", str((self.container_root_dir("root") / "machine_setup.sh").resolve())
-                ],
-                None,
-                check=True
-            )
+    def save_image(self) -> Path:
+        """
+        Export the image of this subject with `docker save`, so other hosts can load it instead of building it.
+        """
+        archive = self.image_archive()
+        partial = archive.with_name(archive.name + ".part")
+        logging.info(f"[DBGBench] Saving image 'alhazen_{self._subject}' to {archive}...")
+        execute.run(["docker", "save", "-o", str(partial), f"alhazen_{self._subject}"], None, check=True)
+        partial.replace(archive)
+        return archive
+
+    def load_image(self) -> bool:
+        """
+        Import the image of this subject with `docker load`, if it has been saved before.
+        :return whether the image was loaded.
+        """
+        archive = self.image_archive()
+        if not archive.exists():
+            return False
+        logging.info(f"[DBGBench] Loading image 'alhazen_{self._subject}' from {archive}...")
+        execute.run(["docker", "load", "-i", str(archive)], None, check=True)
+        return True
+
+    def _provision_image(self, image_name: str) -> None:
+        logging.info(f"[DBGBench] Re-creating the image '{image_name}' for subject '{self._subject}'...")
+
+        # Start an "original" ephemeral container for setup
+        ephemeral_name = f"{self._container_name}_orig"
+        cmd = ["bash", "run.sh", self._subject, ephemeral_name, "exit"]
+        self._running = True
+        # run.sh presumably lives in dbgbench_dir()/docker
+        docker_dir = dbgbench_dir() / "docker"
+        execute.run(cmd, None, cwd=str(docker_dir))
+
+        # The toolchain only fits subjects on the same OS release
+        os_release = execute.check_output(["docker", "exec", ephemeral_name, "cat", "/etc/os-release"])
+        setup_hash = fingerprint([RESOURCE_DIR / "machine_setup.sh"])
+        os_hash = hashlib.sha256(os_release).hexdigest()
+        toolchain = image_cache_dir() / f"toolchain-{setup_hash[:16]}-{os_hash[:16]}.tar.gz"
+        toolchain_in_container = self.container_root_dir("root") / "alhazen_toolchain.tar.gz"
+
+        # Copy in a setup script (and the toolchain, if it has been built before) to ephemeral container
+        self.copy_into_orig(
+            [RESOURCE_DIR / "machine_setup.sh"],
+            self.container_root_dir("root")
+        )
+        if toolchain.exists():
+            logging.info(f"[DBGBench] Reusing toolchain {toolchain}.")
+            execute.run(["docker", "cp", str(toolchain), f"{ephemeral_name}:{toolchain_in_container}"],
+                        None, check=True)
 
-            # Stop ephemeral
-            execute.run(["docker", "kill", ephemeral_name], None, check=True)
-            self._running = False
+        # Execute that script
+        execute.run(
+            [
+                "docker", "exec", ephemeral_name,
+                "bash", str((self.container_root_dir("root") / "machine_setup.sh").resolve())
+            ],
+            None,
+            check=True
+        )
 
-            # Commit ephemeral container into a new local image
-            execute.run(['docker', 'commit', ephemeral_name, image_name], None, check=True)
-            # Remove ephemeral container
-            execute.run(['docker', 'rm', ephemeral_name], None, check=True)
-        else:
-            logging.info(f"[DBGBench] Image '{image_name}' already exists (ID: {existing.strip()}).")
+        # Keep the toolchain on the host, but not in the image
+        if not toolchain.exists():
+            partial = toolchain.with_name(toolchain.name + ".part")
+            execute.run(["docker", "cp", f"{ephemeral_name}:{toolchain_in_container}", str(partial)],
+                        None, check=True)
+            partial.replace(toolchain)
+        execute.run(["docker", "exec", ephemeral_name, "rm", "-f", str(toolchain_in_container)], None, check=True)
+
+        # Stop ephemeral
+        execute.run(["docker", "kill", ephemeral_name], None, check=True)
+        self._running = False
+
+        # Commit ephemeral container into a new local image
+        execute.run(['docker', 'commit', ephemeral_name, image_name], None, check=True)
+        # Remove ephemeral container
+        execute.run(['docker', 'rm', ephemeral_name], None, check=True)
 
     def copy_into_orig(self, files: list[Path], targetdir: Path) -> None:
         """
@@ -272,8 +464,4 @@ class DBGBenchContainer(Container):
     def check_output(self, cmd, cwd=None):
         if not self._running:
             raise AssertionError("Machine is stopped already.")
-        full_cmd = ["docker", "exec"]
-        if cwd is not None:
-            full_cmd = full_cmd + ["-w", cwd]
-        full_cmd = full_cmd + [self.name] + cmd
-        return execute.check_output(full_cmd)
+        return execute.check_output(self.exec_command(cmd, cwd))
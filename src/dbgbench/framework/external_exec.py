@@ -1,7 +1,23 @@
+from concurrent.futures import Future
 from pathlib import Path
+import atexit
+import logging
+import os
+import pickle
+import queue
+import signal
 import subprocess
+import sys
+import tempfile
+import threading
 import bz2
-from shutil import copyfileobj
+import gzip
+import lzma
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 """
 There is a problem with subprocess.run(): It uses fork(), which allocates as much memory as the parent process has. 
@@ -9,10 +25,26 @@ This quickly leads to out-of-memory situations.
 
 In order to prevent this, external_execute forks from within a parallel process. If setup() was not called, 
 it falls back to just using subprocess.
+
+Only run() and check_output() go through that process. popen() and capture_output(), and the asyncio
+subprocesses of the runner daemons, are started directly, since their callers need the process and its pipes.
+On Linux, subprocess uses vfork() for them, which copies no memory, unless e.g. a preexec_fn is given
+(as LocalContainer does to apply its resource limits); those fork the full process.
 """
 
+# the SpawnHelper that run() and check_output() use once setup() was called
 pool = None
 
+# log compression: the codec is chosen by the suffix of the logfile, bz2 if it has none of these
+codecs = {"bz2": bz2.open, "gzip": gzip.open, "xz": lzma.open}
+if zstandard is not None:
+    codecs["zstd"] = zstandard.open
+codec_suffixes = {".bz2": "bz2", ".gz": "gzip", ".xz": "xz", ".zst": "zstd"}
+
+# a log is rotated once it holds log_max_bytes of output (None: never); log_backups old logs are kept
+log_max_bytes = 64 * 1024 * 1024
+log_backups = 3
+
 
 def make_cmd(cmd):
     def clean(c):
@@ -23,23 +55,134 @@ def make_cmd(cmd):
     return [clean(c) for c in cmd]
 
 
+def log_codec(logfile):
+    codec = codec_suffixes.get(Path(logfile).suffix, "bz2")
+    if codec not in codecs:
+        raise AssertionError("Cannot write {}: {} compression needs the zstandard package.".format(logfile, codec))
+    return codec
+
+
+class LogWriter:
+    """
+    Appends to a compressed log on a background thread.
+
+    write() never waits for the compressor, so the producer (e.g. the thread draining a child's output)
+    keeps the child unblocked. The queue holds at most `max_pending` chunks; if the writer falls that far
+    behind, further output is spilled to an uncompressed temporary file, which the writer appends to the
+    log (in order) once it caught up. No output is lost.
+    Once the log holds `max_bytes` of output, it is renamed to <logfile>.1 (and so on, up to `backups`)
+    and a new one is started. Output is counted uncompressed; for a log that already existed,
+    its compressed size is taken as a lower bound of the output it holds.
+    """
+
+    def __init__(self, logfile, codec=None, max_bytes=None, backups=None, max_pending=1024):
+        self.path = Path(logfile)
+        self.codec = codec or log_codec(logfile)
+        self.max_bytes = log_max_bytes if max_bytes is None else max_bytes
+        self.backups = log_backups if backups is None else backups
+        self.spilled = 0
+        self._queue = queue.Queue(max_pending)
+        self._lock = threading.Lock()
+        self._spill = None
+        self._log = None
+        self._size = 0
+        self._thread = threading.Thread(target=self._work, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write(self, data):
+        if not data:
+            return
+        with self._lock:
+            if self._spill is None:
+                try:
+                    self._queue.put_nowait(data)
+                    return
+                except queue.Full:
+                    self._spill = tempfile.TemporaryFile()
+            self._spill.write(data)
+            self.spilled += len(data)
+
+    def close(self):
+        """Write everything written so far and close the log."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _take_spill(self):
+        """
+        :return the spill file once the queue ran empty (everything before the spill is written), else None
+        """
+        with self._lock:
+            if self._spill is None or not self._queue.empty():
+                return None
+            spill, self._spill = self._spill, None
+            return spill
+
+    def _work(self):
+        try:
+            while True:
+                data = self._queue.get()
+                if data is not None:
+                    self._append(data)
+                spill = self._take_spill()
+                if spill is not None:
+                    with spill:
+                        spill.seek(0)
+                        for chunk in iter(lambda: spill.read(65536), b""):
+                            self._append(chunk)
+                if data is None:
+                    return
+        finally:
+            if self._log is not None:
+                self._log.close()
+
+    def _append(self, data):
+        if self._log is None:
+            self._size = self.path.stat().st_size if self.path.exists() else 0
+            if self._full():
+                self._rotate()
+            self._log = codecs[self.codec](str(self.path), "ab")
+        elif self._full():
+            self._log.close()
+            self._rotate()
+            self._log = codecs[self.codec](str(self.path), "ab")
+        self._log.write(data)
+        self._size += len(data)
+
+    def _full(self):
+        return self.max_bytes is not None and self._size >= self.max_bytes
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            older = Path("{}.{}".format(self.path, i))
+            if older.exists():
+                older.replace("{}.{}".format(self.path, i + 1))
+        if 0 < self.backups:
+            self.path.replace("{}.1".format(self.path))
+        else:
+            self.path.unlink()
+        self._size = 0
+
+
 def synchronous_run(cmd, logfile, kwargs):
     if logfile is not None:
-        lfp = Path(logfile)
-        if lfp.exists():
-            mode = 'ab'
-        else:
-            mode = 'wb'
-        with bz2.open(logfile, mode) as log:
+        # with a logfile, failing commands raise unless check=False is given
+        check = kwargs.pop("check", True)
+        with LogWriter(logfile) as log:
             log.write(" ".join(cmd).encode(encoding="UTF-8"))
             log.write("\n".encode(encoding="UTF-8"))
-            log.flush()
-            with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT) as process:
-                copyfileobj(process.stdout, log)
+            with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **kwargs) as process:
+                for chunk in iter(lambda: process.stdout.read1(65536), b""):
+                    log.write(chunk)
                 retcode = process.wait()
-                if 0 != retcode:
-                    raise subprocess.CalledProcessError(retcode, process.args)
-                return subprocess.CompletedProcess(process.args, retcode)
+        if check and 0 != retcode:
+            raise subprocess.CalledProcessError(retcode, process.args)
+        return subprocess.CompletedProcess(process.args, retcode)
     else:
         return subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **kwargs)
 
@@ -48,11 +191,208 @@ def synchronous_check_output(cmd, kwargs):
     return subprocess.check_output(cmd, **kwargs)
 
 
+class SpawnHelper:
+    """
+    A small Python process that starts commands on behalf of this one.
+
+    The helper runs this file as a script, so it imports nothing but the standard library and stays small;
+    forking it is cheap however large the calling process grows. Requests are pickled to its stdin, and
+    each one runs on its own thread in the helper, so several callers can wait for commands concurrently.
+    Results and exceptions (e.g. CalledProcessError) are pickled back and returned or raised by call().
+    """
+
+    def __init__(self):
+        self._process = subprocess.Popen([sys.executable, str(Path(__file__).resolve()), "--serve"],
+                                         stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self._pending = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read, name="spawn-helper", daemon=True)
+        self._reader.start()
+
+    @staticmethod
+    def encode(name, cmd, logfile, kwargs):
+        """
+        :return the request, or None if it cannot be sent to the helper (e.g. a preexec_fn in kwargs)
+        """
+        try:
+            return pickle.dumps((name, cmd, logfile, kwargs), protocol=4)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return None
+
+    def call(self, request):
+        future = Future()
+        with self._lock:
+            if self._process is None:
+                raise RuntimeError("The spawn helper has exited.")
+            request_id = self._next_id
+            self._next_id += 1
+            self._pending[request_id] = future
+            try:
+                pickle.dump((request_id, request), self._process.stdin, protocol=4)
+                self._process.stdin.flush()
+            except OSError:
+                del self._pending[request_id]
+                raise RuntimeError("The spawn helper has exited.")
+        return future.result()
+
+    def close(self):
+        """
+        Let the helper finish the commands it has received and wait for it to exit.
+        """
+        with self._lock:
+            process, self._process = self._process, None
+        if process is None:
+            return
+        process.stdin.close()
+        process.wait()
+        self._reader.join()
+        process.stdout.close()
+
+    def _read(self):
+        process = self._process
+        try:
+            while True:
+                try:
+                    request_id, ok, value = pickle.load(process.stdout)
+                except EOFError:
+                    break
+                with self._lock:
+                    future = self._pending.pop(request_id, None)
+                if future is None:
+                    logging.warning("The spawn helper answered request {}, which is not pending.".format(request_id))
+                elif ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+        except Exception:
+            # e.g. an answer that cannot be unpickled; the stream cannot be trusted after that
+            logging.exception("Cannot read the answers of the spawn helper; stopping it.")
+            process.kill()
+            process.wait()
+        finally:
+            with self._lock:
+                self._process = None
+                pending, self._pending = self._pending, {}
+            for future in pending.values():
+                future.set_exception(RuntimeError("The spawn helper exited before the command finished."))
+
+
+def serve(inp, out):
+    """
+    The helper side of SpawnHelper: run requests from inp until it is closed, each on its own thread.
+    """
+    lock = threading.Lock()
+
+    def respond(response):
+        with lock:
+            try:
+                pickle.dump(response, out, protocol=4)
+            except (pickle.PicklingError, TypeError, AttributeError):
+                pickle.dump((response[0], False, RuntimeError(repr(response[2]))), out, protocol=4)
+            out.flush()
+
+    def handle(request_id, request):
+        try:
+            name, cmd, logfile, kwargs = pickle.loads(request)
+            if "run" == name:
+                respond((request_id, True, synchronous_run(cmd, logfile, kwargs)))
+            else:
+                respond((request_id, True, synchronous_check_output(cmd, kwargs)))
+        except Exception as ex:
+            respond((request_id, False, ex))
+
+    while True:
+        try:
+            request_id, request = pickle.load(inp)
+        except EOFError:
+            break
+        # not daemonic: commands that are still running finish before the helper exits
+        threading.Thread(target=handle, args=(request_id, request)).start()
+
+
+def setup():
+    """
+    Start the spawn helper; from then on, run() and check_output() start their commands from there.
+    Call this early, while the process is still small: starting the helper forks this process once.
+    """
+    global pool
+    if pool is None:
+        pool = SpawnHelper()
+        atexit.register(teardown)
+
+
+def teardown():
+    """
+    Stop the spawn helper after its running commands; commands are started directly again afterwards.
+    """
+    global pool
+    helper, pool = pool, None
+    if helper is not None:
+        helper.close()
+
+
+def spawn(name, cmd, logfile, kwargs):
+    helper = pool
+    if helper is not None:
+        request = helper.encode(name, cmd, logfile, kwargs)
+        if request is not None:
+            return helper.call(request)
+        logging.debug("Starting {} directly; its arguments cannot be sent to the spawn helper.".format(cmd))
+    if "run" == name:
+        return synchronous_run(cmd, logfile, kwargs)
+    return synchronous_check_output(cmd, kwargs)
+
+
 def run(cmd, logfile, **kwargs):
     cmd = make_cmd(cmd)
-    return synchronous_run(cmd, logfile, kwargs)
+    return spawn("run", cmd, logfile, kwargs)
 
 
 def check_output(cmd, **kwargs):
     cmd = make_cmd(cmd)
-    return synchronous_check_output(cmd, kwargs)
+    return spawn("check_output", cmd, None, kwargs)
+
+
+def capture_output(cmd, limit, **kwargs):
+    """
+    Run cmd in a new process group and read its stdout and stderr as they are written.
+    Once more than `limit` bytes arrive, the process group is killed.
+    :return the return code, the first `limit` bytes of output, and whether the output was cut off there
+    """
+    cmd = make_cmd(cmd)
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, start_new_session=True,
+                               **kwargs)
+    chunks = []
+    size = 0
+    truncated = False
+    with process.stdout:
+        while True:
+            chunk = process.stdout.read1(65536)
+            if not chunk:
+                break
+            if size + len(chunk) > limit:
+                chunks.append(chunk[:limit - size])
+                truncated = True
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                # processes in other groups (e.g. under `timeout`) get SIGPIPE once the pipe is closed
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+    return process.wait(), b"".join(chunks), truncated
+
+
+def popen(cmd, **kwargs):
+    # the caller needs the process itself, so it cannot come from the spawn helper (see the module docstring)
+    cmd = make_cmd(cmd)
+    return subprocess.Popen(cmd, **kwargs)
+
+
+if __name__ == "__main__":
+    if 2 != len(sys.argv) or "--serve" != sys.argv[1]:
+        print("Usage:", sys.argv[0], "--serve")
+        exit(1)
+    serve(sys.stdin.buffer, sys.stdout.buffer)
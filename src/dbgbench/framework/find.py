@@ -0,0 +1,49 @@
+from pathlib import Path
+
+from dbgbench.framework.base import BaseDbgbenchBug
+from dbgbench.framework.docker import DBGBenchContainer
+from dbgbench.framework.oracles import CrashOrHangOracle, Oracle
+from dbgbench.resources import get_calibration_samples, get_find_samples_dir
+
+
+class FindBug(BaseDbgbenchBug):
+    """
+    Concrete bug class specialized for find.
+
+    Every sample runs in a chroot that each runner process builds once per bug,
+    and clones with hard links for each sample (see sample_runner_find.py).
+    """
+
+    def __init__(self, bug_id, oracle: Oracle = None, **kwargs):
+        """
+        :param oracle: the oracle that recognizes the bug's failures. By default, runs that crash or hang
+                       are failing; bugs that only show in find's output need an oracle for that output.
+        """
+        super().__init__(bug_id, oracle if oracle is not None else CrashOrHangOracle(), **kwargs)
+
+    def benign_samples(self) -> list[str]:
+        return [(get_find_samples_dir() / "find.benign.cli").read_text()] + get_calibration_samples("find")
+
+    def _setup_container_files(self, container: DBGBenchContainer):
+        """
+        Copy specialized runner for find into the container.
+        """
+        container.copy_into(
+            [self._local_runner_path()],
+            container.container_root_dir("root") / "alhazen_scripts",
+            username="root"
+        )
+
+    @staticmethod
+    def _local_runner_path() -> Path:
+        """
+        Return the path of the specialized runner script for find on the host.
+        """
+        return Path(__file__).parent.parent / "resources" / "sample_runner_find.py"
+
+    @staticmethod
+    def _sample_runner_path() -> str:
+        """
+        Return the path of the specialized runner script for find, relative to the container's root directory.
+        """
+        return "alhazen_scripts/sample_runner_find.py"
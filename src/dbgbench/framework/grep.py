@@ -1,7 +1,9 @@
 from pathlib import Path
 
 from dbgbench.framework.base import BaseDbgbenchBug
+from dbgbench.framework.docker import DBGBenchContainer
 from dbgbench.framework.oracles import GrepWrapper
+from dbgbench.resources import get_calibration_samples, get_grep_samples_dir
 
 
 class GrepBug(BaseDbgbenchBug):
@@ -9,24 +11,33 @@ class GrepBug(BaseDbgbenchBug):
     Concrete bug class specialized for grep.
     """
 
-    def __init__(self, bug_id, oracle):
-        super().__init__(bug_id, GrepWrapper(oracle))
+    def __init__(self, bug_id, oracle, **kwargs):
+        super().__init__(bug_id, GrepWrapper(oracle), **kwargs)
 
-    def _setup_container_files(self):
+    def benign_samples(self) -> list[str]:
+        return [(get_grep_samples_dir() / "grep.benign.cli").read_text()] + get_calibration_samples("grep")
+
+    def _setup_container_files(self, container: DBGBenchContainer):
         """
         Copy specialized runner for grep into the container.
         """
-        script_path = Path(__file__).parent.parent / "resources" / "sample_runner_grep.py"
-        self.container().copy_into(
-            [script_path],
-            Path("/root/Desktop/alhazen_scripts"),
+        container.copy_into(
+            [self._local_runner_path()],
+            container.container_root_dir("root") / "alhazen_scripts",
             username="root"
         )
 
+    @staticmethod
+    def _local_runner_path() -> Path:
+        """
+        Return the path of the specialized runner script for grep on the host.
+        """
+        return Path(__file__).parent.parent / "resources" / "sample_runner_grep.py"
+
     @staticmethod
     def _sample_runner_path() -> str:
         """
-        Return the path of the specialized runner script for grep.
+        Return the path of the specialized runner script for grep, relative to the container's root directory.
         """
-        return "/root/Desktop/alhazen_scripts/sample_runner_grep.py"
+        return "alhazen_scripts/sample_runner_grep.py"
 
@@ -1,7 +1,18 @@
+import logging
+import multiprocessing
+import os
 import re
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from pathlib import Path
 
 
 input_pattern = re.compile(r"^printf '(.*)' \|")
+timeout_pattern = re.compile(r"\btimeout (\d+(?:\.\d*)?)s ")
+grep_pattern = re.compile(r"timeout \d+(?:\.\d*)?s grep ")
 
 
 def read_escaped_token(line, pos):
@@ -44,12 +55,43 @@ def split_grep_line(cli):
         start = 0
     else:
         start = match.end()
-    stop = cli.find("timeout 1s grep", start)
-    env = cli[start:stop]
-    command = split_cli(cli[stop+16:])
+    program = grep_pattern.search(cli, start)
+    if program is None:
+        raise AssertionError("Not a grep command line (`timeout <n>s grep` is missing): {}".format(cli))
+    env = cli[start:program.start()]
+    command = split_cli(cli[program.end():])
     return env, list(command)
 
 
+def find_timeout(cli):
+    """
+    Find the `timeout <n>s` the cli runs its program with; the printf'ed input is skipped.
+    """
+    match = re.match(input_pattern, cli)
+    return timeout_pattern.search(cli, 0 if match is None else match.end())
+
+
+def cli_timeout(cli):
+    """
+    :return the duration (in seconds) of the cli's timeout, or None if it has none.
+    """
+    match = find_timeout(cli)
+    if match is None:
+        return None
+    return float(match.group(1))
+
+
+def with_timeout(cli, seconds):
+    """
+    Return the cli with the duration of its timeout replaced by the given one.
+    Command lines without a timeout are returned unchanged.
+    """
+    match = find_timeout(cli)
+    if match is None:
+        return cli
+    return "{}timeout {:g}s {}".format(cli[:match.start()], seconds, cli[match.end():])
+
+
 def identify_pattern(command):
     for i in range(0, len(command)):
         token = command[i]
@@ -58,30 +100,300 @@ def identify_pattern(command):
     raise AssertionError("There does not seem to be a pattern!")
 
 
-class PrefixWriter:
+frame_header = struct.Struct(">I")
+none_field = 0xFFFFFFFF
+
+
+def write_frame(stream, fields):
+    """
+    Write a list of byte fields as one length-prefixed frame to a binary stream.
+    A frame is the number of fields followed by each field's length and bytes; None fields
+    are marked with a special length so that they survive the round trip.
+    """
+    parts = [frame_header.pack(len(fields))]
+    for field in fields:
+        if field is None:
+            parts.append(frame_header.pack(none_field))
+        else:
+            parts.append(frame_header.pack(len(field)))
+            parts.append(field)
+    stream.write(b"".join(parts))
+
+
+def read_exactly(stream, size, eof_ok=False):
+    data = b""
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            if eof_ok and 0 == len(data):
+                return None
+            raise AssertionError("Truncated frame: expected {} bytes, got {}.".format(size, len(data)))
+        data = data + chunk
+    return data
+
+
+def read_frame(stream):
+    """
+    Read one frame written by write_frame from a binary stream.
+    :return the list of fields, or None if the stream ended before the frame started.
+    """
+    header = read_exactly(stream, frame_header.size, eof_ok=True)
+    if header is None:
+        return None
+    fields = []
+    for _ in range(frame_header.unpack(header)[0]):
+        length = frame_header.unpack(read_exactly(stream, frame_header.size))[0]
+        if none_field == length:
+            fields.append(None)
+        else:
+            fields.append(read_exactly(stream, length))
+    return fields
+
+
+record_fields = ["file", "line", "return code", "output", "input", "duration", "truncated"]
+
+
+def write_record(stream, record):
+    """
+    Write the result of one sample (a dict with the keys in record_fields) as a frame.
+    Output and input are written as raw bytes; input may be None.
+    The duration is the wall-clock time of the sample in seconds; truncated tells whether
+    the sample was killed because it exceeded the runner's output limit.
+    """
+    write_frame(stream, [record["file"].encode("utf-8"),
+                         record["line"].encode("utf-8"),
+                         str(record["return code"]).encode("ascii"),
+                         record["output"],
+                         record["input"],
+                         "{:.6f}".format(record["duration"]).encode("ascii"),
+                         b"1" if record["truncated"] else b"0"])
+
+
+def read_records(stream):
+    """
+    Decode the records written by write_record, one at a time, until the stream ends.
+    """
+    while True:
+        frame = read_frame(stream)
+        if frame is None:
+            return
+        file, line, rc, output, inp, duration, truncated = frame
+        yield {
+            "file": file.decode("utf-8"),
+            "line": line.decode("utf-8"),
+            "return code": int(rc),
+            "output": output,
+            "input": inp,
+            "duration": float(duration),
+            "truncated": b"1" == truncated,
+        }
+
+
+# The sample runners (resources/sample_runner_*.py) share the code below. Each runner provides
+# `run(identifier, cli)`, which executes one sample with run_sample(); this module handles the
+# directory mode, the --serve protocol, the worker processes and their scratch directories.
+
+# a sample that writes more output than this is killed; only the first 5000 bytes are reported anyway
+DEFAULT_OUTPUT_LIMIT = 1 << 20
+# bytes of a sample's output that are reported
+reported_output = 5000
+
+__scratch_base = None
+
+
+def init_scratch(base):
+    global __scratch_base
+    __scratch_base = base
+
+
+def scratch_dir():
+    """A private directory for the scratch files of this (worker) process."""
+    path = Path(__scratch_base or tempfile.gettempdir()) / "alhazen_worker_{}".format(os.getpid())
+    if not path.exists():
+        path.mkdir(parents=True)
+    return path
 
-    def __init__(self, writer, prefix):
-        self.__writer = writer
-        self.__prefix = prefix
-        self.__remainder = ""
 
-    def write(self, text):
-        for line in text.splitlines(keepends=True):
-            if line.endswith("\n"):
-                self.__writer.write(self.__prefix + self.__remainder + line)
-                self.__remainder = ""
+def start_workers(workers):
+    """Set up the scratch space and, for more than one worker, a process pool.
+    :return the scratch base directory and the pool (or None)"""
+    base = tempfile.mkdtemp(prefix="alhazen_")
+    init_scratch(base)
+    if 1 == workers:
+        return base, None
+    return base, multiprocessing.Pool(workers, initializer=init_scratch, initargs=(base,))
+
+
+def stop_workers(base, pool, cancel=False):
+    """Shut down the pool and remove the scratch space.
+    With cancel, the samples that are still queued or running are dropped instead of waited for."""
+    if pool is not None:
+        if cancel:
+            pool.terminate()
+        else:
+            pool.close()
+        pool.join()
+    shutil.rmtree(base, ignore_errors=True)
+
+
+def worker_count(workers):
+    if 0 == workers:
+        return len(os.sched_getaffinity(0))
+    return workers
+
+
+def subjects_dir():
+    """The directory with the built bugs: /root/Desktop in the dbgbench containers,
+    ALHAZEN_SUBJECTS_DIR when the runner is started elsewhere (see framework/local.py)."""
+    return os.environ.get("ALHAZEN_SUBJECTS_DIR", "/root/Desktop/")
+
+
+def bug_dir(identifier, basedir):
+    basedir = Path(basedir)
+    i = 1
+    subject = identifier[:identifier.rfind(".")]
+    while True:
+        check = basedir / "{subj}{i}".format(subj=subject, i=i)
+        if check.exists():
+            id_file = check / identifier
+            if id_file.exists():
+                return check
+        else:
+            raise AssertionError("I could not find {subj} for {iden} (round: {i}, looking in {basedir})".format(
+                subj=subject,
+                iden=identifier,
+                i=i,
+                basedir=basedir))
+        i = i + 1
+
+
+def output_limit():
+    """The number of output bytes after which a sample is killed (see --output-limit)."""
+    return int(os.environ.get("ALHAZEN_OUTPUT_LIMIT", DEFAULT_OUTPUT_LIMIT))
+
+
+def run_sample(execute_sample, extract_input, identifier, cli):
+    """
+    Execute one sample with the runner's execute_sample(identifier, cli), which returns the return code,
+    the output, and whether the output was cut off, and measure it.
+    :return the record of the sample, without "file"
+    """
+    start = time.monotonic()
+    rc, output, truncated = execute_sample(identifier, cli)
+    duration = time.monotonic() - start
+    return {
+        "line": cli,
+        "subject": identifier,
+        "output": output[:reported_output],
+        "input": extract_input(cli),
+        "return code": rc,
+        "duration": duration,
+        "truncated": truncated
+    }
+
+
+def run_config(run, subject, config_file):
+    with open(str(config_file), 'r') as inf:
+        cli = inf.read()
+    record = run(subject, cli)
+    record["file"] = str(config_file.name)
+    return record
+
+
+def run_config_star(args):
+    return run_config(*args)
+
+
+def execute_samples(run, subject, inp_dir, out, workers=1):
+    """Run the .cli files in inp_dir and write their records to out, in the order of their names."""
+    # sorted, so that the output order does not depend on the directory or the scheduling
+    jobs = [(run, subject, config_file) for config_file in sorted(inp_dir.iterdir())
+            if str(config_file).endswith(".cli")]
+    base, pool = start_workers(worker_count(workers))
+    try:
+        if pool is None:
+            entries = map(run_config_star, jobs)
+        else:
+            entries = pool.imap(run_config_star, jobs)
+        for entry in entries:
+            write_record(out, entry)
+            out.flush()
+    finally:
+        stop_workers(base, pool)
+
+
+def answer(run, request):
+    request_id, identifier, cli = request
+    record = run(identifier.decode("utf-8"), cli.decode("utf-8"))
+    return [request_id, str(record["return code"]).encode("ascii"), record["output"], record["input"],
+            "{:.6f}".format(record["duration"]).encode("ascii"), b"1" if record["truncated"] else b"0"]
+
+
+def serve(run, inp, out, workers=1):
+    """Answer framed (request id, identifier, cli) requests until stdin is closed.
+    With several workers, answers are written in completion order; the request id identifies them.
+    Once stdin is closed, nobody waits for the samples that are still queued, so they are dropped."""
+    lock = threading.Lock()
+    gone = threading.Event()
+
+    def respond(response):
+        with lock:
+            try:
+                write_frame(out, response)
+                out.flush()
+            except OSError:
+                # the host stopped reading; the requests it still sent are not wanted either
+                gone.set()
+
+    def fail(ex):
+        # like an exception in the serial case: the host sees the runner exit
+        logging.error("Sample execution failed: {}".format(ex))
+        os._exit(1)
+
+    base, pool = start_workers(worker_count(workers))
+    try:
+        while True:
+            request = read_frame(inp)
+            if request is None or gone.is_set():
+                break
+            if pool is None:
+                respond(answer(run, request))
             else:
-                self.__remainder = self.__remainder + line
+                pool.apply_async(answer, (run, request), callback=respond, error_callback=fail)
+    finally:
+        stop_workers(base, pool, cancel=True)
+
+
+def pop_workers(argv):
+    if "--workers" not in argv:
+        return 1
+    idx = argv.index("--workers")
+    workers = int(argv[idx + 1])
+    del argv[idx:idx + 2]
+    return workers
+
 
-    def close(self):
-        if 0 != len(self.__remainder):
-            self.__writer.write(self.__prefix + self.__remainder)
-            self.__remainder = ""
-        self.__writer.close()
+def pop_output_limit(argv):
+    """Remove `--output-limit BYTES` from argv and pass it on to the worker processes."""
+    if "--output-limit" not in argv:
+        return
+    idx = argv.index("--output-limit")
+    os.environ["ALHAZEN_OUTPUT_LIMIT"] = str(int(argv[idx + 1]))
+    del argv[idx:idx + 2]
 
-    def flush(self):
-        if 0 != len(self.__remainder):
-            self.__writer.write(self.__prefix + self.__remainder)
-            self.__remainder = ""
-        self.__writer.flush()
 
+def runner_main(run, argv, inp, out):
+    """The command line of a sample runner; see the usage below."""
+    num_workers = pop_workers(argv)
+    pop_output_limit(argv)
+    if 2 == len(argv) and '--serve' == argv[1]:
+        serve(run, inp, out, num_workers)
+        return 0
+    if 3 != len(argv) and 4 != len(argv):
+        print("Usage:", argv[0], "<identifier>", "<working_dir> [rm] [--workers N] [--output-limit BYTES]")
+        print("      ", argv[0], "--serve [--workers N] [--output-limit BYTES]")
+        return 1
+    execute_samples(run, argv[1], Path(argv[2]), out, num_workers)
+    if 4 == len(argv) and 'rm' == argv[3]:
+        shutil.rmtree(argv[2])
+    return 0
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import os
+import resource
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+from . import external_exec as execute, tracing
+from .docker import AbstractContainer
+
+# limits of the runner process, which all samples inherit
+default_limits = {
+    resource.RLIMIT_CORE: (0, 0),
+    resource.RLIMIT_FSIZE: (64 * 1024 * 1024, 64 * 1024 * 1024),
+    resource.RLIMIT_AS: (4 * 1024 ** 3, 4 * 1024 ** 3),
+}
+
+
+def local_subjects_dir() -> Path:
+    """
+    Return the host directory with the prebuilt bugs, set with the DBGBENCH_LOCAL_SUBJECTS environment variable.
+    It is laid out like /root/Desktop in the dbgbench images (grep1/grep.3c3bdace, grep1/grep/src/grep, ...).
+    Raises an AssertionError if it is not set or does not exist.
+    """
+    path = os.environ.get("DBGBENCH_LOCAL_SUBJECTS")
+    if path is None or not Path(path).is_dir():
+        raise AssertionError(
+            "Set DBGBENCH_LOCAL_SUBJECTS to the directory with the built subjects to run them without Docker."
+        )
+    return Path(path).resolve()
+
+
+class LocalContainer(AbstractContainer):
+    """
+    Runs prebuilt subjects directly on the host instead of in a Docker container.
+
+    Commands are plain host processes, so there is no `docker exec` / `docker cp` overhead.
+    Each instance gets a private working directory that takes the role of /root/Desktop
+    (scripts, samples, and the runner's scratch files go there), and the runner is started
+    with resource limits that every sample inherits.
+    """
+
+    backend = "local"
+
+    def __init__(self, subject: str, container_name: str, subjects_dir: Path = None, limits: dict = None):
+        """
+        :param subject: e.g. "grep", "find", etc.
+        :param subjects_dir: the directory with the prebuilt bugs; local_subjects_dir() by default.
+        :param limits: resource limits (resource.RLIMIT_* -> (soft, hard)) for all processes; default_limits by default.
+        """
+        super().__init__(image_name=subject, container_name=container_name)
+        self._subject = subject
+        self._subjects_dir = subjects_dir
+        self._limits = default_limits if limits is None else limits
+        self._workdir = None
+
+    @property
+    def subject(self) -> str:
+        """
+        Returns the subject (e.g. "grep") this container runs.
+        """
+        return self._subject
+
+    def create_image(self) -> None:
+        """
+        Nothing to build: the subjects must already be built in the subjects directory.
+        """
+        if self._subjects_dir is None:
+            self._subjects_dir = local_subjects_dir()
+
+    def start(self, username: str = "root") -> None:
+        self.create_image()
+        self._workdir = Path(tempfile.mkdtemp(prefix=f"{self._container_name}_"))
+        (self._workdir / "tmp").mkdir()
+        self._running = True
+        self.install_support_files(username)
+        logging.info(f"Local container '{self._container_name}' is running in {self._workdir}.")
+
+    def stop(self) -> None:
+        if self._running:
+            for daemon in self.daemons.values():
+                daemon.stop()
+            self.daemons.clear()
+            shutil.rmtree(self._workdir, ignore_errors=True)
+            self._running = False
+
+    def is_running(self) -> bool:
+        return self._running and self._workdir.exists()
+
+    def container_root_dir(self, username: str = "root") -> Path:
+        """
+        Return the private working directory, which replaces the home directory in the container.
+        """
+        return self._workdir
+
+    def shared_dir(self) -> Path:
+        """
+        Samples can be written right into the working directory.
+        """
+        return self._workdir
+
+    def container_shared_dir(self) -> Path:
+        return self._workdir
+
+    def exec_command(self, cmd: list[str], cwd: Path = None, interactive: bool = False) -> list[str]:
+        """
+        Commands run on the host as they are; see _process_args() for their environment.
+        """
+        return cmd
+
+    def _process_args(self, cwd: Path = None) -> dict:
+        env = os.environ.copy()
+        env["ALHAZEN_SUBJECTS_DIR"] = str(self._subjects_dir)
+        env["TMPDIR"] = str(self._workdir / "tmp")
+        return {
+            "cwd": str(cwd or self._workdir),
+            "env": env,
+            "preexec_fn": self._apply_limits,
+        }
+
+    def _apply_limits(self) -> None:
+        for limit, value in self._limits.items():
+            resource.setrlimit(limit, value)
+
+    def run_in_container(self, cmd: list[str], cwd: Path = None) -> bytes:
+        if not self._running:
+            raise RuntimeError("Cannot run command. Container is not running.")
+        return execute.check_output(cmd, **self._process_args(cwd))
+
+    def popen(self, cmd: list[str], cwd: Path = None) -> subprocess.Popen:
+        if not self._running:
+            raise RuntimeError("Cannot run command. Container is not running.")
+        return execute.popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, **self._process_args(cwd))
+
+    async def popen_async(self, cmd: list[str], cwd: Path = None) -> asyncio.subprocess.Process:
+        if not self._running:
+            raise RuntimeError("Cannot run command. Container is not running.")
+        return await asyncio.create_subprocess_exec(*execute.make_cmd(cmd), stdin=subprocess.PIPE,
+                                                    stdout=subprocess.PIPE, **self._process_args(cwd))
+
+    def copy_into(self, local_paths: list[Path], dst_path: Path, username: str = "root") -> None:
+        if not self._running:
+            raise RuntimeError("Cannot copy files. Container is not running.")
+        with tracing.span("copy_into", files=len(local_paths)):
+            dst_path = Path(dst_path)
+            dst_path.mkdir(parents=True, exist_ok=True)
+            for lp in local_paths:
+                if lp.is_dir():
+                    shutil.copytree(lp, dst_path / lp.name, dirs_exist_ok=True)
+                else:
+                    shutil.copy2(lp, dst_path / lp.name)
+
+    def check_output(self, cmd, cwd=None):
+        if not self._running:
+            raise AssertionError("Machine is stopped already.")
+        return self.run_in_container(cmd, cwd)
@@ -0,0 +1,144 @@
+"""
+Delta debugging (ddmin) of failing grep samples.
+
+A grep sample `printf '<input>' | <env> timeout <n>s grep <arguments>` is shrunk along two dimensions:
+the grep arguments (as split by helpers.split_cli) and the printf'ed input (split into characters,
+keeping escape sequences such as `\\n` or `\\x41` whole). The dimensions are reduced in turn until
+neither shrinks any further.
+
+Each ddmin round tests all subsets and complements of the current partition at once, as one
+execute_samples batch, so a round costs one container round trip instead of one per candidate:
+
+    with Grep3c3bdace() as bug:
+        smallest = Minimizer(bug).minimize(cli)
+"""
+import re
+from typing import Callable, Optional
+
+from dbgbench.framework import helpers, tracing
+from dbgbench.framework.base import BaseDbgbenchBug
+from dbgbench.framework.oraclesresult import OracleResult
+
+printf_unit = re.compile(r"\\(?:x[0-9a-fA-F]{1,2}|u[0-9a-fA-F]{1,4}|U[0-9a-fA-F]{1,8}|[0-7]{1,3}|.)|%%|.", re.DOTALL)
+
+
+class GrepSample:
+    """
+    A grep command line, split into the printf'ed input, the part up to and including `grep`, and the arguments.
+    """
+
+    def __init__(self, payload: Optional[str], program: str, arguments: list[str]):
+        self.payload = payload
+        self.program = program
+        self.arguments = arguments
+
+    @classmethod
+    def parse(cls, cli: str) -> "GrepSample":
+        match = helpers.input_pattern.match(cli)
+        start = 0 if match is None else match.end()
+        program = helpers.grep_pattern.search(cli, start)
+        if program is None:
+            raise AssertionError(f"Not a grep command line: {cli}")
+        payload = None if match is None else match.group(1)
+        return cls(payload, cli[start:program.end()], list(helpers.split_cli(cli[program.end():])))
+
+    def units(self) -> list[str]:
+        """
+        :return the printf'ed input as a list of characters and escape sequences.
+        """
+        return printf_unit.findall(self.payload or "")
+
+    def with_arguments(self, arguments: list[str]) -> "GrepSample":
+        return GrepSample(self.payload, self.program, arguments)
+
+    def with_units(self, units: list[str]) -> "GrepSample":
+        return GrepSample("".join(units), self.program, self.arguments)
+
+    def __str__(self):
+        prefix = "" if self.payload is None else f"printf '{self.payload}' |"
+        return prefix + self.program + " ".join(self.arguments)
+
+
+class Minimizer:
+    """
+    Shrinks grep samples while they keep producing the same oracle result.
+
+    Every command line that was executed is remembered with its result, so no candidate runs twice,
+    neither within one minimization nor across several minimize() calls on the same Minimizer.
+    """
+
+    def __init__(self, bug: BaseDbgbenchBug, target: OracleResult = OracleResult.FAILING):
+        """
+        :param bug: the bug to run the candidates on.
+        :param target: the oracle result every reduced sample must still produce.
+        """
+        self._bug = bug
+        self.target = target
+        self.results: dict[str, OracleResult] = {}
+        self.rounds = 0
+        self.executed = 0
+
+    def minimize(self, cli: str) -> str:
+        """
+        :return a 1-minimal version of the command line: removing any single argument or
+                input character of it no longer yields the target result.
+        """
+        if self.target != self.test([cli])[0]:
+            raise AssertionError(f"The sample does not produce {self.target}: {cli}")
+        sample = GrepSample.parse(cli)
+        with tracing.span("minimize", bug=self._bug.subject()) as span:
+            size = None
+            while size != (len(sample.arguments), len(sample.units())):
+                size = (len(sample.arguments), len(sample.units()))
+                sample = sample.with_arguments(self.ddmin(sample.arguments, sample.with_arguments))
+                units = sample.units()
+                reduced = self.ddmin(units, sample.with_units)
+                if len(reduced) < len(units):
+                    sample = sample.with_units(reduced)
+            span.set(rounds=self.rounds, executed=self.executed)
+        return str(sample)
+
+    def ddmin(self, items: list, compose: Callable[[list], GrepSample]) -> list:
+        """
+        Reduce `items` to a 1-minimal subset for which `compose(subset)` still yields the target result;
+        `compose(items)` must yield it.
+        """
+        granularity = 2
+        while 2 <= len(items):
+            granularity = min(granularity, len(items))
+            chunks = self._split(items, granularity)
+            subsets = chunks if 2 < granularity else []
+            complements = [[item for other in chunks if other is not chunk for item in other] for chunk in chunks]
+            candidates = subsets + complements
+            results = self.test([str(compose(candidate)) for candidate in candidates])
+            reduced = next((index for index, result in enumerate(results) if self.target == result), None)
+            if reduced is None:
+                if len(items) <= granularity:
+                    break
+                granularity = 2 * granularity
+            elif reduced < len(subsets):
+                items, granularity = candidates[reduced], 2
+            else:
+                items, granularity = candidates[reduced], max(granularity - 1, 2)
+        return items
+
+    def test(self, clis: list[str]) -> list[OracleResult]:
+        """
+        :return the oracle results of the command lines; those not seen before are executed as one batch.
+        """
+        missing = list(dict.fromkeys(cli for cli in clis if cli not in self.results))
+        if 0 != len(missing):
+            self.rounds += 1
+            self.executed += len(missing)
+            self.results.update(self._bug.execute_samples(missing))
+        return [self.results[cli] for cli in clis]
+
+    @staticmethod
+    def _split(items: list, parts: int) -> list[list]:
+        size, rest = divmod(len(items), parts)
+        chunks, start = [], 0
+        for part in range(parts):
+            end = start + size + (1 if part < rest else 0)
+            chunks.append(items[start:end])
+            start = end
+        return chunks
@@ -13,6 +13,30 @@ class Oracle(metaclass=ABCMeta):
     def generate_oracle_data(self, bug, cli):
         pass
 
+    def name(self):
+        """:return a name that identifies this oracle, including its configuration."""
+        return type(self).__name__
+
+    def apply_command(self, bug, row, command):
+        """Like apply_oracle, but with the row's cli already parsed into a ParsedCommand.
+        Oracles that inspect the command line override this instead of apply_oracle."""
+        return self.apply_oracle(bug, row)
+
+    def apply_batch(self, bug, rows):
+        """Apply the oracle to all rows of a batch, tokenizing every cli only once."""
+        return [self.apply_command(bug, row, ParsedCommand(row["line"])) for row in rows]
+
+
+class CommandOracle(Oracle):
+    """Base class for oracles that need the parsed command line."""
+
+    def apply_oracle(self, bug, row):
+        return self.apply_command(bug, row, ParsedCommand(row["line"]))
+
+    @abstractmethod
+    def apply_command(self, bug, row, command):
+        pass
+
 
 def contains_option(line, option):
     return option in line.split(" ")
@@ -40,24 +64,53 @@ def find_arg_to(line, options):
             pass
 
 
+class ParsedCommand:
+    """A cli split into its space separated tokens once, with the set of options precomputed.
+    The queries have the same semantics as the contains_* functions above."""
+
+    __slots__ = ("line", "tokens", "options")
+
+    def __init__(self, line):
+        self.line = line
+        self.tokens = line.split(" ")
+        self.options = frozenset(self.tokens)
+
+    def has_option(self, option):
+        return option in self.options
+
+    def has_one_of(self, options):
+        return not self.options.isdisjoint(options)
+
+    def has_option_with_arg(self, search):
+        return any(token.startswith(search) for token in self.tokens)
+
+    def args_to(self, options):
+        for opt in options:
+            if opt in self.options:
+                idx = self.tokens.index(opt)
+                yield self.tokens[idx + 1]
+
+
 name_pattern = re.compile(b"^[^:]+:", re.MULTILINE)
 null_name_pattern = re.compile(b"^[^\\x00]+\\x00", re.MULTILINE)
 count_pattern = re.compile(b"^ *[0-9]+\t?\x08?[:\\-]", re.MULTILINE)
-null_data_options = ['-z', '--null-data']
-supress_output_options = ["-c", "--count",
-                          "-L", "--files-without-match",
-                          "-l", "--files-with-matches",
-                          "-q", "--quiet", "--silent"]
+null_data_options = frozenset(['-z', '--null-data'])
+supress_output_options = frozenset(["-c", "--count",
+                                    "-L", "--files-without-match",
+                                    "-l", "--files-with-matches",
+                                    "-q", "--quiet", "--silent"])
+no_full_lines_options = frozenset(['-L', '-l', '-o', '--only-matching'])
+null_name_options = frozenset(["--null", "-Z"])
 color_pattern = re.compile(b'\x1b\\[[01]*;[0-9][0-9]m')
 control_pattern = re.compile(b'\x1b\\[([0-9][0-9])?[Km]')
-output_line_number_options = ["-n", "--line-number",
-                              "-T",
-                              "--null", "-Z"]
-output_byte_number_options = ["--byte-offset", "-b", "-u", "--unix-byte-offsets"]
-output_line_name_options = ["-H", "--with-filename"]
+output_line_number_options = frozenset(["-n", "--line-number",
+                                        "-T",
+                                        "--null", "-Z"])
+output_byte_number_options = frozenset(["--byte-offset", "-b", "-u", "--unix-byte-offsets"])
+output_line_name_options = frozenset(["-H", "--with-filename"])
 
 
-class GrepWrapper(Oracle):
+class GrepWrapper(CommandOracle):
 
     def __init__(self, delegate: Oracle):
         self.__delegate = delegate
@@ -65,10 +118,13 @@ class GrepWrapper(Oracle):
     def generate_oracle_data(self, bug, cli):
         return self.__delegate.generate_oracle_data(bug, cli)
 
-    def apply_oracle(self, bug, row):
-        if "Grep terminated" not in row["output"]:
+    def name(self):
+        return "{}({})".format(type(self).__name__, self.__delegate.name())
+
+    def apply_command(self, bug, row, command):
+        if b"Grep terminated" not in to_bytes(row["output"]):
             return OracleResult.UNDEFINED
-        return self.__delegate.apply_oracle(bug, row)
+        return self.__delegate.apply_command(bug, row, command)
 
 
 class OutputSubstringOracle(Oracle):
@@ -79,6 +135,9 @@ class OutputSubstringOracle(Oracle):
     def generate_oracle_data(self, bug, cli):
         return ""
 
+    def name(self):
+        return "{}({!r})".format(type(self).__name__, self.__substr)
+
     def apply_oracle(self, bug, row):
         if self.__substr in to_bytes(row["output"]):
             return OracleResult.FAILING
@@ -124,50 +183,64 @@ class HangOracle(Oracle):
         return OracleResult.PASSING
 
 
+
+class CrashOrHangOracle(Oracle):
+    """The rc_oracle considers a run bug-indicating if
+        the return code is 139 or 134 (crash) or 124 (timeout triggered)"""
+
+    def generate_oracle_data(self, bug, cli):
+        return ""
+
+    def apply_oracle(self, bug, row):
+        if row["return code"] in (124, 134, 139):
+            return OracleResult.FAILING
+        return OracleResult.PASSING
+
 def to_bytes(inp):
     if inp is None:
         return None
     if isinstance(inp, str):
-        if inp.startswith("b'") or inp.startswith('b"'):
-            inp = eval(inp)
-        else:
-            inp = inp.encode('utf-8')
+        inp = inp.encode('utf-8')
     return inp
 
 
-def clear_grep(line, output):
+def clear_grep(command, output):
+    """Remove everything grep adds to the matched text (file names, colors, counts).
+    :param command: the cli, as a string or a ParsedCommand"""
+    if isinstance(command, str):
+        command = ParsedCommand(command)
     output = output.replace(b'Binary file (standard input) matches\n', b'')
     output = output.replace(b'\nGrep terminated\n', b'')
-    if contains_one_of_option(line, output_line_name_options):
-        if contains_one_of_option(line, ["--null", "-Z"]):
-            output = re.sub(null_name_pattern, b"", output)
+    if command.has_one_of(output_line_name_options):
+        if command.has_one_of(null_name_options):
+            output = null_name_pattern.sub(b"", output)
         else:
-            output = re.sub(name_pattern, b"", output)
-    if "--color" in line or '--colour' in line:
-        output = re.sub(color_pattern, b'', output)
-        output = re.sub(control_pattern, b'', output)
-    if contains_one_of_option(line, output_line_number_options):
-        output = re.sub(count_pattern, b"", output)
-    if contains_one_of_option(line, output_byte_number_options):
-        output = re.sub(count_pattern, b"", output)
+            output = name_pattern.sub(b"", output)
+    if "--color" in command.line or '--colour' in command.line:
+        output = color_pattern.sub(b'', output)
+        output = control_pattern.sub(b'', output)
+    if command.has_one_of(output_line_number_options):
+        output = count_pattern.sub(b"", output)
+    if command.has_one_of(output_byte_number_options):
+        output = count_pattern.sub(b"", output)
     return output
 
 
-class NoNewTextOracle(Oracle):
+class NoNewTextOracle(CommandOracle):
     """grep cannot generate new characters.
     So, if there is a character in the output that does not occur in the input, that is a bug."""
 
-    def apply_oracle(self, bug, row):
+    def apply_command(self, bug, row, command):
         if row["output"] is None:
             #  return OracleResult.UNDEFINED
             return OracleResult.PASSING
-        if contains_one_of_option(row["line"], supress_output_options):
+        if command.has_one_of(supress_output_options):
             #  return OracleResult.UNDEFINED
             return OracleResult.PASSING
         if row["return code"] not in [0, 1]:
             #  return OracleResult.UNDEFINED
             return OracleResult.PASSING
-        if contains_option_with_arg(row["line"], "\'--label="):
+        if command.has_option_with_arg("\'--label="):
             return OracleResult.PASSING
 
         inp = to_bytes(row["input"])
@@ -175,41 +248,42 @@ class NoNewTextOracle(Oracle):
             #  return OracleResult.UNDEFINED
             return OracleResult.PASSING
 
-        output = clear_grep(row["line"], to_bytes(row["output"]))
+        output = clear_grep(command, to_bytes(row["output"]))
         if b'grep: Invalid back reference\n' in output:
             return OracleResult.PASSING
-        for c in output[:-1]:  # grep always adds a trailing newline, which we don't want to compare
-            if c not in inp:
-                return OracleResult.FAILING
+        # grep always adds a trailing newline, which we don't want to compare;
+        # deleting all input bytes leaves exactly the new ones
+        if 0 != len(output[:-1].translate(None, inp)):
+            return OracleResult.FAILING
         return OracleResult.PASSING
 
 
-class LineOracle(Oracle):
+class LineOracle(CommandOracle):
 
-    def apply_oracle(self, bug, row):
+    def apply_command(self, bug, row, command):
         """grep always generates entire lines of output."""
         if row["output"] is None:
             #  return OracleResult.UNDEFINED
             return OracleResult.PASSING
-        if contains_one_of_option(row["line"], ['-L', '-l', '-o', '--only-matching']):
+        if command.has_one_of(no_full_lines_options):
             #  return OracleResult.UNDEFINED
             return OracleResult.PASSING
-        if contains_one_of_option(row["line"], supress_output_options):
+        if command.has_one_of(supress_output_options):
             #  return OracleResult.UNDEFINED
             return OracleResult.PASSING
         if row["return code"] not in [0, 1]:
             #  return OracleResult.UNDEFINED
             return OracleResult.PASSING
-        if contains_option_with_arg(row["line"], "\'--label="):
+        if command.has_option_with_arg("\'--label="):
             return OracleResult.PASSING
 
         inp = to_bytes(row["input"])
         if inp is None:
             #  return OracleResult.UNDEFINED
             return OracleResult.PASSING
-        inp = inp.splitlines()
+        inp = set(inp.splitlines())
 
-        output = clear_grep(row["line"], to_bytes(row["output"]))
+        output = clear_grep(command, to_bytes(row["output"]))
         if b'grep: Invalid back reference\n' in output:
             return OracleResult.PASSING
         for outline in output[:-1].splitlines():  # grep always adds a new line or separator in the end
@@ -218,14 +292,14 @@ class LineOracle(Oracle):
         return OracleResult.PASSING
 
 
-class NoNewLineOracle(Oracle):
+class NoNewLineOracle(CommandOracle):
 
     def generate_oracle_data(self, bug, cli):
         return ""
 
-    def apply_oracle(self, bug, row):
+    def apply_command(self, bug, row, command):
         end = b'\n'[0]
-        if contains_one_of_option(row['line'], null_data_options):
+        if command.has_one_of(null_data_options):
             end = b'\x00'[0]
         output = row["output"]
         output = to_bytes(output).replace(b"\nGrep terminated\n", b"")
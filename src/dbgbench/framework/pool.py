@@ -0,0 +1,130 @@
+import atexit
+import logging
+import subprocess
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from dbgbench.framework import tracing
+from dbgbench.framework.docker import AbstractContainer, DBGBenchContainer
+from dbgbench.framework.local import LocalContainer
+
+# container classes by backend name
+backends = {
+    DBGBenchContainer.backend: DBGBenchContainer,
+    LocalContainer.backend: LocalContainer,
+}
+
+
+class ContainerPool:
+    """
+    Process-wide pool of warm dbgbench containers, keyed by backend and subject.
+
+    Bugs lease a running container instead of starting their own and hand it back
+    when they are done, so the `docker run` / `docker kill` / `docker rm` round trip
+    is only paid once per container rather than once per bug instance.
+    """
+
+    def __init__(self, max_size: int = 4, idle_timeout: float = 300.0):
+        """
+        :param max_size: maximum number of idle containers kept warm per subject.
+                         Released containers beyond this limit are stopped.
+        :param idle_timeout: seconds an idle container may stay in the pool before it is evicted.
+        """
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._idle = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def lease(self, subject: str, backend: str = "docker") -> AbstractContainer:
+        """
+        Return a running container for the given subject (e.g. "grep") and backend (see `backends`).
+        Idle containers are health checked before they are handed out; if none is available
+        a new one is started.
+        """
+        for container in self._evict_expired():
+            container.stop()
+        while True:
+            with self._lock:
+                if not self._idle[backend, subject]:
+                    break
+                container, _ = self._idle[backend, subject].pop()
+            if container.is_running():
+                logging.info(f"Leasing warm container '{container.name}'.")
+                return container
+            logging.info(f"Discarding unhealthy container '{container.name}'.")
+            _stop_quietly(container)
+
+        with tracing.span("container_start", subject=subject, backend=backend):
+            container = backends[backend](subject, f"dbgbench_{subject}_{uuid.uuid4()}")
+            container.start(username="root")
+        return container
+
+    def release(self, container: AbstractContainer, discard: bool = False) -> None:
+        """
+        Hand a leased container back to the pool.
+        If `discard` is set or the pool is full, the container is stopped instead.
+        """
+        expired = self._evict_expired()
+        with self._lock:
+            idle = self._idle[container.backend, container.subject]
+            keep = not discard and len(idle) < self.max_size
+            if keep:
+                idle.append((container, time.monotonic()))
+        if not keep:
+            expired.append(container)
+        for stale in expired:
+            stale.stop()
+
+    def clear(self) -> None:
+        """
+        Stop all idle containers.
+        """
+        with self._lock:
+            containers = [c for idle in self._idle.values() for c, _ in idle]
+            self._idle.clear()
+        for container in containers:
+            container.stop()
+
+    def _evict_expired(self) -> list[AbstractContainer]:
+        """
+        Remove containers that have been idle for longer than `idle_timeout` and return them.
+        The caller is responsible for stopping them outside the lock.
+        """
+        deadline = time.monotonic() - self.idle_timeout
+        expired = []
+        with self._lock:
+            for key, idle in self._idle.items():
+                expired += [c for c, released in idle if released < deadline]
+                self._idle[key] = [(c, released) for c, released in idle if released >= deadline]
+        return expired
+
+
+def _stop_quietly(container: AbstractContainer) -> None:
+    """
+    Stop a container that may already have died on its own.
+    """
+    try:
+        container.stop()
+    except subprocess.CalledProcessError:
+        logging.exception(f"Could not stop container '{container.name}'")
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def default_pool() -> ContainerPool:
+    """
+    Return the process-wide container pool, creating it on first use; safe to call from several threads.
+    All idle containers are stopped when the interpreter exits.
+    """
+    global _default_pool
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                pool = ContainerPool()
+                atexit.register(pool.clear)
+                _default_pool = pool
+    return _default_pool
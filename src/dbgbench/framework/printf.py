@@ -0,0 +1,216 @@
+"""
+A bash-compatible interpreter for the format string of a `printf '...'` command,
+as it starts every grep sample: `printf 'input' | ... grep ...`.
+
+Evaluating the format in Python saves spawning a bash process per sample. Since printf gets
+no arguments in the samples, every conversion formats an empty string or zero.
+The output matches bash's printf builtin in a UTF-8 locale, including its quirks
+(e.g. an unknown escape like `\\c` is printed as is). Features that are not modelled,
+such as `%(...)T`, raise UnsupportedFormat; extract_input() then falls back to bash.
+
+This module is also copied into the containers, so it must run on their older Python version.
+"""
+import logging
+import re
+import subprocess
+
+from . import external_exec as execute
+from .helpers import input_pattern
+
+plain_text = re.compile(r"[^\\%]+")
+
+simple_escapes = {
+    "a": b"\x07", "b": b"\x08", "e": b"\x1b", "E": b"\x1b", "f": b"\x0c", "n": b"\n",
+    "r": b"\r", "t": b"\t", "v": b"\x0b", "\\": b"\\", "'": b"'", '"': b'"', "?": b"?",
+}
+octal_digits = "01234567"
+hex_digits = "0123456789abcdefABCDEF"
+flag_chars = "#'-+ 0"
+length_modifiers = "hjlLtz"
+
+
+class PrintfError(Exception):
+    """bash's printf rejects the format (and exits with a non-zero status)."""
+
+
+class UnsupportedFormat(Exception):
+    """The format uses a feature this interpreter does not model; evaluate it with bash instead."""
+
+
+def printf(fmt):
+    """
+    :return the bytes that bash's `printf '<fmt>'` writes to stdout.
+    :raises PrintfError if bash would reject the format, UnsupportedFormat if it cannot be interpreted here.
+    """
+    if fmt.startswith("-") and fmt != "-":
+        # bash parses the format as an option (and there is no format left)
+        raise PrintfError("{}: invalid option".format(fmt))
+    out = bytearray()
+    pos = 0
+    while pos < len(fmt):
+        match = plain_text.match(fmt, pos)
+        if match is not None:
+            out += match.group().encode("utf-8")
+            pos = match.end()
+        elif "\\" == fmt[pos]:
+            pos = _escape(fmt, pos + 1, out)
+        else:
+            pos = _conversion(fmt, pos + 1, out)
+    return bytes(out)
+
+
+def extract_input(cli):
+    """
+    :return the bytes the printf prefix of a grep sample pipes into grep,
+    or None if the sample has no such prefix or printf fails.
+    Formats the interpreter does not model are evaluated by bash.
+    """
+    match = input_pattern.match(cli)
+    if match is None:
+        return None
+    value = match.group(1)
+    try:
+        return printf(value)
+    except PrintfError:
+        logging.warning("printf rejects the format of {}".format(cli))
+        return None
+    except UnsupportedFormat:
+        pass
+    script = "printf '{}'\n".format(value)
+    try:
+        return execute.check_output(["bash", "-c", script], stderr=subprocess.STDOUT, env={"LANG": "C.UTF-8"})
+    except subprocess.CalledProcessError as ex:
+        logging.exception("{} for {} (extracted from: {})".format(ex.output, script, cli))
+        return None
+
+
+def _digits(fmt, pos, alphabet, limit):
+    end = pos
+    while end < len(fmt) and end - pos < limit and fmt[end] in alphabet:
+        end += 1
+    return end
+
+
+def _escape(fmt, pos, out):
+    """Interpret the escape after the backslash at pos - 1 and return the position after it."""
+    if pos == len(fmt):
+        out += b"\\"
+        return pos
+    c = fmt[pos]
+    if c in simple_escapes:
+        out += simple_escapes[c]
+        return pos + 1
+    if c in octal_digits:
+        end = _digits(fmt, pos, octal_digits, 3)
+        out.append(int(fmt[pos:end], 8) & 0xFF)
+        return end
+    if "x" == c or "u" == c or "U" == c:
+        end = _digits(fmt, pos + 1, hex_digits, {"x": 2, "u": 4, "U": 8}[c])
+        if end == pos + 1:
+            # no digits: bash complains, prints the backslash, and goes on with the letter
+            out += b"\\"
+            return pos
+        value = int(fmt[pos + 1:end], 16)
+        if "x" == c:
+            out.append(value)
+        elif value > 0x10FFFF:
+            raise UnsupportedFormat("\\{} escape beyond unicode: {}".format(c, fmt[pos + 1:end]))
+        else:
+            out += chr(value).encode("utf-8", "surrogatepass")
+        return end
+    # unknown escapes are printed as they are
+    out += b"\\"
+    return pos
+
+
+def _conversion(fmt, pos, out):
+    """Interpret the conversion after the % at pos - 1 and return the position after it."""
+    if pos < len(fmt) and "%" == fmt[pos]:
+        out += b"%"
+        return pos + 1
+    start = pos
+    while pos < len(fmt) and fmt[pos] in flag_chars:
+        pos += 1
+    flags = fmt[start:pos]
+    # a '*' takes the width or precision from the (missing) argument, i.e., 0
+    if pos < len(fmt) and "*" == fmt[pos]:
+        width = 0
+        pos += 1
+    else:
+        end = _digits(fmt, pos, "0123456789", len(fmt))
+        width = int(fmt[pos:end]) if end > pos else 0
+        pos = end
+    precision = None
+    if pos < len(fmt) and "." == fmt[pos]:
+        pos += 1
+        if pos < len(fmt) and "*" == fmt[pos]:
+            precision = 0
+            pos += 1
+        else:
+            end = _digits(fmt, pos, "0123456789", len(fmt))
+            precision = int(fmt[pos:end]) if end > pos else 0
+            pos = end
+    while pos < len(fmt) and fmt[pos] in length_modifiers:
+        pos += 1
+    if pos == len(fmt):
+        raise PrintfError("`%{}': missing format character".format(fmt[start:pos]))
+    out += _format(fmt[pos], flags, width, precision).encode("utf-8")
+    return pos + 1
+
+
+def _pad(text, flags, width):
+    if "-" in flags:
+        return text.ljust(width)
+    return text.rjust(width)
+
+
+def _sign(flags):
+    if "+" in flags:
+        return "+"
+    if " " in flags:
+        return " "
+    return ""
+
+
+def _format(conversion, flags, width, precision):
+    """Format the missing argument (an empty string, or zero) the way bash does."""
+    if conversion in "diouxX":
+        if precision is None:
+            digits = "0"
+        else:
+            digits = "0" * precision
+        if "o" == conversion and "#" in flags and not digits:
+            digits = "0"
+        sign = _sign(flags) if conversion in "di" else ""
+        if "0" in flags and "-" not in flags and precision is None:
+            return sign + digits.rjust(width - len(sign), "0")
+        return _pad(sign + digits, flags, width)
+    if conversion in "eEfFgG":
+        spec = "%" + flags.replace("'", "") + str(width)
+        if precision is not None:
+            spec += "." + str(precision)
+        return (spec + conversion) % 0.0
+    if conversion in "aA":
+        mantissa = "0"
+        if precision:
+            mantissa += "." + "0" * precision
+        elif "#" in flags:
+            mantissa += "."
+        sign = _sign(flags)
+        prefix, exponent = ("0x", "p+0") if "a" == conversion else ("0X", "P+0")
+        if "0" in flags and "-" not in flags:
+            zeros = max(0, width - len(sign) - len(prefix) - len(mantissa) - len(exponent))
+            return sign + prefix + "0" * zeros + mantissa + exponent
+        return _pad(sign + prefix + mantissa + exponent, flags, width)
+    if conversion in "sbq":
+        text = "''" if "q" == conversion else ""
+        if precision is not None:
+            text = text[:precision]
+        return _pad(text, flags, width)
+    if "c" == conversion:
+        return _pad("\0", flags, width)
+    if "n" == conversion:
+        return ""
+    if "(" == conversion:
+        raise UnsupportedFormat("%(...)T time formats are not supported")
+    raise PrintfError("`{}': invalid format character".format(conversion))
@@ -0,0 +1,102 @@
+from typing import Iterable, Iterator
+
+
+class ResultRow:
+    """
+    A view on one row of a ResultBatch. Supports the `row["column"]` access the oracles use.
+    """
+
+    __slots__ = ("_batch", "_index")
+
+    def __init__(self, batch: "ResultBatch", index: int):
+        self._batch = batch
+        self._index = index
+
+    def __getitem__(self, column: str):
+        return self._batch.column(column)[self._index]
+
+    def get(self, column: str, default=None):
+        if column not in ResultBatch.columns:
+            return default
+        return self[column]
+
+    def to_dict(self) -> dict:
+        return {column: self[column] for column in ResultBatch.columns}
+
+    def __repr__(self):
+        return f"ResultRow({self.to_dict()!r})"
+
+
+class ResultBatch:
+    """
+    Column-oriented results of one execution batch.
+
+    Each column is a plain list, so building a batch and running the oracles over it never
+    touches pandas; to_pandas() converts it into a DataFrame when one is needed for analysis.
+    """
+
+    columns = ("file", "line", "subject", "return code", "output", "input", "duration", "truncated", "oracle")
+    __slots__ = ("file", "line", "subject", "return_code", "output", "input", "duration", "truncated", "oracle")
+
+    def __init__(self):
+        for attribute in self.__slots__:
+            setattr(self, attribute, [])
+
+    @staticmethod
+    def _attribute(column: str) -> str:
+        return column.replace(" ", "_")
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "ResultBatch":
+        batch = cls()
+        for record in records:
+            batch.append(record)
+        return batch
+
+    @classmethod
+    def concat(cls, batches: Iterable["ResultBatch"]) -> "ResultBatch":
+        result = cls()
+        for batch in batches:
+            result.extend(batch)
+        return result
+
+    def append(self, record: dict) -> None:
+        """
+        Add one row; missing columns are set to None.
+        """
+        for column in self.columns:
+            getattr(self, self._attribute(column)).append(record.get(column))
+
+    def extend(self, other: "ResultBatch") -> None:
+        for attribute in self.__slots__:
+            getattr(self, attribute).extend(getattr(other, attribute))
+
+    def replace(self, indices: list[int], other: "ResultBatch") -> None:
+        """
+        Replace the rows at the given indices by the rows of `other`, in order.
+        """
+        for attribute in self.__slots__:
+            mine, theirs = getattr(self, attribute), getattr(other, attribute)
+            for index, value in zip(indices, theirs):
+                mine[index] = value
+
+    def column(self, column: str) -> list:
+        return getattr(self, self._attribute(column))
+
+    def __len__(self):
+        return len(self.line)
+
+    def __getitem__(self, index: int) -> ResultRow:
+        if not -len(self) <= index < len(self):
+            raise IndexError(index)
+        return ResultRow(self, index % len(self))
+
+    def __iter__(self) -> Iterator[ResultRow]:
+        return (ResultRow(self, index) for index in range(len(self)))
+
+    def to_pandas(self):
+        """
+        :return the batch as a pandas DataFrame with one column per result column.
+        """
+        import pandas as pd
+        return pd.DataFrame({column: self.column(column) for column in self.columns}, columns=list(self.columns))
@@ -0,0 +1,50 @@
+import math
+from typing import Iterable
+
+TIMEOUT_RETURN_CODE = 124
+
+
+class Timeouts:
+    """
+    The timeouts a subject's samples run with, in two tiers.
+
+    Every sample first runs with the `short` timeout, which is enough for any input that does not hang.
+    Only the samples that time out are run again with the `full` timeout, which decides
+    whether they really hang. Hanging inputs thus cost `short + full` instead of `full`,
+    but all others finish (or are cut off) after `short`.
+    """
+
+    def __init__(self, short: float, full: float):
+        if not 0 < short <= full:
+            raise AssertionError(f"Invalid timeouts: short {short}s, full {full}s.")
+        self.short = short
+        self.full = full
+
+    @classmethod
+    def calibrate(cls, durations: Iterable[float], full: float, quantile: float = 0.99, factor: float = 5.0,
+                  minimum: float = 0.05) -> "Timeouts":
+        """
+        Derive the timeouts from the runtimes of benign inputs.
+
+        :param durations: runtimes (in seconds) of benign inputs on the subject.
+        :param full: the timeout the samples were written with, e.g. 0.5 for `timeout 0.5s`.
+        :param quantile: the quantile of the durations that counts as the subject's normal runtime.
+        :param factor: the short timeout is `factor` times the normal runtime (but at least `minimum`).
+                       If that exceeds `full`, e.g. on a loaded host, the full timeout is raised to it,
+                       so that slow benign inputs are not taken for hangs.
+        """
+        ordered = sorted(durations)
+        if 0 == len(ordered):
+            raise AssertionError("Cannot calibrate timeouts without durations.")
+        normal = ordered[min(len(ordered) - 1, math.ceil(quantile * len(ordered)) - 1)]
+        short = max(minimum, factor * normal)
+        return cls(short, max(full, short))
+
+    def tiered(self) -> bool:
+        return self.short < self.full
+
+    def __eq__(self, other):
+        return isinstance(other, Timeouts) and (self.short, self.full) == (other.short, other.full)
+
+    def __repr__(self):
+        return f"Timeouts(short={self.short:g}, full={self.full:g})"
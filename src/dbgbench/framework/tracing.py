@@ -0,0 +1,229 @@
+"""
+Opt-in timing of the execution pipeline.
+
+The pipeline wraps each phase (leasing and starting containers, copying samples, starting the runner,
+running a batch, decoding records, applying the oracle, cache lookups) in a span:
+
+    with tracing.span("oracle", samples=len(rows)):
+        ...
+
+While tracing is off, span() returns a shared no-op object, so the instrumentation costs a global lookup
+and a function call per phase. Turn it on around the code of interest:
+
+    with tracing.tracing(callback=print) as tracer:
+        bug.execute_samples(inputs)
+    tracer.export_chrome_trace("trace.json")  # open in chrome://tracing or https://ui.perfetto.dev
+
+In the trace, every thread and every asyncio task gets its own tracks. Spans that are open at the same time
+without nesting, such as a runner batch that stays open while its caller consumes the results of a stream,
+are put on separate tracks of their thread or task.
+"""
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+
+class Span:
+    """
+    One timed phase: its name, start and end (in perf_counter nanoseconds), thread, asyncio task
+    (an id, None outside of tasks), and arguments such as sample counts.
+    """
+
+    __slots__ = ("name", "start", "end", "thread", "task", "args")
+
+    def __init__(self, name: str, start: int, end: int, thread: int, args: dict, task: int = None):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.thread = thread
+        self.task = task
+        self.args = args
+
+    @property
+    def duration(self) -> float:
+        """
+        :return the duration in seconds.
+        """
+        return (self.end - self.start) / 1e9
+
+    def __repr__(self):
+        return f"Span({self.name!r}, {self.duration * 1000:.3f} ms, {self.args!r})"
+
+
+class Tracer:
+    """
+    Collects the spans recorded while tracing is enabled and passes each of them to the callback.
+    """
+
+    def __init__(self, callback: Callable[[Span], None] = None):
+        self.callback = callback
+        self.spans = []
+        self.origin = time.perf_counter_ns()
+        self._lock = threading.Lock()
+
+    def record(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+        if self.callback is not None:
+            self.callback(span)
+
+    def to_chrome_trace(self) -> dict:
+        """
+        :return the spans as complete events in the Chrome trace-event format, with one track (tid) per thread
+                or task and lane (see _lanes()), named by metadata events.
+        """
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self.spans)
+        groups = {}
+        for span in spans:
+            groups.setdefault((span.thread, span.task), []).append(span)
+        events = []
+        track_ids = itertools.count(1)
+        for (thread, task), group in groups.items():
+            for lane, lane_spans in enumerate(_lanes(group)):
+                # the first track of a thread keeps the thread's id
+                tid = thread if task is None and 0 == lane else next(track_ids)
+                name = f"thread {thread}" if task is None else f"thread {thread} task {task:x}"
+                events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                               "args": {"name": name if 0 == lane else f"{name} ({lane + 1})"}})
+                events += [{
+                    "name": span.name,
+                    "cat": "dbgbench",
+                    "ph": "X",
+                    "ts": (span.start - self.origin) / 1000,
+                    "dur": (span.end - span.start) / 1000,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": span.args,
+                } for span in lane_spans]
+        return {
+            "displayTimeUnit": "ms",
+            "traceEvents": events,
+        }
+
+    def export_chrome_trace(self, path: Path) -> None:
+        Path(path).write_text(json.dumps(self.to_chrome_trace(), default=str))
+
+
+def _lanes(spans: list[Span]) -> list[list[Span]]:
+    """
+    Split the spans of one thread or task into lanes in which any two spans are either disjoint or nested,
+    as trace viewers expect of the events on one track. Spans go to the first lane they fit in.
+    """
+    lanes = []
+    for span in sorted(spans, key=lambda span: (span.start, -span.end)):
+        for lane, ends in lanes:
+            # the ends of the spans that are still open at this start, innermost last
+            while ends and ends[-1] <= span.start:
+                ends.pop()
+            if not ends or span.end <= ends[-1]:
+                break
+        else:
+            lane, ends = [], []
+            lanes.append((lane, ends))
+        lane.append(span)
+        ends.append(span.end)
+    return [lane for lane, _ in lanes]
+
+
+def _current_task():
+    loop = asyncio._get_running_loop()
+    if loop is None:
+        return None
+    task = asyncio.current_task(loop)
+    return None if task is None else id(task)
+
+
+class _ActiveSpan:
+    __slots__ = ("_tracer", "_name", "_args", "_start", "_thread", "_task")
+
+    def __init__(self, tracer: Tracer, name: str, args: dict):
+        self._tracer = tracer
+        self._name = name
+        self._args = args
+        self._start = None
+        self._thread = None
+        self._task = None
+
+    def set(self, **args) -> None:
+        """
+        Add arguments that are only known at the end of the phase, e.g. the number of failing samples.
+        """
+        self._args.update(args)
+
+    def __enter__(self):
+        # the span belongs where it was opened, even if a generator holding it is closed elsewhere
+        self._thread = threading.get_ident()
+        self._task = _current_task()
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        end = time.perf_counter_ns()
+        if exc_type is not None:
+            self._args["error"] = exc_type.__name__
+        self._tracer.record(Span(self._name, self._start, end, self._thread, self._args, self._task))
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def set(self, **args) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+_no_span = _NoSpan()
+_tracer = None
+
+
+def span(name: str, **args):
+    """
+    Return a context manager that times the enclosed phase, or a no-op if tracing is off.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _no_span
+    return _ActiveSpan(tracer, name, args)
+
+
+def enable(callback: Callable[[Span], None] = None) -> Tracer:
+    """
+    Start recording spans (process-wide) with a new tracer and return it.
+    """
+    global _tracer
+    _tracer = Tracer(callback)
+    return _tracer
+
+
+def disable() -> Tracer:
+    """
+    Stop recording spans and return the tracer that recorded them (None if tracing was off).
+    """
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+@contextlib.contextmanager
+def tracing(callback: Callable[[Span], None] = None):
+    """
+    Record spans while the block runs; yields the tracer.
+    """
+    tracer = enable(callback)
+    try:
+        yield tracer
+    finally:
+        disable()
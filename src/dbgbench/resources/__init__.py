@@ -1,10 +1,113 @@
+import functools
+import hashlib
+import importlib
+import importlib.metadata
 import importlib.resources as pkg_resources
+import io
+import logging
+import os
+import pickle
+import platform
+import tempfile
+import types
+from pathlib import Path
 
 
 def get_grep_grammar_path():
     return pkg_resources.files("dbgbench.resources.fandango") / "grep.fan"
 
 
+@functools.cache
+def get_grep_grammar():
+    """
+    Return the parsed grep grammar and its constraints, as fandangoLearner's parse() does.
+    Parsing takes seconds, so the result is memoized, and pickled under cache_dir() for other processes.
+    The memoized grammar and constraints are shared by all callers in the process: do not modify them,
+    but use load_grammar(get_grep_grammar_path()), which returns a fresh copy, for a grammar to change.
+    """
+    return load_grammar(get_grep_grammar_path())
+
+
+def _from_fandango(obj) -> bool:
+    module = type(obj).__module__
+    return "fandango" == module or module.startswith("fandango.")
+
+
+class _GrammarPickler(pickle.Pickler):
+    def __init__(self, file, protocol):
+        super().__init__(file, protocol=protocol)
+        self._protocol = protocol
+
+    def reducer_override(self, obj):
+        # the globals of a .fan file include the modules it imports; those are pickled by name
+        if isinstance(obj, types.ModuleType):
+            return importlib.import_module, (obj.__name__,)
+        # fandango's symbols cache their hash, which is only valid in this process (string hashes are salted);
+        # everything else about them is pickled as usual
+        if _from_fandango(obj) and "_hash_cache" in getattr(obj, "__dict__", ()):
+            reduced = obj.__reduce_ex__(self._protocol)
+            if isinstance(reduced, tuple) and 3 <= len(reduced) and isinstance(reduced[2], dict) \
+                    and "_hash_cache" in reduced[2]:
+                return reduced[:2] + (dict(reduced[2], _hash_cache=None),) + reduced[3:]
+        return NotImplemented
+
+
+def _version(module: str) -> str:
+    """
+    :return the version of the distribution that provides the given top-level module, "unknown" if there is none
+    """
+    for distribution in importlib.metadata.packages_distributions().get(module, []) + [module]:
+        try:
+            return importlib.metadata.version(distribution)
+        except importlib.metadata.PackageNotFoundError:
+            pass
+    return "unknown"
+
+
+def _grammar_key(content: bytes) -> str:
+    # a parse depends on fandango and the learner's parse(), and pickles on the interpreter
+    versions = [platform.python_implementation(), platform.python_version(),
+                _version("fandango"), _version("fandangoLearner")]
+    return hashlib.sha256(content + " ".join(versions).encode("utf-8")).hexdigest()
+
+
+def load_grammar(path):
+    """
+    Parse a .fan file, or load the result of an earlier parse, keyed by the hash of the file and the versions
+    of Python, fandango, and fandangoLearner.
+    :return the grammar and the constraints
+    """
+    from dbgbench.framework.cache import cache_dir
+
+    content = Path(path).read_bytes()
+    key = _grammar_key(content)
+    cached = cache_dir() / "grammars" / f"{Path(path).stem}-{key}.pickle"
+    try:
+        with open(cached, "rb") as file:
+            return pickle.load(file)
+    except FileNotFoundError:
+        pass
+    except Exception:
+        logging.warning(f"Could not load the parsed grammar from {cached}; parsing {path} again.", exc_info=True)
+
+    # importing the learner takes a while, so only do that when parsing
+    from fandangoLearner.interface.fandango import parse
+    grammar, constraints = parse(path)
+
+    buffer = io.BytesIO()
+    try:
+        _GrammarPickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump((grammar, constraints))
+    except Exception:
+        logging.warning(f"Cannot pickle the grammar of {path}; it is parsed again in every process.", exc_info=True)
+        return grammar, constraints
+    cached.parent.mkdir(parents=True, exist_ok=True)
+    handle, partial = tempfile.mkstemp(dir=cached.parent, suffix=".partial")
+    with os.fdopen(handle, "wb") as file:
+        file.write(buffer.getvalue())
+    os.replace(partial, cached)
+    return grammar, constraints
+
+
 def get_grep_samples_dir():
     return pkg_resources.files("dbgbench.resources.samples") / "grep"
 
@@ -13,5 +116,22 @@ def get_grep_samples():
     return [file.read_text() for file in sample_dir.iterdir() if file.is_file()]
 
 
+def get_find_samples_dir():
+    return pkg_resources.files("dbgbench.resources.samples") / "find"
+
+
+def get_find_samples():
+    sample_dir = get_find_samples_dir()
+    return [file.read_text() for file in sample_dir.iterdir() if file.is_file()]
+
+
+def get_calibration_samples(subject):
+    """
+    :return distinct benign command lines of the subject (e.g. "grep"), one per line of calibration/<subject>.cli
+    """
+    text = (pkg_resources.files("dbgbench.resources.calibration") / f"{subject}.cli").read_text()
+    return [line for line in text.splitlines() if line.strip()]
+
+
 def get_islearn_pattern_file_path():
     return pkg_resources.files("dbgbench.resources") / "patterns_islearn.toml"
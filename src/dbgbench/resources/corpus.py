@@ -0,0 +1,401 @@
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+
+def _input_key(inp: str) -> bytes:
+    return hashlib.sha256(b"input\0" + inp.encode("utf-8")).digest()[:16]
+
+
+def _label_key(inp: str, bug: str) -> bytes:
+    return hashlib.sha256(b"label\0" + bug.encode("utf-8") + b"\0" + inp.encode("utf-8")).digest()[:16]
+
+
+class _Location:
+    __slots__ = ("segment", "offset", "record")
+
+    def __init__(self, segment: int, offset: int, record: int):
+        self.segment = segment
+        self.offset = offset
+        self.record = record
+
+    def __eq__(self, other):
+        return isinstance(other, _Location) and \
+            (self.segment, self.offset, self.record) == (other.segment, other.offset, other.record)
+
+
+class HashIndex:
+    """
+    A memory-mapped hash table from 16-byte keys to record locations, with open addressing.
+
+    The file starts with a header (capacity, number of entries, number of distinct inputs, and the position
+    in the segments up to which records are indexed), followed by fixed-size slots. The table doubles
+    once it is half full.
+    """
+
+    magic = b"DBGCIDX1"
+    header = struct.Struct(">8sQQQIQ")
+    slot = struct.Struct(">16sIQI")
+    empty = bytes(16)
+
+    def __init__(self, path: Path, capacity: int = 1 << 16):
+        self.path = path
+        if not path.exists():
+            self._create(path, capacity)
+        self._open()
+
+    def _open(self) -> None:
+        self._file = open(self.path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, self.capacity, self.entries, self.inputs, self.segment, self.offset = self.header.unpack_from(self._map)
+        if self.magic != magic:
+            raise AssertionError(f"{self.path} is not a corpus index.")
+
+    @classmethod
+    def _create(cls, path: Path, capacity: int) -> None:
+        partial = path.with_name(path.name + ".partial")
+        with open(partial, "wb") as file:
+            file.write(cls.header.pack(cls.magic, capacity, 0, 0, 0, 0))
+            file.truncate(cls.header.size + capacity * cls.slot.size)
+        os.replace(partial, path)
+
+    def _find(self, key: bytes) -> tuple[int, bool]:
+        """
+        :return the position of the slot for the key, and whether the key is there (or the slot is empty).
+        """
+        slot = int.from_bytes(key[:8], "big") % self.capacity
+        while True:
+            position = self.header.size + slot * self.slot.size
+            found = self._map[position:position + 16]
+            if found == key:
+                return position, True
+            if found == self.empty:
+                return position, False
+            slot = (slot + 1) % self.capacity
+
+    def get(self, key: bytes) -> Optional[_Location]:
+        position, found = self._find(key)
+        if not found:
+            return None
+        _, segment, offset, record = self.slot.unpack_from(self._map, position)
+        return _Location(segment, offset, record)
+
+    def put(self, key: bytes, location: _Location, is_input: bool = False) -> None:
+        position, found = self._find(key)
+        self.slot.pack_into(self._map, position, key, location.segment, location.offset, location.record)
+        if not found:
+            self.entries += 1
+            self.inputs += is_input
+            if 2 * self.entries > self.capacity:
+                self._grow()
+
+    def covered(self) -> tuple[int, int]:
+        """
+        :return the segment and offset up to which records are indexed.
+        """
+        return self.segment, self.offset
+
+    def commit(self, segment: int, offset: int) -> None:
+        """
+        Record that everything up to the given position is indexed.
+        """
+        self.segment, self.offset = segment, offset
+        self.header.pack_into(self._map, 0, self.magic, self.capacity, self.entries, self.inputs,
+                              self.segment, self.offset)
+
+    def items(self) -> Iterator[tuple[bytes, _Location]]:
+        for slot in range(self.capacity):
+            key, segment, offset, record = self.slot.unpack_from(self._map, self.header.size + slot * self.slot.size)
+            if key != self.empty:
+                yield key, _Location(segment, offset, record)
+
+    def _grow(self) -> None:
+        grown_path = self.path.with_name(self.path.name + ".grown")
+        if grown_path.exists():
+            grown_path.unlink()
+        grown = HashIndex(grown_path, 2 * self.capacity)
+        for key, location in self.items():
+            grown.put(key, location)
+        grown.inputs = self.inputs
+        grown.commit(self.segment, self.offset)
+        grown.close()
+        self.close()
+        os.replace(grown_path, self.path)
+        self._open()
+
+    def flush(self) -> None:
+        self._map.flush()
+
+    def close(self) -> None:
+        self._map.flush()
+        self._map.close()
+        self._file.close()
+
+
+class Corpus:
+    """
+    An append-only store of deduplicated inputs, their metadata, and their oracle labels per bug.
+
+    Records are appended to segment files in zlib-compressed blocks of about `block_size` bytes;
+    a segment is closed once it exceeds `segment_size`. A memory-mapped HashIndex maps every input,
+    and every (input, bug) label, to its record, so lookups read a single block. Labeling an input again
+    appends a new record, and the index then points to that one.
+
+    Iteration streams over the segments one block at a time, so it never holds the whole corpus in memory.
+    Records reach the segment files and the index when their block is written by flush().
+
+    A corpus has a single writer: the directory is locked while a Corpus is open, and opening it again,
+    from this or another process, raises an AssertionError. Threads may share one Corpus.
+
+        with Corpus(path) as corpus:
+            corpus.add_results(bug.subject(), bug.execute_samples(inputs))
+            for inp, label in corpus.labels(bug.subject()):
+                ...
+    """
+
+    block_header = struct.Struct(">II")
+
+    def __init__(self, directory: Path, block_size: int = 64 * 1024, segment_size: int = 64 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.block_size = block_size
+        self.segment_size = segment_size
+        self._lock = threading.RLock()
+        self._lock_file = open(self.directory / "lock", "a")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            raise AssertionError(f"The corpus {self.directory} is already open.")
+        self._index = HashIndex(self.directory / "index.bin")
+        self._blocks = OrderedDict()
+        self._pending = []
+        self._pending_size = 0
+        self._pending_keys = {}
+        self._segment = max([self._segment_number(path) for path in self.directory.glob("segment-*.dat")], default=0)
+        self._segment_file = open(self._segment_path(self._segment), "ab")
+        self._recover()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        """
+        :return the number of distinct inputs (including those not flushed yet).
+        """
+        with self._lock:
+            return self._index.inputs + sum(1 for key in self._pending_keys if key[0] == "i")
+
+    def __contains__(self, inp: str) -> bool:
+        return self._locate(("i", _input_key(inp))) is not None
+
+    def add(self, inp: str, metadata: dict = None) -> bool:
+        """
+        Add an input unless it is already in the corpus.
+        :return whether it was added
+        """
+        with self._lock:
+            key = ("i", _input_key(inp))
+            if self._locate(key) is not None:
+                return False
+            self._append(key, {"input": inp, "metadata": metadata or {}})
+            return True
+
+    def set_label(self, inp: str, bug: str, label) -> None:
+        """
+        Record the oracle result of an input for a bug (adding the input if necessary).
+        """
+        with self._lock:
+            self.add(inp)
+            self._append(("l", _label_key(inp, bug)), {"bug": bug, "input": inp, "label": getattr(label, "name", label)})
+
+    def add_results(self, bug: str, results: Iterable[tuple[str, object]]) -> None:
+        """
+        Add the (input, OracleResult) pairs of an execution, e.g. of execute_samples, with their labels.
+        """
+        for inp, label in results:
+            self.set_label(inp, bug, label)
+
+    def metadata(self, inp: str) -> Optional[dict]:
+        record = self._lookup(("i", _input_key(inp)))
+        return None if record is None else record["metadata"]
+
+    def label(self, inp: str, bug: str):
+        """
+        :return the latest OracleResult recorded for the input and bug, or None
+        """
+        record = self._lookup(("l", _label_key(inp, bug)))
+        return None if record is None else _to_label(record["label"])
+
+    def inputs(self) -> Iterator[tuple[str, dict]]:
+        """
+        Yield all (input, metadata) pairs in the order they were added.
+        """
+        for _, record in self._records():
+            if "bug" not in record:
+                yield record["input"], record["metadata"]
+
+    def labels(self, bug: str) -> Iterator[tuple[str, object]]:
+        """
+        Yield the (input, OracleResult) pairs labeled for the given bug, each input once, with its latest label.
+        Label records carry their input, so this is a single pass over the segments with one index probe
+        per label of the bug; inputs come in the order their latest label was recorded.
+        """
+        for location, record in self._records():
+            if record.get("bug") != bug:
+                continue
+            with self._lock:
+                latest = self._index.get(_label_key(record["input"], bug))
+            if location == latest:
+                yield record["input"], _to_label(record["label"])
+
+    def flush(self) -> None:
+        """
+        Write the pending block and index its records.
+        """
+        with self._lock:
+            if 0 == len(self._pending):
+                return
+            data = zlib.compress("\n".join(json.dumps(record) for record in self._pending).encode("utf-8"))
+            offset = self._segment_file.tell()
+            self._segment_file.write(self.block_header.pack(len(data), len(self._pending)))
+            self._segment_file.write(data)
+            self._segment_file.flush()
+            for key, record in self._pending_keys.items():
+                self._index.put(key[1], _Location(self._segment, offset, record), is_input="i" == key[0])
+            self._index.commit(self._segment, self._segment_file.tell())
+            self._pending = []
+            self._pending_size = 0
+            self._pending_keys = {}
+            if self._segment_file.tell() >= self.segment_size:
+                self._segment_file.close()
+                self._segment += 1
+                self._segment_file = open(self._segment_path(self._segment), "ab")
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            self._segment_file.close()
+            self._index.close()
+            self._lock_file.close()
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.directory / f"segment-{segment:06d}.dat"
+
+    @staticmethod
+    def _segment_number(path: Path) -> int:
+        return int(path.stem.split("-")[1])
+
+    def _append(self, key: tuple[str, bytes], record: dict) -> None:
+        self._pending_keys[key] = len(self._pending)
+        self._pending.append(record)
+        self._pending_size += len(record.get("input", "")) + 64
+        if self._pending_size >= self.block_size:
+            self.flush()
+
+    def _locate(self, key: tuple[str, bytes]):
+        """
+        :return the location of the key's record: an index into the pending block, or a _Location
+        """
+        with self._lock:
+            if key in self._pending_keys:
+                return self._pending_keys[key]
+            return self._index.get(key[1])
+
+    def _lookup(self, key: tuple[str, bytes]) -> Optional[dict]:
+        """
+        :return the key's record, or None; a flush between locating and reading it would move the record
+        """
+        with self._lock:
+            return self._read(self._locate(key))
+
+    def _read(self, location) -> Optional[dict]:
+        if location is None:
+            return None
+        with self._lock:
+            if isinstance(location, int):
+                return self._pending[location]
+            return self._block(location.segment, location.offset)[location.record]
+
+    def _block(self, segment: int, offset: int) -> list[dict]:
+        """
+        Read and decode a block; the most recently used ones are kept.
+        """
+        if (segment, offset) in self._blocks:
+            self._blocks.move_to_end((segment, offset))
+            return self._blocks[segment, offset]
+        with open(self._segment_path(segment), "rb") as file:
+            file.seek(offset)
+            size, _ = self.block_header.unpack(file.read(self.block_header.size))
+            records = [json.loads(line) for line in zlib.decompress(file.read(size)).decode("utf-8").split("\n")]
+        self._blocks[segment, offset] = records
+        if len(self._blocks) > 16:
+            self._blocks.popitem(last=False)
+        return records
+
+    def _scan(self, segment: int, offset: int = 0) -> Iterator[tuple[int, int, bytes]]:
+        """
+        Yield (offset, record count, compressed data) for the blocks of a segment, stopping at a torn block.
+        """
+        with open(self._segment_path(segment), "rb") as file:
+            file.seek(offset)
+            while True:
+                header = file.read(self.block_header.size)
+                if len(header) < self.block_header.size:
+                    return
+                size, count = self.block_header.unpack(header)
+                data = file.read(size)
+                if len(data) < size:
+                    return
+                yield offset, count, data
+                offset += self.block_header.size + size
+
+    def _records(self) -> Iterator[tuple[_Location, dict]]:
+        self.flush()
+        with self._lock:
+            last = self._segment
+        for segment in range(last + 1):
+            if not self._segment_path(segment).exists():
+                continue
+            for offset, _, data in self._scan(segment):
+                records = zlib.decompress(data).decode("utf-8").split("\n")
+                for number, record in enumerate(records):
+                    yield _Location(segment, offset, number), json.loads(record)
+
+    def _recover(self) -> None:
+        """
+        Index the blocks written after the index was last committed (e.g. by a process that crashed),
+        and cut off a block that was only partly written.
+        """
+        covered_segment, covered_offset = self._index.covered()
+        for segment in range(covered_segment, self._segment + 1):
+            if not self._segment_path(segment).exists():
+                continue
+            end = covered_offset if segment == covered_segment else 0
+            for offset, _, data in self._scan(segment, end):
+                for number, line in enumerate(zlib.decompress(data).decode("utf-8").split("\n")):
+                    record = json.loads(line)
+                    if "bug" in record:
+                        self._index.put(_label_key(record["input"], record["bug"]), _Location(segment, offset, number))
+                    else:
+                        self._index.put(_input_key(record["input"]), _Location(segment, offset, number), is_input=True)
+                end = offset + self.block_header.size + len(data)
+            self._index.commit(segment, end)
+            if segment == self._segment and self._segment_file.tell() > end:
+                self._segment_file.truncate(end)
+
+
+def _to_label(name: str):
+    from dbgbench.framework.oraclesresult import OracleResult
+    return OracleResult[name]
@@ -1,16 +1,60 @@
 #!/usr/bin/env bash
 set -e
 
+# The toolchain (OpenSSL and Python, both installed below /usr/local) takes long to build.
+# If the host provides it from an earlier build, it is unpacked instead; otherwise it is built
+# and packed, so the host can reuse it for other subjects.
+TOOLCHAIN=/root/Desktop/alhazen_toolchain.tar.gz
+# files below /usr/local newer than this one were installed by the toolchain build
+TOOLCHAIN_STAMP=/root/Desktop/alhazen_toolchain.stamp
+
 apt-get update
-apt-get --yes --force-yes -o Dpkg::Options::="--force-confdef" -o Dpkg::Options::="--force-confnew" upgrade
+apt-get install -y --no-install-recommends libffi-dev zlib1g zlib1g-dev uuid-dev libbz2-dev liblzma-dev
 
 pushd /root/Desktop/
-# install openssl
-wget --no-check-certificate https://www.openssl.org/source/openssl-1.1.1g.tar.gz
-tar -xzvf openssl-1.1.1g.tar.gz
-pushd openssl-1.1.1g
-./config
-make install
+if [ -e $TOOLCHAIN ]; then
+  tar -xzf $TOOLCHAIN -C /
+else
+  touch $TOOLCHAIN_STAMP
+  # timestamps are coarse: make sure that everything installed below is strictly newer
+  sleep 1
+
+  # install openssl
+  wget --no-check-certificate https://www.openssl.org/source/openssl-1.1.1g.tar.gz
+  tar -xzf openssl-1.1.1g.tar.gz
+  pushd openssl-1.1.1g
+  ./config
+  make install
+  popd
+
+  # install python
+  wget --no-check-certificate https://www.python.org/ftp/python/3.8.2/Python-3.8.2.tgz
+  tar xf Python-3.8.2.tgz
+  pushd Python-3.8.2
+  # rewrite setup file (activate non-standard ssl path)
+  sed -i '/ _socket socketmodule.c /s/^#//' Modules/Setup
+  sed -i '/SSL=/s/^#//' Modules/Setup
+  sed -i '/_ssl/s/^#//' Modules/Setup
+  sed -i '/-DUSE_SSL/s/^#//' Modules/Setup
+  sed -i '/-lssl/s/^#//' Modules/Setup
+
+  # does not compile with optimizations: https://groups.google.com/forum/#!topic/comp.lang.python/npv-wzmytzo
+  ./configure --with-openssl=/usr/local/ssl
+  make
+  make install
+  popd
+
+  python3 -m pip install --no-cache-dir -U pip
+  python3 -m pip install --no-cache-dir numpy
+  python3 -m pip install --no-cache-dir pandas
+
+  # pack what OpenSSL, Python and pip installed, not whatever else the subject's image keeps in /usr/local
+  (cd / && find usr/local -newer $TOOLCHAIN_STAMP) > /root/Desktop/alhazen_toolchain.files
+  tar -czf $TOOLCHAIN -C / --no-recursion -T /root/Desktop/alhazen_toolchain.files
+  rm -f $TOOLCHAIN_STAMP /root/Desktop/alhazen_toolchain.files
+fi
+popd
+
 if [ ! -e /usr/bin/openssl ]; then
   ln -sf /usr/local/ssl/bin/openssl /usr/bin/openssl
 fi
@@ -20,29 +64,11 @@ fi
 if [ ! -e /usr/lib/libssl.so.1.1 ]; then
   ln -s /usr/local/lib/libssl.so.1.1 /usr/lib/libssl.so.1.1
 fi
-popd
-
-# install python
-apt-get install -y --no-install-recommends libffi-dev zlib1g zlib1g-dev uuid-dev libbz2-dev liblzma-dev
-wget --no-check-certificate https://www.python.org/ftp/python/3.8.2/Python-3.8.2.tgz
-tar xf Python-3.8.2.tgz
-cd Python-3.8.2
-# rewrite setup file (activate non-standard ssl path)
-sed -i '/ _socket socketmodule.c /s/^#//' Modules/Setup
-sed -i '/SSL=/s/^#//' Modules/Setup
-sed -i '/_ssl/s/^#//' Modules/Setup
-sed -i '/-DUSE_SSL/s/^#//' Modules/Setup
-sed -i '/-lssl/s/^#//' Modules/Setup
-
-# does not compile with optimizations: https://groups.google.com/forum/#!topic/comp.lang.python/npv-wzmytzo
-./configure --with-openssl=/usr/local/ssl
-make
-make install
-popd
 
-python3 -m pip install -U pip
-python3 -m pip install numpy
-python3 -m pip install pandas
+# keep the image slim: no sources, build trees or package lists
+rm -rf /root/Desktop/openssl-1.1.1g* /root/Desktop/Python-3.8.2*
+apt-get clean
+rm -rf /var/lib/apt/lists/*
 
 mkdir -p /root/Desktop/alhazen_scripts/
 mkdir -p /root/Desktop/alhazen_scripts/alhazen/
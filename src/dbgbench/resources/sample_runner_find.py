@@ -2,24 +2,30 @@
 
 """
 This script runs all samples in the given directory, and
-writes a csv with all the data to stdout.
+writes one framed record per sample (see helpers.write_record) to stdout.
+Started with --serve, it instead stays alive and answers framed
+(request id, identifier, cli) requests read from stdin.
+With --workers N, samples are executed by N processes in parallel (0 uses all available cores).
+The protocol and the worker processes are shared with the other runners (see helpers.runner_main).
+
+Each sample runs in a chroot. Every (worker) process builds the chroot of a bug once as a template in its
+scratch directory, and runs each sample in a hard-linked clone of it.
 
 It needs to be able to execute within the dbgbench python container,
 which has an outdated python version, so some newer syntax may not be available.
 """
-import re
+import os
 import sys
 import shutil
-import codecs
-import csv
+import stat
 import subprocess
-import os
 
 from pathlib import Path
-from alhazen.helpers import PrefixWriter
+from alhazen.helpers import bug_dir, output_limit, run_sample, runner_main, scratch_dir, subjects_dir
 from alhazen import external_exec as execute
 
-__input_pattern = re.compile(r"^printf '(.*)' \|")
+# identifier -> (template, snapshot of its files) of the chroot templates of this process
+__templates = {}
 
 
 def shell_functions():
@@ -37,9 +43,9 @@ def shell_functions():
               }"""
 
 
-def build_chroot(subject):
+def build_chroot(subject, chroot_dir):
     # prepare directory
-    dir = Path("/tmp/test_alhazen/")
+    dir = Path(chroot_dir)
     bin_dir = dir / "bin"
     if not bin_dir.exists():
         bin_dir.mkdir(parents=True)
@@ -58,7 +64,7 @@ def build_chroot(subject):
     script = "#!/bin/bash\n" \
              "CHROOT={testdir}\n" \
              "for PROG in $(find $CHROOT/bin -executable); do\n" \
-             "ldd $PROG | egrep -o '/lib.*\.[0-9]' | xargs -n 1 -I{{}} cp --parents {{}} $CHROOT\n" \
+             "ldd $PROG | egrep -o '/lib.*\\.[0-9]' | xargs -n 1 -I{{}} cp --parents {{}} $CHROOT\n" \
              "done\n" \
              "mkdir $CHROOT/dev/\n" \
              "mknod -m 666 $CHROOT/dev/null c 1 3\n" \
@@ -68,32 +74,55 @@ def build_chroot(subject):
     # and execute the script
     cmd = ["bash", str((dir / "ldd_script.sh").resolve())]
     execute.check_output(cmd, cwd=str(dir.resolve()), stderr=subprocess.STDOUT)
+    (dir / "ldd_script.sh").unlink()
     # return the dir
     return dir
 
 
-def bug_dir(identifier, basedir):
-    basedir = Path(basedir)
-    i = 1
-    subject = identifier[:identifier.rfind(".")]
-    while True:
-        check = basedir / "{subj}{i}".format(subj=subject, i=i)
-        if check.exists():
-            id_file = check / identifier
-            if id_file.exists():
-                return check
-        else:
-            raise AssertionError("I could not find {subj} for {iden} (round: {i}, looking in {basedir})".format(
-                subj=subject,
-                iden=identifier,
-                i=i,
-                basedir=basedir))
-        i = i + 1
+def snapshot(template):
+    """:return size, modification time, and mode of the regular files in the template, by relative path"""
+    files = {}
+    for dirpath, _, filenames in os.walk(str(template)):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            info = os.lstat(path)
+            # device nodes are left out: writing to /dev/null may update its times
+            if stat.S_ISREG(info.st_mode) or stat.S_ISLNK(info.st_mode):
+                files[os.path.relpath(path, str(template))] = (info.st_size, info.st_mtime_ns, info.st_mode)
+    return files
+
+
+def chroot_template(identifier):
+    """The chroot for the given bug, built once per process in its scratch directory.
+    Its clones share the template's inodes, so a sample that changes a file in place (writes to it,
+    touches it, changes its mode) also changes the template. Before the template is reused, its files
+    are compared with their state after the build, and a changed template is built again."""
+    known = __templates.get(identifier)
+    if known is not None and snapshot(known[0]) == known[1]:
+        return known[0]
+    template = scratch_dir() / "template-{}".format(identifier)
+    if template.exists():
+        shutil.rmtree(str(template))
+    build_chroot(bug_dir(identifier, subjects_dir()) / "find" / "find" / "find", template)
+    __templates[identifier] = (template, snapshot(template))
+    return template
+
+
+def clone_chroot(template, clone):
+    """Recreate the template at clone with hard links, which is much cheaper than copying.
+    Files that a sample creates, removes, or replaces only affect the clone; see chroot_template()
+    for files that are changed in place."""
+    for dirpath, dirnames, filenames in os.walk(str(template)):
+        target = Path(clone) / os.path.relpath(dirpath, str(template))
+        target.mkdir(parents=True, exist_ok=True)
+        for name in filenames + [d for d in dirnames if os.path.islink(os.path.join(dirpath, d))]:
+            os.link(os.path.join(dirpath, name), str(target / name), follow_symlinks=False)
+    return Path(clone)
 
 
 def execute_sample(identifier, cli):
-    subjdir = bug_dir(identifier, "/root/Desktop/") / "find" / "find"
-    chroot_dir = build_chroot(subjdir / "find")
+    """:return the return code, the output, and whether the sample was killed for writing too much output"""
+    chroot_dir = clone_chroot(chroot_template(identifier), scratch_dir() / "chroot")
     try:
         env = os.environ.copy()
         env['LANG'] = "C.UTF-8"
@@ -105,45 +134,20 @@ def execute_sample(identifier, cli):
         with open(str((chroot_dir / "tmpbash.sh").resolve()), 'w', encoding='utf-8') as tmpbash:
             tmpbash.write(script.format(cli=cli, funcs=shell_functions()))
         cmd = ["chroot", str(chroot_dir.resolve()), '/bin/bash', "/tmpbash.sh"]
-        output = execute.check_output(cmd, cwd=str(chroot_dir.resolve()), stderr=subprocess.STDOUT, env=env)
-        return 0, output
-    except subprocess.CalledProcessError as ex:
-        return ex.returncode, ex.output
+        return execute.capture_output(cmd, output_limit(), cwd=str(chroot_dir.resolve()), env=env)
     finally:
-        # tidy up the chroot
+        # tidy up the clone; the template stays for the next sample
         shutil.rmtree(str(chroot_dir.resolve()))
 
 
-def execute_samples(subject, inp_dir):
-    outw = PrefixWriter(sys.stdout, "# csv #- ")
-    writer = csv.DictWriter(outw,
-                            fieldnames=["file", "line", "subject", "output", "oracle", "return code"],
-                            dialect='unix')
-    writer.writeheader()
-    for config_file in inp_dir.iterdir():
-        if str(config_file).endswith(".cli"):
-            with open(config_file, 'r') as inf:
-                cli = inf.read()
-            rc, output = execute_sample(subject, cli)
-
-            if len(output) > 5000:
-                output = output[0:5000]
-            entry = {
-                "file": str(config_file.name),
-                "line": cli,
-                "subject": subject,
-                "output": output,
-                "return code": rc
-            }
-            writer.writerow(entry)
-            outw.flush()
+def extract_input(cli):
+    # the samples of find have no input
+    return None
+
+
+def run(identifier, cli):
+    return run_sample(execute_sample, extract_input, identifier, cli)
 
 
 if __name__ == "__main__":
-    sys.stdout = codecs.getwriter("utf-8")(sys.stdout.detach())
-    if 3 != len(sys.argv) and 4 != len(sys.argv):
-        print("Usage:", sys.argv[0], "<identifier>", "<working_dir> [rm]")
-        exit(1)
-    execute_samples(sys.argv[1], Path(sys.argv[2]))
-    if 4 == len(sys.argv) and 'rm' == sys.argv[3]:
-        shutil.rmtree(sys.argv[2])
+    exit(runner_main(run, sys.argv, sys.stdin.buffer, sys.stdout.buffer))
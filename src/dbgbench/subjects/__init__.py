@@ -3,6 +3,16 @@ from .grep5fa8c7c9 import Grep5fa8c7c9
 from .grep7aa698d3 import Grep7aa698d3
 from .grep3220317a import Grep3220317a
 from .grepc96b0f2c import Grepc96b0f2c
+from .find07b941b1 import Find07b941b1
+from .find091557f6 import Find091557f6
+from .find24bf33c0 import Find24bf33c0
+from .find24e2271e import Find24e2271e
+from .find6e4cecb6 import Find6e4cecb6
+from .findb445af98 import Findb445af98
+from .finddbcb10e9 import Finddbcb10e9
+from .finde1d0a991 import Finde1d0a991
+from .finde6680237 import Finde6680237
+from .findff248a20 import Findff248a20
 
 
 __all__ = [
@@ -11,4 +21,14 @@ __all__ = [
     "Grep7aa698d3",
     "Grep3220317a",
     "Grepc96b0f2c",
+    "Find07b941b1",
+    "Find091557f6",
+    "Find24bf33c0",
+    "Find24e2271e",
+    "Find6e4cecb6",
+    "Findb445af98",
+    "Finddbcb10e9",
+    "Finde1d0a991",
+    "Finde6680237",
+    "Findff248a20",
 ]
\ No newline at end of file
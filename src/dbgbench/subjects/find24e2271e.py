@@ -0,0 +1,18 @@
+from dbgbench.framework.find import FindBug
+from dbgbench.framework.oracles import Oracle
+from dbgbench.resources import get_find_samples
+
+
+class Find24e2271e(FindBug):
+    def __init__(self, oracle: Oracle = None, **kwargs):
+        super().__init__("find.24e2271e", oracle, **kwargs)
+
+
+if __name__ == "__main__":
+    samples = get_find_samples()
+
+    with Find24e2271e() as bug:
+        result = bug.execute_samples(samples)
+
+    for inp, oracle in result:
+        print(inp.ljust(80), oracle)
@@ -4,8 +4,8 @@ from dbgbench.resources import get_grep_samples
 
 
 class Grep3220317a(GrepBug):
-    def __init__(self):
-        super().__init__("grep.3220317a", SegvOracle())
+    def __init__(self, **kwargs):
+        super().__init__("grep.3220317a", SegvOracle(), **kwargs)
 
 
 if __name__ == "__main__":
@@ -4,8 +4,8 @@ from dbgbench.resources import get_grep_samples
 
 
 class Grep3c3bdace(GrepBug):
-    def __init__(self):
-        super().__init__("grep.3c3bdace", SegvOracle())
+    def __init__(self, **kwargs):
+        super().__init__("grep.3c3bdace", SegvOracle(), **kwargs)
 
 
 if __name__ == "__main__":
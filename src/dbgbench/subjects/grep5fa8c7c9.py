@@ -4,8 +4,8 @@ from dbgbench.resources import get_grep_samples
 
 
 class Grep5fa8c7c9(GrepBug):
-    def __init__(self):
-        super().__init__("grep.5fa8c7c9", HangOracle())
+    def __init__(self, **kwargs):
+        super().__init__("grep.5fa8c7c9", HangOracle(), **kwargs)
 
 
 if __name__ == "__main__":
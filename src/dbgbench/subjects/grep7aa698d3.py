@@ -4,8 +4,8 @@ from dbgbench.resources import get_grep_samples
 
 
 class Grep7aa698d3(GrepBug):
-    def __init__(self):
-        super().__init__("grep.7aa698d3", NoNewLineOracle())
+    def __init__(self, **kwargs):
+        super().__init__("grep.7aa698d3", NoNewLineOracle(), **kwargs)
 
 
 if __name__ == "__main__":
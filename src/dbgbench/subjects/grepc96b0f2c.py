@@ -4,8 +4,8 @@ from dbgbench.resources import get_grep_samples
 
 
 class Grepc96b0f2c(GrepBug):
-    def __init__(self):
-        super().__init__("grep.c96b0f2c", NoNewTextOracle())
+    def __init__(self, **kwargs):
+        super().__init__("grep.c96b0f2c", NoNewTextOracle(), **kwargs)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,110 @@
+import threading
+import time
+import unittest
+from concurrent.futures import Future, ThreadPoolExecutor
+from unittest import mock
+
+from dbgbench.framework.adapter import BatchingOracle
+from dbgbench.framework.oraclesresult import OracleResult
+
+
+class FakeBug:
+    """Fails every input that contains 'bug' and records the batch sizes."""
+
+    def __init__(self):
+        self.batches = []
+        self.torn_down = False
+        self._lock = threading.Lock()
+
+    def execute_samples(self, test_inputs):
+        with self._lock:
+            self.batches.append(len(test_inputs))
+        return [(inp, OracleResult.FAILING if "bug" in inp else OracleResult.PASSING) for inp in test_inputs]
+
+    def tear_down(self):
+        self.torn_down = True
+
+
+class BatchingOracleTest(unittest.TestCase):
+    def test_single_calls(self):
+        bug = FakeBug()
+        with BatchingOracle(bug) as oracle:
+            self.assertEqual(OracleResult.FAILING, oracle("bug"))
+            self.assertEqual(OracleResult.PASSING, oracle("ok"))
+        self.assertEqual([1, 1], bug.batches)
+        self.assertTrue(bug.torn_down)
+
+    def test_sequential_calls_do_not_wait(self):
+        bug = FakeBug()
+        with BatchingOracle(bug, max_latency=1.0) as oracle:
+            start = time.monotonic()
+            for i in range(10):
+                self.assertEqual(OracleResult.PASSING, oracle(f"ok {i}"))
+            self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual([1] * 10, bug.batches)
+
+    def test_batches_are_bounded(self):
+        bug = FakeBug()
+        inputs = [f"bug {i}" if i % 3 else f"ok {i}" for i in range(50)]
+        with BatchingOracle(bug, max_batch=8, max_latency=1.0) as oracle:
+            results = oracle.evaluate(inputs)
+        self.assertEqual([OracleResult.FAILING if i % 3 else OracleResult.PASSING for i in range(50)], results)
+        self.assertEqual(50, sum(bug.batches))
+        self.assertTrue(all(size <= 8 for size in bug.batches))
+
+    def test_concurrent_callers_share_batches(self):
+        bug = FakeBug()
+        with BatchingOracle(bug, max_batch=64, max_latency=0.2) as oracle:
+            with ThreadPoolExecutor(16) as executor:
+                results = list(executor.map(oracle, ["ok"] * 16))
+        self.assertEqual([OracleResult.PASSING] * 16, results)
+        self.assertLess(len(bug.batches), 16)
+
+    def test_concurrent_submitters_share_batches(self):
+        bug = FakeBug()
+        barrier = threading.Barrier(16)
+
+        def submit(oracle, inp):
+            barrier.wait()
+            return oracle.submit(inp).result()
+
+        with BatchingOracle(bug, max_batch=64, max_latency=0.2) as oracle:
+            with ThreadPoolExecutor(16) as executor:
+                results = list(executor.map(lambda inp: submit(oracle, inp), ["ok"] * 16))
+        self.assertEqual([OracleResult.PASSING] * 16, results)
+        self.assertLess(len(bug.batches), 16)
+
+    def test_batches_wait_for_submitters_on_their_way(self):
+        bug = FakeBug()
+        late = []
+
+        def slow_future():
+            # a caller that entered submit() but has not queued its input yet
+            if threading.current_thread() in late:
+                time.sleep(0.1)
+            return Future()
+
+        with BatchingOracle(bug, max_latency=1.0) as oracle:
+            with mock.patch("dbgbench.framework.adapter.Future", side_effect=slow_future):
+                with ThreadPoolExecutor(1) as executor:
+                    first = executor.submit(lambda: late.append(threading.current_thread())
+                                            or oracle.submit("late").result())
+                    time.sleep(0.02)
+                    self.assertEqual(OracleResult.PASSING, oracle.submit("ok").result())
+                    self.assertEqual(OracleResult.PASSING, first.result())
+        self.assertEqual([2], bug.batches)
+
+    def test_closed_oracle_rejects_inputs(self):
+        bug = FakeBug()
+        oracle = BatchingOracle(bug)
+        self.assertEqual(OracleResult.PASSING, oracle("ok"))
+        oracle.close()
+        with self.assertRaises(RuntimeError):
+            oracle.submit("ok")
+        with self.assertRaises(RuntimeError):
+            oracle("ok")
+        self.assertEqual([1], bug.batches)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+from dbgbench.framework.oracles import CrashOrHangOracle, HangOracle
+from dbgbench.framework.oraclesresult import OracleResult
+from dbgbench.framework.results import ResultBatch
+from dbgbench.subjects import Find07b941b1
+
+
+class OracleApplicationTest(unittest.TestCase):
+    def test_truncated_rows_are_undefined(self):
+        bug = Find07b941b1(HangOracle())
+        batch = ResultBatch.from_records([
+            {"line": "find a", "return code": 124, "output": b"", "truncated": False},
+            {"line": "find b", "return code": -9, "output": b"b\n" * 1000, "truncated": True},
+            {"line": "find c", "return code": 0, "output": b"c\n", "truncated": False},
+        ])
+        self.assertEqual([OracleResult.FAILING, OracleResult.UNDEFINED, OracleResult.PASSING],
+                         bug._apply_oracle(batch))
+
+    def test_find_subjects_default_to_crashes_and_hangs(self):
+        bug = Find07b941b1()
+        self.assertIsInstance(bug._oracle, CrashOrHangOracle)
+        batch = ResultBatch.from_records([{"line": "find", "return code": code, "output": b"", "truncated": False}
+                                          for code in [124, 134, 139, 0, 1]])
+        self.assertEqual([OracleResult.FAILING] * 3 + [OracleResult.PASSING] * 2, bug._apply_oracle(batch))
+        self.assertIsInstance(Find07b941b1(HangOracle())._oracle, HangOracle)
+
+    def test_output_limit_is_part_of_the_cache_version(self):
+        default = Find07b941b1(HangOracle())._code_version()
+        limited = Find07b941b1(HangOracle(), output_limit=1024)._code_version()
+        self.assertNotEqual(default, limited)
+        self.assertTrue(limited.startswith(default))
+
+    def test_cache_version_covers_runner_support_files(self):
+        with mock.patch("dbgbench.framework.base.fingerprint", return_value="v") as fingerprint:
+            Find07b941b1(HangOracle())._code_version()
+        names = {path.name for path in fingerprint.call_args.args[0]}
+        self.assertLessEqual({"helpers.py", "oracles.py", "printf.py", "external_exec.py", "sample_runner_find.py"},
+                             names)
+
+
+
+class ContainerLeaseTest(unittest.TestCase):
+    def test_concurrent_executions_lease_one_container(self):
+        def slow_lease():
+            time.sleep(0.05)
+            return mock.Mock()
+
+        async def main(bug):
+            await asyncio.gather(*[asyncio.to_thread(bug._ensure_container_started) for _ in range(4)])
+
+        bug = Find07b941b1()
+        with mock.patch.object(bug, "_lease_container", side_effect=slow_lease) as lease:
+            asyncio.run(main(bug))
+            self.assertIsNotNone(bug.container())
+        lease.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from dbgbench.framework.cache import ResultCache
+from dbgbench.framework.oraclesresult import OracleResult
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(Path(self.tmp_dir.name) / "results.sqlite", max_entries=3)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp_dir.cleanup()
+
+    def test_hits_and_misses(self):
+        self.cache.put_many("grep.3c3bdace", "SegvOracle", "v1", [("a", OracleResult.FAILING)])
+        found = self.cache.get_many("grep.3c3bdace", "SegvOracle", "v1", ["a", "b"])
+        self.assertEqual({"a": OracleResult.FAILING}, found)
+
+    def test_key_includes_bug_oracle_and_version(self):
+        self.cache.put_many("grep.3c3bdace", "SegvOracle", "v1", [("a", OracleResult.FAILING)])
+        self.assertEqual({}, self.cache.get_many("grep.5fa8c7c9", "SegvOracle", "v1", ["a"]))
+        self.assertEqual({}, self.cache.get_many("grep.3c3bdace", "HangOracle", "v1", ["a"]))
+        self.assertEqual({}, self.cache.get_many("grep.3c3bdace", "SegvOracle", "v2", ["a"]))
+
+    def test_lru_eviction(self):
+        for cli in ["a", "b", "c"]:
+            self.cache.put_many("bug", "oracle", "v1", [(cli, OracleResult.PASSING)])
+        # touch "a", so that "b" is the least recently used entry
+        self.cache.get_many("bug", "oracle", "v1", ["a"])
+        self.cache.put_many("bug", "oracle", "v1", [("d", OracleResult.PASSING)])
+        self.assertEqual(3, len(self.cache))
+        found = self.cache.get_many("bug", "oracle", "v1", ["a", "b", "c", "d"])
+        self.assertEqual({"a", "c", "d"}, set(found))
+
+    def test_shared_between_connections(self):
+        self.cache.put_many("bug", "oracle", "v1", [("a", OracleResult.PASSING)])
+        other = ResultCache(Path(self.tmp_dir.name) / "results.sqlite")
+        try:
+            self.assertEqual({"a": OracleResult.PASSING}, other.get_many("bug", "oracle", "v1", ["a"]))
+        finally:
+            other.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
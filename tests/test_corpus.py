@@ -0,0 +1,127 @@
+import random
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from dbgbench.framework.oraclesresult import OracleResult
+from dbgbench.resources.corpus import Corpus
+
+
+class CorpusTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "corpus"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_deduplication_and_labels(self):
+        with Corpus(self.path) as corpus:
+            self.assertTrue(corpus.add("printf 'a' | grep a", {"origin": "sample"}))
+            self.assertFalse(corpus.add("printf 'a' | grep a"))
+            corpus.set_label("printf 'a' | grep a", "grep.3c3bdace", OracleResult.PASSING)
+            corpus.set_label("printf 'b' | grep a", "grep.3c3bdace", OracleResult.FAILING)
+            corpus.set_label("printf 'a' | grep a", "grep.3c3bdace", OracleResult.FAILING)
+            self.assertEqual(2, len(corpus))
+            self.assertIn("printf 'b' | grep a", corpus)
+            self.assertEqual({"origin": "sample"}, corpus.metadata("printf 'a' | grep a"))
+            self.assertEqual(OracleResult.FAILING, corpus.label("printf 'a' | grep a", "grep.3c3bdace"))
+            self.assertIsNone(corpus.label("printf 'a' | grep a", "grep.5fa8c7c9"))
+
+        with Corpus(self.path) as corpus:
+            self.assertEqual(2, len(corpus))
+            self.assertEqual(OracleResult.FAILING, corpus.label("printf 'a' | grep a", "grep.3c3bdace"))
+            self.assertEqual([("printf 'a' | grep a", {"origin": "sample"}), ("printf 'b' | grep a", {})],
+                             list(corpus.inputs()))
+            self.assertEqual({("printf 'b' | grep a", OracleResult.FAILING),
+                              ("printf 'a' | grep a", OracleResult.FAILING)},
+                             set(corpus.labels("grep.3c3bdace")))
+
+    def test_many_inputs(self):
+        inputs = [f"printf '{i}' | grep {i % 7}" for i in range(100000)]
+        with Corpus(self.path, block_size=4096, segment_size=64 * 1024) as corpus:
+            corpus.add_results("grep.3c3bdace", ((inp, OracleResult.FAILING if i % 3 else OracleResult.PASSING)
+                                                 for i, inp in enumerate(inputs)))
+        self.assertLess(1, len(list(self.path.glob("segment-*.dat"))))
+        with Corpus(self.path) as corpus:
+            self.assertEqual(len(inputs), len(corpus))
+            self.assertEqual(OracleResult.PASSING, corpus.label(inputs[99999], "grep.3c3bdace"))
+            self.assertEqual(inputs, [inp for inp, _ in corpus.inputs()])
+
+    def test_relabel_out_of_order(self):
+        inputs = [f"printf '{i}' | grep a" for i in range(5000)]
+        relabeled = random.Random(1).sample(inputs, 1000)
+        with Corpus(self.path, block_size=4096) as corpus:
+            corpus.add_results("grep.3c3bdace", ((inp, OracleResult.PASSING) for inp in inputs))
+            corpus.add_results("grep.5fa8c7c9", ((inp, OracleResult.PASSING) for inp in inputs[:10]))
+            corpus.add_results("grep.3c3bdace", ((inp, OracleResult.FAILING) for inp in relabeled))
+            # one pass over the segments, no block is decoded to resolve an input
+            with mock.patch.object(Corpus, "_block", side_effect=AssertionError("random block read")):
+                labels = list(corpus.labels("grep.3c3bdace"))
+        expected = {inp: OracleResult.PASSING for inp in inputs}
+        expected.update((inp, OracleResult.FAILING) for inp in relabeled)
+        self.assertEqual(len(inputs), len(labels))
+        self.assertEqual(expected, dict(labels))
+        self.assertEqual(relabeled, [inp for inp, _ in labels[-len(relabeled):]])
+
+    def test_concurrent_reads_while_blocks_flush(self):
+        inputs = [f"printf '{i}' | grep a" for i in range(20)]
+        labels = [OracleResult.PASSING, OracleResult.FAILING]
+        errors = []
+        done = threading.Event()
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, interval)
+
+        def read(corpus):
+            while not done.is_set():
+                for inp in inputs:
+                    try:
+                        if corpus.label(inp, "grep.3c3bdace") not in labels + [None]:
+                            errors.append(inp)
+                        corpus.metadata(inp)
+                    except Exception as ex:
+                        errors.append(ex)
+
+        # tiny blocks, so that nearly every label flushes the pending block
+        with Corpus(self.path, block_size=256) as corpus:
+            readers = [threading.Thread(target=read, args=(corpus,)) for _ in range(3)]
+            for reader in readers:
+                reader.start()
+            try:
+                for turn in range(50):
+                    for index, inp in enumerate(inputs):
+                        corpus.set_label(inp, "grep.3c3bdace", labels[(turn + index) % 2])
+            finally:
+                done.set()
+                for reader in readers:
+                    reader.join()
+            self.assertEqual([], errors)
+            self.assertEqual([(inp, labels[(49 + index) % 2]) for index, inp in enumerate(inputs)],
+                             list(corpus.labels("grep.3c3bdace")))
+
+    def test_single_writer(self):
+        with Corpus(self.path):
+            with self.assertRaises(AssertionError):
+                Corpus(self.path)
+        Corpus(self.path).close()
+
+    def test_recovery(self):
+        with Corpus(self.path) as corpus:
+            corpus.set_label("printf 'a' | grep a", "grep.3c3bdace", OracleResult.FAILING)
+        # lose the index, and append half a block
+        (self.path / "index.bin").unlink()
+        with open(self.path / "segment-000000.dat", "ab") as segment:
+            segment.write(b"\0\0\1\0")
+        with Corpus(self.path) as corpus:
+            self.assertEqual(OracleResult.FAILING, corpus.label("printf 'a' | grep a", "grep.3c3bdace"))
+            corpus.add("printf 'b' | grep a")
+        with Corpus(self.path) as corpus:
+            self.assertEqual(["printf 'a' | grep a", "printf 'b' | grep a"], [inp for inp, _ in corpus.inputs()])
+
+
+if __name__ == "__main__":
+    unittest.main()
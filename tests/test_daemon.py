@@ -0,0 +1,123 @@
+import asyncio
+import contextlib
+import gc
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from dbgbench.framework.daemon import AsyncRunnerDaemon, RunnerDaemon
+from dbgbench.framework.helpers import write_frame
+from dbgbench.subjects import Grep3c3bdace
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "evaluation"))
+from benchmark import FakeContainer, distinct_inputs  # noqa: E402
+
+
+class FakeRunnerTestCase(unittest.TestCase):
+    """
+    Runs the real grep runner script and protocol through evaluation/fake_runner.py, without Docker or subjects.
+    """
+
+    workers = 2
+
+    def setUp(self):
+        self.log = Path(tempfile.mkdtemp()) / "samples.log"
+        environment = mock.patch.dict(os.environ, {"FAKE_SAMPLE_SECONDS": "0.1", "FAKE_SAMPLE_LOG": str(self.log)})
+        environment.start()
+        self.addCleanup(environment.stop)
+        self.bug = Grep3c3bdace()
+        self.container = FakeContainer("grep", "test_daemon")
+        self.container.start()
+        self.addCleanup(self.container.stop)
+        self.bug._setup_container_files(self.container)
+        self.daemon = RunnerDaemon(self.container, self.bug._runner_in(self.container), workers=self.workers)
+        self.addCleanup(self.daemon.stop)
+
+    def executed(self) -> int:
+        if not self.log.exists():
+            return 0
+        return len(self.log.read_text().splitlines())
+
+
+class StreamTest(FakeRunnerTestCase):
+    def test_execute(self):
+        clis = distinct_inputs(6)
+        batch = self.daemon.execute(self.bug.subject(), clis)
+        self.assertEqual(clis, batch.column("line"))
+        self.assertEqual(6, self.executed())
+
+    def test_early_stop_drops_queued_samples(self):
+        clis = distinct_inputs(40)
+        with contextlib.closing(self.daemon.stream(self.bug.subject(), clis)) as rows:
+            next(rows)
+        self.assertFalse(self.daemon.is_alive())
+        # give orphaned workers the time to run a few more samples, if there were any
+        time.sleep(1.5)
+        self.assertLess(self.executed(), 10)
+
+        # the next batch starts a new runner
+        self.assertEqual(3, len(self.daemon.execute(self.bug.subject(), clis[:3])))
+
+    def test_runner_drops_queued_samples_when_stdin_closes(self):
+        # what a Docker runner sees when the `docker exec` client is killed
+        process = self.container.popen(["python3", self.bug._runner_in(self.container), "--serve",
+                                        "--workers", str(self.workers)])
+        for request_id, cli in enumerate(distinct_inputs(40)):
+            write_frame(process.stdin, [str(request_id).encode("ascii"), self.bug.subject().encode("utf-8"),
+                                        cli.encode("utf-8")])
+        process.stdin.close()
+        process.stdout.close()
+        self.assertEqual(0, process.wait(timeout=2))
+        time.sleep(1.5)
+        self.assertLess(self.executed(), 10)
+
+    def test_streams_are_not_reentrant(self):
+        clis = distinct_inputs(4)
+        with contextlib.closing(self.daemon.stream(self.bug.subject(), clis)) as rows:
+            next(rows)
+            with self.assertRaises(RuntimeError):
+                self.daemon.execute(self.bug.subject(), clis)
+        self.assertEqual(4, len(self.daemon.execute(self.bug.subject(), clis)))
+
+
+class SerialStreamTest(StreamTest):
+    workers = 1
+
+
+class AsyncStopTest(FakeRunnerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.daemon = AsyncRunnerDaemon(self.container, self.bug._runner_in(self.container), workers=self.workers)
+        self.addCleanup(self.daemon.stop)
+
+    def test_runner_is_reaped_when_the_loop_shuts_down(self):
+        async def main():
+            await self.daemon.execute(self.bug.subject(), distinct_inputs(2))
+            return self.daemon._process
+
+        unraisable = []
+        with mock.patch("sys.unraisablehook", unraisable.append):
+            process = asyncio.run(main())
+            self.assertIsNotNone(process.returncode)
+            # as in tear_down after asyncio.run()
+            self.daemon.stop()
+            gc.collect()
+        self.assertEqual([], [hook.exc_value for hook in unraisable])
+
+    def test_stop_in_the_loop_reaps_the_runner(self):
+        async def main():
+            await self.daemon.execute(self.bug.subject(), distinct_inputs(2))
+            process = self.daemon._process
+            self.daemon.stop()
+            await asyncio.wait_for(self.daemon._watcher, 2)
+            return process
+
+        self.assertEqual(-9, asyncio.run(main()).returncode)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from dbgbench.framework import docker
+from dbgbench.framework.docker import DBGBenchContainer
+
+
+class ImageArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.dbgbench = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dbgbench, ignore_errors=True)
+        (self.dbgbench / "docker" / "scripts").mkdir(parents=True)
+        (self.dbgbench / "docker" / "run.sh").write_text("docker run debugstudy$subject\n")
+        for subject in ["grep", "find"]:
+            (self.dbgbench / "docker" / "scripts" / f"docker.{subject}").write_text("FROM ubuntu:14.04\n")
+        for patch in [mock.patch.object(docker, "dbgbench_dir", return_value=self.dbgbench),
+                      mock.patch.dict(os.environ, {"DBGBENCH_CACHE_DIR": str(self.dbgbench / "cache")})]:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_archive_is_keyed_by_the_base_image(self):
+        grep = DBGBenchContainer("grep", "test_docker").image_archive()
+        self.assertEqual(grep, DBGBenchContainer("grep", "test_docker_2").image_archive())
+        self.assertNotEqual(grep, DBGBenchContainer("find", "test_docker").image_archive())
+
+        (self.dbgbench / "docker" / "scripts" / "docker.grep").write_text("FROM ubuntu:16.04\n")
+        self.assertNotEqual(grep, DBGBenchContainer("grep", "test_docker").image_archive())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,194 @@
+import io
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+from dbgbench.framework import external_exec as execute
+
+
+class LogTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_codecs(self):
+        for codec, suffix in [("bz2", ".bz2"), ("gzip", ".gz"), ("xz", ".xz")]:
+            logfile = self.tmp / f"run.log{suffix}"
+            execute.run(["printf", "a\\nb\\n"], logfile)
+            execute.run(["printf", "c\\n"], logfile)
+            with execute.codecs[codec](str(logfile), "rb") as log:
+                self.assertEqual(b"printf a\\nb\\n\na\nb\nprintf c\\n\nc\n", log.read())
+
+    def test_failure(self):
+        logfile = self.tmp / "run.log.gz"
+        with self.assertRaises(subprocess.CalledProcessError):
+            execute.run(["sh", "-c", "echo failing; exit 3"], logfile)
+        self.assertEqual(3, execute.run(["sh", "-c", "exit 3"], logfile, check=False).returncode)
+
+    def test_rotation(self):
+        logfile = self.tmp / "run.log.gz"
+        with execute.LogWriter(logfile, max_bytes=1000, backups=2) as log:
+            # random data does not compress
+            for _ in range(10):
+                log.write(os.urandom(600))
+        self.assertEqual(["run.log.gz", "run.log.gz.1", "run.log.gz.2"], sorted(path.name for path in self.tmp.iterdir()))
+
+    def test_rotation_counts_uncompressed_output(self):
+        logfile = self.tmp / "run.log.gz"
+        with execute.LogWriter(logfile, max_bytes=1000, backups=200) as log:
+            # compressible output, 600 bytes per write: a log is full after its second write
+            for i in range(200):
+                log.write(b"%03d" % (i % 10) * 200)
+        sizes = []
+        for path in self.tmp.iterdir():
+            with execute.codecs["gzip"](str(path), "rb") as written:
+                sizes.append(len(written.read()))
+        self.assertEqual([1200] * 100, sizes)
+
+    def test_spills_instead_of_blocking(self):
+        logfile = self.tmp / "run.log.gz"
+        log = execute.LogWriter(logfile, max_pending=1)
+        for i in range(1000):
+            log.write(b"%04d" % i * 250)
+        log.close()
+        with execute.codecs["gzip"](str(logfile), "rb") as written:
+            content = written.read()
+        self.assertEqual(b"".join(b"%04d" % i * 250 for i in range(1000)), content)
+        self.assertLess(0, log.spilled)
+
+
+class CaptureOutputTest(unittest.TestCase):
+    def test_within_limit(self):
+        self.assertEqual((3, b"out\n", False), execute.capture_output(["sh", "-c", "echo out; exit 3"], 100))
+
+    def test_endless_output_is_cut_off(self):
+        start = time.monotonic()
+        rc, output, truncated = execute.capture_output(["sh", "-c", "timeout 10s yes"], 1000)
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertTrue(truncated)
+        self.assertEqual(b"y\n" * 500, output)
+        self.assertNotEqual(0, rc)
+
+
+class SpawnHelperTest(unittest.TestCase):
+    def setUp(self):
+        execute.setup()
+        self.helper = execute.pool
+
+    def tearDown(self):
+        execute.teardown()
+
+    def test_commands_run_in_helper(self):
+        self.assertIsNotNone(self.helper)
+        self.assertEqual(str(self.helper._process.pid).encode(),
+                         execute.check_output(["sh", "-c", "echo $PPID"]).strip())
+        self.assertEqual(b"x\n", execute.run(["echo", "x"], None).stdout)
+        with self.assertRaises(subprocess.CalledProcessError) as context:
+            execute.check_output(["sh", "-c", "echo out; exit 2"])
+        self.assertEqual(2, context.exception.returncode)
+        self.assertEqual(b"out\n", context.exception.output)
+
+    def test_concurrent_callers(self):
+        start = time.monotonic()
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(lambda i: execute.check_output(["sh", "-c", f"sleep 0.3; echo {i}"]),
+                                        range(8)))
+        self.assertEqual([f"{i}\n".encode() for i in range(8)], results)
+        self.assertLess(time.monotonic() - start, 8 * 0.3)
+
+    def test_unpicklable_arguments_run_directly(self):
+        output = execute.check_output(["sh", "-c", "echo $PPID"], preexec_fn=lambda: None)
+        self.assertEqual(str(os.getpid()).encode(), output.strip())
+
+
+def answering_helper(answers: str) -> execute.SpawnHelper:
+    """
+    A SpawnHelper whose helper process writes the given answers (Python expressions) and then waits,
+    with requests 0 and 1 pending.
+    """
+    helper = object.__new__(execute.SpawnHelper)
+    script = "import pickle, sys, time\n" \
+             "class Local:\n" \
+             "    pass\n" \
+             f"for answer in [{answers}]:\n" \
+             "    pickle.dump(answer, sys.stdout.buffer)\n" \
+             "sys.stdout.flush()\n" \
+             "sys.stdin.read()\n"
+    helper._process = subprocess.Popen([sys.executable, "-c", script], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    helper._pending = {0: Future(), 1: Future()}
+    helper._lock = threading.Lock()
+    return helper
+
+
+class ServeTest(unittest.TestCase):
+    def test_unreadable_requests_are_answered(self):
+        inp = io.BytesIO()
+        pickle.dump((1, b"not a pickle"), inp)
+        pickle.dump((2, pickle.dumps(("run", ["true"]))), inp)
+        pickle.dump((3, pickle.dumps(("check_output", ["printf", "ok"], None, {}))), inp)
+        inp.seek(0)
+        out = io.BytesIO()
+        threads = []
+        new_thread = threading.Thread
+
+        def thread(**kwargs):
+            threads.append(new_thread(**kwargs))
+            return threads[-1]
+
+        with mock.patch.object(execute.threading, "Thread", side_effect=thread):
+            execute.serve(inp, out)
+        for started in threads:
+            started.join(5)
+        out.seek(0)
+        answers = {}
+        while out.tell() < len(out.getvalue()):
+            request_id, ok, value = pickle.load(out)
+            answers[request_id] = (ok, value)
+        self.assertEqual({1, 2, 3}, set(answers))
+        self.assertFalse(answers[1][0])
+        self.assertIsInstance(answers[1][1], pickle.UnpicklingError)
+        self.assertFalse(answers[2][0])
+        self.assertIsInstance(answers[2][1], ValueError)
+        self.assertEqual((True, b"ok"), answers[3])
+
+
+class SpawnHelperReaderTest(unittest.TestCase):
+    def test_unknown_answers_are_ignored(self):
+        helper = answering_helper("(7, True, 'stale'), (0, True, 'ok')")
+        process, first, second = helper._process, helper._pending[0], helper._pending[1]
+        process.stdin.close()
+        helper._read()
+        self.assertEqual("ok", first.result(timeout=0))
+        with self.assertRaises(RuntimeError):
+            second.result(timeout=0)
+        process.wait()
+        process.stdout.close()
+
+    def test_unreadable_answer_fails_all_pending(self):
+        # the class of the answer only exists in the helper, so unpickling it raises an AttributeError
+        helper = answering_helper("(0, True, Local())")
+        process, pending = helper._process, list(helper._pending.values())
+        with self.assertLogs(level="ERROR"):
+            helper._read()
+        for future in pending:
+            with self.assertRaises(RuntimeError):
+                future.result(timeout=0)
+        self.assertIsNotNone(process.poll())
+        self.assertIsNone(helper._process)
+        process.stdin.close()
+        process.stdout.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
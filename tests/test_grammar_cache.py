@@ -0,0 +1,70 @@
+import importlib.util
+import io
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from dbgbench.resources import _GrammarPickler, get_grep_grammar_path, get_grep_samples, load_grammar
+
+
+def installed(*modules: str) -> bool:
+    return all(importlib.util.find_spec(module) is not None for module in modules)
+
+
+class Reduced:
+    """
+    Not a fandango class, so it is pickled with its own __reduce__ even though it caches a hash.
+    """
+
+    def __init__(self, value):
+        self.value = value
+        self._hash_cache = hash(value)
+
+    def __reduce__(self):
+        return Reduced, (self.value,)
+
+
+class GrammarPicklerTest(unittest.TestCase):
+    def test_other_objects_keep_their_reduction(self):
+        buffer = io.BytesIO()
+        _GrammarPickler(buffer, pickle.HIGHEST_PROTOCOL).dump([Reduced("x"), os])
+        loaded, module = pickle.loads(buffer.getvalue())
+        self.assertEqual(hash("x"), loaded._hash_cache)
+        self.assertIs(os, module)
+
+
+@unittest.skipUnless(installed("fandango", "fandangoLearner"), "needs fandango and fandangoLearner")
+class GrammarCacheTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        environment = mock.patch.dict(os.environ, {"DBGBENCH_CACHE_DIR": directory})
+        environment.start()
+        self.addCleanup(environment.stop)
+
+    def test_second_load_uses_the_pickle(self):
+        from fandango.language.parse import Grammar
+        from fandango.language.tree import DerivationTree
+        from dbgbench.framework.util import escape_non_ascii_utf8
+
+        parsed, constraints = load_grammar(get_grep_grammar_path())
+        with mock.patch("fandangoLearner.interface.fandango.parse") as parse:
+            grammar, cached_constraints = load_grammar(get_grep_grammar_path())
+        parse.assert_not_called()
+
+        self.assertIsInstance(grammar, Grammar)
+        self.assertIsNot(parsed, grammar)
+        self.assertEqual(len(constraints), len(cached_constraints))
+        for _ in range(20):
+            tree = grammar.fuzz(max_nodes=100)
+            self.assertIsInstance(tree, DerivationTree)
+            self.assertIsInstance(grammar.parse(str(tree)), DerivationTree)
+        for sample in get_grep_samples():
+            self.assertIsInstance(grammar.parse(escape_non_ascii_utf8(sample)), DerivationTree)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,10 +3,8 @@ import unittest
 from fandango.language.parse import Grammar
 from fandango.language.tree import DerivationTree
 
-from fandangoLearner.interface.fandango import parse
-
 from dbgbench.framework.oraclesresult import OracleResult
-from dbgbench.resources import get_grep_grammar_path, get_grep_samples
+from dbgbench.resources import get_grep_grammar, get_grep_samples
 from dbgbench.framework.util import escape_non_ascii_utf8
 from dbgbench.subjects import *
 
@@ -14,8 +12,7 @@ from dbgbench.subjects import *
 class GrepBugsTest(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
-        grammar_path = get_grep_grammar_path()
-        cls.grammar, cls.constraints = parse(grammar_path)
+        cls.grammar, cls.constraints = get_grep_grammar()
 
         cls.samples = get_grep_samples()
 
@@ -0,0 +1,65 @@
+import asyncio
+import io
+import unittest
+
+from dbgbench.framework.daemon import read_frame_async
+from dbgbench.framework.helpers import read_frame, read_records, write_frame, write_record
+
+
+class FrameTest(unittest.TestCase):
+    frames = [
+        [b"0", b"grep.3c3bdace", b"printf 'a' | timeout 0.5s grep a"],
+        [b"", None, b"\x00\xff" * 1000, None],
+        [],
+    ]
+
+    def encoded(self) -> bytes:
+        stream = io.BytesIO()
+        for frame in self.frames:
+            write_frame(stream, frame)
+        return stream.getvalue()
+
+    def test_round_trip(self):
+        stream = io.BytesIO(self.encoded())
+        self.assertEqual(self.frames, [read_frame(stream) for _ in self.frames])
+        self.assertIsNone(read_frame(stream))
+
+    def test_truncated_frame(self):
+        data = self.encoded()
+        for end in [2, 10, len(data) - 1]:
+            with self.subTest(end=end):
+                stream = io.BytesIO(data[:end])
+                with self.assertRaises(AssertionError):
+                    while read_frame(stream) is not None:
+                        pass
+
+    def test_async_round_trip(self):
+        async def read(data):
+            stream = asyncio.StreamReader()
+            stream.feed_data(data)
+            stream.feed_eof()
+            frames = []
+            while (frame := await read_frame_async(stream)) is not None:
+                frames.append(frame)
+            return frames
+
+        self.assertEqual(self.frames, asyncio.run(read(self.encoded())))
+        with self.assertRaises(AssertionError):
+            asyncio.run(read(self.encoded()[:-1]))
+
+    def test_records(self):
+        records = [
+            {"file": "0.cli", "line": "printf 'ä' | grep ä", "return code": 0, "output": b"\xc3\xa4\n",
+             "input": b"\xc3\xa4", "duration": 0.25, "truncated": False},
+            {"file": "1.cli", "line": "grep -q", "return code": -9, "output": b"", "input": None,
+             "duration": 1.5, "truncated": True},
+        ]
+        stream = io.BytesIO()
+        for record in records:
+            write_record(stream, record)
+        stream.seek(0)
+        self.assertEqual(records, list(read_records(stream)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from dbgbench.framework.base import BaseDbgbenchBug
+from dbgbench.framework.local import LocalContainer
+from dbgbench.framework.oraclesresult import OracleResult
+from dbgbench.framework.pool import ContainerPool
+from dbgbench.subjects import Grep3c3bdace
+
+
+def make_subjects(directory: Path) -> Path:
+    """
+    Lay out a subjects directory with a grep.3c3bdace whose grep is the host's grep,
+    except that it crashes (return code 139) on arguments containing CRASH.
+    """
+    grep = directory / "grep1" / "grep" / "src" / "grep"
+    grep.parent.mkdir(parents=True)
+    (directory / "grep1" / "grep.3c3bdace").touch()
+    grep.write_text("#!/bin/bash\n"
+                    "case \"$*\" in *CRASH*) exit 139;; esac\n"
+                    f"exec {shutil.which('grep')} \"$@\"\n")
+    grep.chmod(0o755)
+    return directory
+
+
+@unittest.skipUnless(shutil.which("grep") and shutil.which("timeout"), "needs grep and timeout on the host")
+class LocalBackendTest(unittest.TestCase):
+    clis = ["printf 'a\\nb\\n' | timeout 0.5s grep a",
+            "printf 'CRASH' | timeout 0.5s grep CRASH",
+            "printf 'x%dy' | timeout 0.5s grep -c y"] + \
+           [f"printf '{i}\\n' | timeout 0.5s grep {i}" for i in range(5)]
+    expected = [OracleResult.PASSING, OracleResult.FAILING] + [OracleResult.PASSING] * 6
+
+    def setUp(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        environment = mock.patch.dict(os.environ, {"DBGBENCH_LOCAL_SUBJECTS": str(make_subjects(directory))})
+        environment.start()
+        self.addCleanup(environment.stop)
+        self.pool = ContainerPool()
+        self.addCleanup(self.pool.clear)
+
+    def bug(self) -> BaseDbgbenchBug:
+        return Grep3c3bdace(backend="local", pool=self.pool)
+
+    def test_execute_samples(self):
+        with self.bug() as bug:
+            results = bug.execute_samples(self.clis)
+            runner = bug._runner(bug.container())._process.pid
+            self.assertEqual(self.expected[:2], [oracle for _, oracle in bug.execute_samples(self.clis[:2])])
+            # the runner persists across batches
+            self.assertEqual(runner, bug._runner(bug.container())._process.pid)
+        self.assertEqual(list(zip(self.clis, self.expected)), results)
+
+    def test_rows(self):
+        with self.bug() as bug:
+            batch = bug._execute(bug._runner(bug.container()), self.clis[:3])
+        self.assertEqual(self.clis[:3], batch.line)
+        self.assertEqual([0, 139, 0], batch.return_code)
+        self.assertEqual([b"a\nb\n", b"CRASH", b"x0y"], batch.input)
+        self.assertEqual(b"a\n\nGrep terminated\n", batch.output[0])
+        self.assertEqual([False] * 3, batch.truncated)
+
+    def test_shards(self):
+        with self.bug() as bug:
+            with mock.patch("os.cpu_count", return_value=6):
+                self.assertEqual(list(zip(self.clis, self.expected)), bug.execute_samples(self.clis, shards=3))
+            # the shards split the cores between them
+            self.assertEqual(2, bug.container().daemons[bug._sample_runner_path()].workers)
+            extra = [container for container, _ in self.pool._idle["local", "grep"]]
+            self.assertEqual([2, 2], [container.daemons[bug._sample_runner_path()].workers for container in extra])
+            # without shards, the runner uses all cores again
+            bug.execute_samples(["printf 'z\\n' | timeout 0.5s grep z"])
+            self.assertEqual(0, bug.container().daemons[bug._sample_runner_path()].workers)
+        # the bug's own container and those of the two extra shards went back to the pool
+        self.assertEqual(3, len(self.pool._idle["local", "grep"]))
+
+    def test_shard_workers(self):
+        with mock.patch("os.cpu_count", return_value=8):
+            self.assertEqual([0, 0, 4, 2, 1], [BaseDbgbenchBug._shard_workers(shards) for shards in [0, 1, 2, 3, 16]])
+
+    def test_shard_chunks(self):
+        self.assertEqual([[0, 1], [2, 3, 4], [5, 6, 7]], BaseDbgbenchBug._shard_chunks(list(range(8)), 3))
+        self.assertEqual([[0], [1]], BaseDbgbenchBug._shard_chunks([0, 1], 4))
+        self.assertEqual([[]], BaseDbgbenchBug._shard_chunks([], 2))
+
+    def test_resource_limits(self):
+        container = LocalContainer("grep", "test_local")
+        container.start()
+        self.addCleanup(container.stop)
+        self.assertEqual(b"0\n", container.check_output(["sh", "-c", "ulimit -c"]))
+        self.assertEqual(str(container.container_root_dir() / "tmp").encode(),
+                         container.check_output(["sh", "-c", "printf %s \"$TMPDIR\""]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+from dbgbench.framework.minimize import GrepSample, Minimizer
+from dbgbench.framework.oraclesresult import OracleResult
+
+
+class FakeBug:
+    """Fails every grep call with -i whose input contains 'bug', and records the batches."""
+
+    def __init__(self):
+        self.batches = []
+
+    def subject(self):
+        return "grep.fake"
+
+    def execute_samples(self, test_inputs):
+        self.batches.append(list(test_inputs))
+        return [(inp, self._oracle(inp)) for inp in test_inputs]
+
+    @staticmethod
+    def _oracle(inp):
+        sample = GrepSample.parse(inp)
+        if "-i" in sample.arguments and "bug" in (sample.payload or "").replace("\\n", ""):
+            return OracleResult.FAILING
+        return OracleResult.PASSING
+
+
+class MinimizerTest(unittest.TestCase):
+    cli = "printf 'xbu\\ngz\\n' | LC_ALL=C timeout 0.5s grep -E -i -n '--color=never' 'b.*g'"
+
+    def test_parse(self):
+        sample = GrepSample.parse(self.cli)
+        self.assertEqual(["-E", "-i", "-n", "'--color=never'", "'b.*g'"], sample.arguments)
+        self.assertEqual(["x", "b", "u", "\\n", "g", "z", "\\n"], sample.units())
+        self.assertEqual(self.cli, str(sample))
+
+    def test_minimize(self):
+        bug = FakeBug()
+        minimizer = Minimizer(bug)
+        self.assertEqual("printf 'bug' | LC_ALL=C timeout 0.5s grep -i", minimizer.minimize(self.cli))
+        executed = [cli for batch in bug.batches for cli in batch]
+        self.assertEqual(len(executed), len(set(executed)))
+        self.assertEqual(minimizer.rounds, len(bug.batches))
+        self.assertLess(1, max(len(batch) for batch in bug.batches))
+
+        # everything needed is cached by now
+        minimizer.minimize(self.cli)
+        self.assertEqual(minimizer.rounds, len(bug.batches))
+
+    def test_passing_sample(self):
+        with self.assertRaises(AssertionError):
+            Minimizer(FakeBug()).minimize("printf 'a' | timeout 0.5s grep -i 'a'")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,231 @@
+import random
+import re
+import unittest
+
+from dbgbench.framework import oracles
+from dbgbench.framework.oracles import ParsedCommand, contains_one_of_option, contains_option, \
+    contains_option_with_arg, find_arg_to, to_bytes
+from dbgbench.framework.oraclesresult import OracleResult
+from dbgbench.framework.printf import extract_input
+from dbgbench.framework.results import ResultBatch
+from dbgbench.resources import get_grep_samples
+
+
+# The per-row oracles as they were before the batch API, to check the batch kernels against.
+
+def reference_clear_grep(line, output):
+    output = output.replace(b'Binary file (standard input) matches\n', b'')
+    output = output.replace(b'\nGrep terminated\n', b'')
+    if contains_one_of_option(line, ["-H", "--with-filename"]):
+        if contains_one_of_option(line, ["--null", "-Z"]):
+            output = re.sub(oracles.null_name_pattern, b"", output)
+        else:
+            output = re.sub(oracles.name_pattern, b"", output)
+    if "--color" in line or '--colour' in line:
+        output = re.sub(oracles.color_pattern, b'', output)
+        output = re.sub(oracles.control_pattern, b'', output)
+    if contains_one_of_option(line, ["-n", "--line-number", "-T", "--null", "-Z"]):
+        output = re.sub(oracles.count_pattern, b"", output)
+    if contains_one_of_option(line, ["--byte-offset", "-b", "-u", "--unix-byte-offsets"]):
+        output = re.sub(oracles.count_pattern, b"", output)
+    return output
+
+
+suppress_output = ["-c", "--count", "-L", "--files-without-match", "-l", "--files-with-matches",
+                   "-q", "--quiet", "--silent"]
+
+
+def reference_no_new_text(row):
+    if row["output"] is None:
+        return OracleResult.PASSING
+    if contains_one_of_option(row["line"], suppress_output):
+        return OracleResult.PASSING
+    if row["return code"] not in [0, 1]:
+        return OracleResult.PASSING
+    if contains_option_with_arg(row["line"], "\'--label="):
+        return OracleResult.PASSING
+    inp = to_bytes(row["input"])
+    if inp is None:
+        return OracleResult.PASSING
+    output = reference_clear_grep(row["line"], to_bytes(row["output"]))
+    if b'grep: Invalid back reference\n' in output:
+        return OracleResult.PASSING
+    for c in output[:-1]:
+        if c not in inp:
+            return OracleResult.FAILING
+    return OracleResult.PASSING
+
+
+def reference_line(row):
+    if row["output"] is None:
+        return OracleResult.PASSING
+    if contains_one_of_option(row["line"], ['-L', '-l', '-o', '--only-matching']):
+        return OracleResult.PASSING
+    if contains_one_of_option(row["line"], suppress_output):
+        return OracleResult.PASSING
+    if row["return code"] not in [0, 1]:
+        return OracleResult.PASSING
+    if contains_option_with_arg(row["line"], "\'--label="):
+        return OracleResult.PASSING
+    inp = to_bytes(row["input"])
+    if inp is None:
+        return OracleResult.PASSING
+    inp = inp.splitlines()
+    output = reference_clear_grep(row["line"], to_bytes(row["output"]))
+    if b'grep: Invalid back reference\n' in output:
+        return OracleResult.PASSING
+    for outline in output[:-1].splitlines():
+        if outline not in inp:
+            return OracleResult.FAILING
+    return OracleResult.PASSING
+
+
+def reference_no_new_line(row):
+    end = b'\n'[0]
+    if contains_one_of_option(row['line'], ['-z', '--null-data']):
+        end = b'\x00'[0]
+    output = to_bytes(row["output"]).replace(b"\nGrep terminated\n", b"")
+    if output.startswith(b'grep:'):
+        return OracleResult.PASSING
+    if 0 != len(output) and output[-1] != end:
+        return OracleResult.FAILING
+    return OracleResult.PASSING
+
+
+def reference_grep_wrapper(reference):
+    def apply(row):
+        if b"Grep terminated" not in to_bytes(row["output"]):
+            return OracleResult.UNDEFINED
+        return reference(row)
+    return apply
+
+
+options = ["-H", "--with-filename", "-Z", "--null", "-n", "--line-number", "-T", "-b", "--byte-offset", "-u",
+           "--color=always", "--colour=always", "-c", "-l", "-L", "-q", "-o", "--only-matching", "-z",
+           "--null-data", "-i", "-v", "-E", "'--label=x'"]
+decorations = [b"(standard input):", b"(standard input)\x00", b"12:", b"  3\t:", b"7-", b"\x1b[01;31m",
+               b"\x1b[m", b"\x1b[K", b"Binary file (standard input) matches\n", b"grep: Invalid back reference\n",
+               b"new", b"\x00", b"\n"]
+
+
+def sample_rows(seed: int, count: int) -> list[dict]:
+    """
+    Rows built from the bundled grep samples with extra options, and outputs made of input lines
+    with the decorations grep adds, plus some text grep could not have written.
+    """
+    rng = random.Random(seed)
+    samples = [sample.strip() for sample in get_grep_samples()]
+    rows = []
+    for _ in range(count):
+        line = rng.choice(samples)
+        program = line.rfind(" grep ") + len(" grep ")
+        extra = " ".join(rng.sample(options, rng.randint(0, 3)))
+        if extra:
+            line = line[:program] + extra + " " + line[program:]
+        inp = extract_input(line)
+        if inp is None or rng.random() < 0.05:
+            inp = None if rng.random() < 0.5 else b"abc\ndef\n"
+        lines = (inp or b"x\n").splitlines() or [b""]
+        output = b""
+        for _ in range(rng.randint(0, 4)):
+            prefix = b"".join(rng.sample(decorations, rng.randint(0, 2)))
+            text = rng.choice(lines)
+            if rng.random() < 0.2 and text:
+                cut = rng.randint(0, len(text))
+                text = text[:cut] + text[cut + 1:]
+            output += prefix + text + rng.choice([b"\n", b"\x00", b""])
+        if rng.random() < 0.8:
+            output += b"\nGrep terminated\n"
+        rows.append({
+            "line": line,
+            "return code": rng.choice([0, 0, 1, 1, 2, 124, 134, 139]),
+            "output": None if rng.random() < 0.02 else output,
+            "input": inp,
+        })
+    return rows
+
+
+class BatchEquivalenceTest(unittest.TestCase):
+    crafted = [
+        {"line": "printf 'a\\nb\\n' | timeout 0.5s grep -H 'a'", "return code": 0,
+         "output": b"(standard input):a\n\nGrep terminated\n", "input": b"a\nb\n"},
+        {"line": "printf 'a\\nb\\n' | timeout 0.5s grep -H -Z 'a'", "return code": 0,
+         "output": b"(standard input)\x00a\n\nGrep terminated\n", "input": b"a\nb\n"},
+        {"line": "printf 'a\\nb\\n' | timeout 0.5s grep --color=always -n 'a'", "return code": 0,
+         "output": b"1:\x1b[01;31m\x1b[Ka\x1b[m\x1b[K\n\nGrep terminated\n", "input": b"a\nb\n"},
+        {"line": "printf 'ab\\n' | timeout 0.5s grep -o 'a'", "return code": 0,
+         "output": b"a\n\nGrep terminated\n", "input": b"ab\n"},
+        {"line": "printf 'ab\\n' | timeout 0.5s grep 'a'", "return code": 0,
+         "output": b"ac\n\nGrep terminated\n", "input": b"ab\n"},
+        {"line": "printf 'ab\\n' | timeout 0.5s grep -z 'a'", "return code": 0,
+         "output": b"ab\n\x00\nGrep terminated\n", "input": b"ab\n"},
+        {"line": "printf 'ab\\n' | timeout 0.5s grep 'a'", "return code": 0,
+         "output": b"ab", "input": b"ab\n"},
+        {"line": "printf 'ab\\n' | timeout 0.5s grep 'a'", "return code": 2,
+         "output": b"grep: Invalid back reference\n\nGrep terminated\n", "input": b"ab\n"},
+        {"line": "printf 'ab\\n' | timeout 0.5s grep '--label=x' 'a'", "return code": 0,
+         "output": b"x:ab\n\nGrep terminated\n", "input": b"ab\n"},
+        {"line": "timeout 0.5s grep -c 'a'", "return code": 1, "output": b"0\n\nGrep terminated\n", "input": None},
+        {"line": "printf '' | timeout 0.5s grep 'a'", "return code": 1, "output": b"\nGrep terminated\n",
+         "input": b""},
+    ]
+
+    def assertEquivalent(self, oracle, reference, rows):
+        batch = ResultBatch.from_records(rows)
+        expected = [reference(row) for row in rows]
+        self.assertEqual(expected, oracle.apply_batch(None, batch))
+        self.assertEqual(expected, [oracle.apply_oracle(None, row) for row in rows])
+
+    def test_equivalence(self):
+        pairs = [
+            (oracles.NoNewTextOracle(), reference_no_new_text),
+            (oracles.LineOracle(), reference_line),
+            (oracles.NoNewLineOracle(), reference_no_new_line),
+            (oracles.GrepWrapper(oracles.NoNewTextOracle()), reference_grep_wrapper(reference_no_new_text)),
+            (oracles.GrepWrapper(oracles.LineOracle()), reference_grep_wrapper(reference_line)),
+        ]
+        rows = self.crafted + sample_rows(0, 5000)
+        nonempty = [row for row in rows if row["output"] is not None]
+        for oracle, reference in pairs:
+            with self.subTest(oracle=oracle.name()):
+                self.assertEquivalent(oracle, reference,
+                                      rows if isinstance(oracle, (oracles.NoNewTextOracle, oracles.LineOracle))
+                                      else nonempty)
+
+    def test_rows_cover_both_outcomes(self):
+        results = [reference_no_new_text(row) for row in sample_rows(0, 5000)]
+        self.assertIn(OracleResult.FAILING, results)
+        self.assertIn(OracleResult.PASSING, results)
+        self.assertEqual([OracleResult.PASSING, OracleResult.PASSING, OracleResult.PASSING, OracleResult.PASSING,
+                          OracleResult.FAILING], [reference_no_new_text(row) for row in self.crafted[:5]])
+
+    def test_parsed_command(self):
+        def outcome(args):
+            try:
+                return list(args)
+            except IndexError:
+                return IndexError
+
+        queries = ["-e", "-f", "-i", "-H", "--label=", "'a'"]
+        lines = [row["line"] for row in self.crafted + sample_rows(2, 1000)]
+        # options without argument at the end of the line
+        lines += ["timeout 0.5s grep 'a' -e", "timeout 0.5s grep -f -e"]
+        for line in lines:
+            command = ParsedCommand(line)
+            for query in queries:
+                self.assertEqual(contains_option(line, query), command.has_option(query))
+                self.assertEqual(contains_option_with_arg(line, query), command.has_option_with_arg(query))
+            self.assertEqual(contains_one_of_option(line, queries), command.has_one_of(queries))
+            for options in [["-e"], ["-f", "-e"], ["--label=x"]]:
+                self.assertEqual(outcome(find_arg_to(line, options)), outcome(command.args_to(options)), line)
+        self.assertEqual(IndexError, outcome(ParsedCommand("timeout 0.5s grep 'a' -e").args_to(["-e"])))
+
+    def test_clear_grep(self):
+        for row in self.crafted + sample_rows(1, 2000):
+            if row["output"] is not None:
+                self.assertEqual(reference_clear_grep(row["line"], row["output"]),
+                                 oracles.clear_grep(row["line"], row["output"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
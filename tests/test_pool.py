@@ -0,0 +1,91 @@
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+from dbgbench.framework import pool as pool_module
+from dbgbench.framework.pool import ContainerPool
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "evaluation"))
+from benchmark import FakeContainer  # noqa: E402,F401 (registers the "fake" backend)
+
+
+class ContainerPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = ContainerPool(max_size=2)
+        self.addCleanup(self.pool.clear)
+
+    def lease(self):
+        container = self.pool.lease("grep", backend="fake")
+        self.addCleanup(container.stop)
+        return container
+
+    def idle(self) -> list:
+        return [container for container, _ in self.pool._idle["fake", "grep"]]
+
+    def test_released_containers_are_leased_again(self):
+        container = self.lease()
+        self.assertTrue(container.is_running())
+        self.pool.release(container)
+        self.assertEqual([container], self.idle())
+        self.assertIs(container, self.lease())
+        self.assertEqual([], self.idle())
+
+    def test_discarded_containers_are_stopped(self):
+        container = self.lease()
+        self.pool.release(container, discard=True)
+        self.assertFalse(container.is_running())
+        self.assertEqual([], self.idle())
+
+    def test_containers_beyond_max_size_are_stopped(self):
+        containers = [self.lease() for _ in range(3)]
+        for container in containers:
+            self.pool.release(container)
+        self.assertEqual(containers[:2], self.idle())
+        self.assertFalse(containers[2].is_running())
+
+    def test_unhealthy_containers_are_not_leased(self):
+        container = self.lease()
+        self.pool.release(container)
+        container.stop()
+        self.assertIsNot(container, self.lease())
+
+    def test_idle_containers_expire(self):
+        container = self.lease()
+        self.pool.release(container)
+        self.pool.idle_timeout = 0
+        self.assertIsNot(container, self.lease())
+        self.assertFalse(container.is_running())
+
+    def test_clear(self):
+        container = self.lease()
+        self.pool.release(container)
+        self.pool.clear()
+        self.assertFalse(container.is_running())
+        self.assertEqual([], self.idle())
+
+    def test_default_pool_is_created_once(self):
+        def slow_pool():
+            time.sleep(0.05)
+            return mock.Mock()
+
+        barrier = threading.Barrier(8)
+
+        def default_pool(_):
+            barrier.wait()
+            return pool_module.default_pool()
+
+        with mock.patch.object(pool_module, "_default_pool", None), \
+                mock.patch.object(pool_module, "ContainerPool", side_effect=slow_pool), \
+                mock.patch("atexit.register") as register:
+            with ThreadPoolExecutor(8) as executor:
+                pools = list(executor.map(default_pool, range(8)))
+        self.assertEqual(1, len({id(pool) for pool in pools}))
+        register.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import random
+import shutil
+import subprocess
+import unittest
+
+from dbgbench.framework.printf import PrintfError, UnsupportedFormat, extract_input, printf
+
+
+def bash_printf(fmt):
+    process = subprocess.run(["bash", "-c", "printf '{}'".format(fmt)], stdout=subprocess.PIPE,
+                             stderr=subprocess.DEVNULL, env=dict(os.environ, LANG="C.UTF-8", LC_ALL="C.UTF-8"))
+    return process.returncode, process.stdout
+
+
+@unittest.skipIf(shutil.which("bash") is None, "needs bash")
+class PrintfTest(unittest.TestCase):
+    escapes = ["\\a", "\\b", "\\c", "\\e", "\\E", "\\f", "\\n", "\\r", "\\t", "\\v", "\\z", "\\\\", "\\\"", "\\?",
+               "\\0", "\\08", "\\0101", "\\101", "\\377", "\\400", "\\1234", "\\x", "\\x4", "\\x41", "\\x123",
+               "\\xZ", "\\u", "\\u00e4", "\\u0000", "\\ud800", "\\U0001F600", "\\UZ", "a\\", "ä€"]
+    conversions = ["%%", "%s", "%5s", "%-5s|", "%.0s", "%05s", "%b", "%q", "%5q", "%.1q", "%c", "%3c", "%n",
+                   "%d", "%i", "%5d", "%-5d|", "%05d", "%+d", "% d", "% 05d", "%.0d", "%+.0d", "%05.2d", "%*d",
+                   "%.*d", "%lu", "%o", "%#o", "%#.0o", "%#05o", "%x", "%#x", "%#5x", "%#.0x", "%X", "%+u", "% x",
+                   "%e", "%E", "%-8.1e|", "%f", "%+08.2f", "%F", "%g", "%#g", "%G", "%a", "%A", "%.2a", "%#a",
+                   "%010a", "%+a", "%-8a|", "%jd", "%zd"]
+    errors = ["-f", "--", "-v", "%", "%-", "%5", "%.", "%5%", "%-%", "%k", "%B", "%hh"]
+
+    def assertBashEqual(self, fmt):
+        rc, expected = bash_printf(fmt)
+        self.assertEqual(0, rc, fmt)
+        self.assertEqual(expected, printf(fmt), fmt)
+
+    def test_escapes(self):
+        for fmt in self.escapes:
+            self.assertBashEqual(fmt)
+
+    def test_conversions(self):
+        for fmt in self.conversions:
+            self.assertBashEqual(fmt)
+
+    def test_errors(self):
+        for fmt in self.errors:
+            self.assertNotEqual(0, bash_printf(fmt)[0], fmt)
+            self.assertRaises(PrintfError, printf, fmt)
+
+    def test_unsupported(self):
+        self.assertRaises(UnsupportedFormat, printf, "%(%H)T")
+        self.assertRaises(UnsupportedFormat, printf, "\\U00110000")
+
+    def test_random_formats(self):
+        rng = random.Random(4711)
+        alphabet = "ab\\%xuU0179.-+# *sdfqcn\n"
+        for _ in range(2000):
+            fmt = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 10)))
+            rc, expected = bash_printf(fmt)
+            if rc != 0:
+                self.assertRaises(PrintfError, printf, fmt)
+            else:
+                self.assertEqual(expected, printf(fmt), repr(fmt))
+
+    def test_extract_input(self):
+        self.assertEqual(b"a\nb", extract_input("printf 'a\\nb' | timeout 0.5s grep a"))
+        self.assertIsNone(extract_input("timeout 0.5s grep a file.txt"))
+        self.assertIsNone(extract_input("printf '%k' | timeout 0.5s grep a"))
+
+    @unittest.skipUnless(shutil.which("bash"), "needs bash")
+    def test_extract_input_falls_back_to_bash(self):
+        self.assertRaises(UnsupportedFormat, printf, "a%(%%)Tb")
+        self.assertEqual(b"a%b", extract_input("printf 'a%(%%)Tb' | timeout 0.5s grep a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
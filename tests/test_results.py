@@ -0,0 +1,57 @@
+import unittest
+
+from dbgbench.framework.oraclesresult import OracleResult
+from dbgbench.framework.results import ResultBatch
+
+
+class ResultBatchTest(unittest.TestCase):
+    records = [
+        {"file": "0.cli", "line": "a", "return code": 0, "output": b"a\n", "input": b"a", "duration": 0.1},
+        {"file": "1.cli", "line": "b", "return code": 139, "output": b"", "input": None, "duration": 0.2,
+         "truncated": False},
+        {"line": "c", "return code": 1},
+    ]
+
+    def test_from_records(self):
+        batch = ResultBatch.from_records(self.records)
+        self.assertEqual(3, len(batch))
+        self.assertEqual(["a", "b", "c"], batch.column("line"))
+        self.assertEqual([0, 139, 1], batch.return_code)
+        # missing columns are None
+        self.assertEqual(["0.cli", "1.cli", None], batch.file)
+        self.assertEqual([None, False, None], batch.truncated)
+
+    def test_rows(self):
+        batch = ResultBatch.from_records(self.records)
+        self.assertEqual(139, batch[1]["return code"])
+        self.assertEqual("c", batch[-1]["line"])
+        self.assertIsNone(batch[0].get("unknown"))
+        self.assertEqual(b"a\n", batch[0].get("output"))
+        self.assertEqual(["a", "b", "c"], [row["line"] for row in batch])
+        self.assertEqual(set(ResultBatch.columns), set(batch[2].to_dict()))
+        with self.assertRaises(IndexError):
+            batch[3]
+        with self.assertRaises(IndexError):
+            batch[-4]
+
+    def test_concat_and_replace(self):
+        batch = ResultBatch.concat([ResultBatch.from_records(self.records[:1]),
+                                    ResultBatch.from_records(self.records[1:])])
+        self.assertEqual(["a", "b", "c"], batch.line)
+        batch.replace([0, 2], ResultBatch.from_records([{"line": "x", "return code": 124},
+                                                        {"line": "y", "return code": 2}]))
+        self.assertEqual(["x", "b", "y"], batch.line)
+        self.assertEqual([124, 139, 2], batch.return_code)
+        self.assertEqual([None, None, None], batch.file[:1] + batch.output[2:] + batch.duration[2:])
+
+    def test_to_pandas(self):
+        batch = ResultBatch.from_records(self.records)
+        batch.oracle = [OracleResult.PASSING, OracleResult.FAILING, OracleResult.PASSING]
+        frame = batch.to_pandas()
+        self.assertEqual(list(ResultBatch.columns), list(frame.columns))
+        self.assertEqual([0, 139, 1], list(frame["return code"]))
+        self.assertEqual(OracleResult.FAILING, frame["oracle"][1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import importlib.util
+import os
+import pkgutil
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from dbgbench.framework.docker import runner_support_files
+
+RESOURCES = Path(__file__).parent.parent / "src" / "dbgbench" / "resources"
+
+
+def import_runner(scripts_dir: Path):
+    """Import the runner like the containers do: next to the framework modules as package `alhazen`."""
+    package = scripts_dir / "alhazen"
+    package.mkdir(parents=True)
+    for name in runner_support_files:
+        (package / name).write_bytes(pkgutil.get_data("dbgbench.framework", name))
+    sys.path.insert(0, str(scripts_dir))
+    for name in [name for name in sys.modules if name == "alhazen" or name.startswith("alhazen.")]:
+        del sys.modules[name]
+    spec = importlib.util.spec_from_file_location("sample_runner_find", RESOURCES / "sample_runner_find.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@unittest.skipUnless(0 == os.geteuid() and shutil.which("ldd") and shutil.which("find"),
+                     "building a chroot needs root and ldd")
+class ChrootTemplateTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.runner = import_runner(self.tmp / "scripts")
+        subject = self.tmp / "subjects" / "find1"
+        (subject / "find" / "find").mkdir(parents=True)
+        (subject / "find.07b941b1").touch()
+        shutil.copy(shutil.which("find"), subject / "find" / "find" / "find")
+        self._environ = os.environ.get("ALHAZEN_SUBJECTS_DIR")
+        os.environ["ALHAZEN_SUBJECTS_DIR"] = str(self.tmp / "subjects")
+        sys.modules["alhazen.helpers"].init_scratch(str(self.tmp / "scratch"))
+
+    def tearDown(self):
+        sys.path.remove(str(self.tmp / "scripts"))
+        if self._environ is None:
+            del os.environ["ALHAZEN_SUBJECTS_DIR"]
+        else:
+            os.environ["ALHAZEN_SUBJECTS_DIR"] = self._environ
+        self._tmp.cleanup()
+
+    def test_clone(self):
+        template = self.runner.chroot_template("find.07b941b1")
+        self.assertTrue((template / "bin" / "find").is_file())
+        self.assertTrue((template / "dev" / "null").exists())
+        self.assertEqual(template, self.runner.chroot_template("find.07b941b1"))
+
+        clone = self.runner.clone_chroot(template, self.tmp / "clone")
+        self.assertEqual(self.runner.snapshot(template), self.runner.snapshot(clone))
+        self.assertEqual(os.stat(template / "bin" / "find").st_ino, os.stat(clone / "bin" / "find").st_ino)
+        # creating and removing files only affects the clone
+        (clone / "new").touch()
+        (clone / "bin" / "ls").unlink()
+        self.assertFalse((template / "new").exists())
+        self.assertTrue((template / "bin" / "ls").exists())
+        self.assertEqual(template, self.runner.chroot_template("find.07b941b1"))
+
+    def test_changed_template_is_rebuilt(self):
+        template = self.runner.chroot_template("find.07b941b1")
+        original = (template / "bin" / "touch").read_bytes()
+        clone = self.runner.clone_chroot(template, self.tmp / "clone")
+        # a sample that writes into a file of its chroot
+        with open(clone / "bin" / "touch", "ab") as file:
+            file.write(b"garbage")
+        shutil.rmtree(clone)
+        template = self.runner.chroot_template("find.07b941b1")
+        self.assertEqual(original, (template / "bin" / "touch").read_bytes())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from dbgbench.framework.helpers import cli_timeout, split_grep_line, with_timeout
+from dbgbench.framework.oracles import HangOracle
+from dbgbench.framework.timeouts import Timeouts
+from dbgbench.subjects import Find07b941b1, Grep3c3bdace
+
+
+class TimeoutRewriteTest(unittest.TestCase):
+    cli = "printf 'timeout 2s x' | LC_ALL=C timeout 0.5s grep -E 'a'"
+
+    def test_cli_timeout(self):
+        self.assertEqual(0.5, cli_timeout(self.cli))
+        self.assertIsNone(cli_timeout("printf 'a' | grep a"))
+
+    def test_with_timeout(self):
+        # only the program's timeout is rewritten, not text in the input
+        self.assertEqual("printf 'timeout 2s x' | LC_ALL=C timeout 0.05s grep -E 'a'", with_timeout(self.cli, 0.05))
+        self.assertEqual("printf 'a' | grep a", with_timeout("printf 'a' | grep a", 0.05))
+
+    def test_split_grep_line(self):
+        self.assertEqual((" LC_ALL=C ", ["-E", "'a'"]), split_grep_line(with_timeout(self.cli, 0.125)))
+        with self.assertRaises(AssertionError):
+            split_grep_line("printf 'a' | grep a")
+
+
+class CalibrationTest(unittest.TestCase):
+    def test_fast_subject(self):
+        timeouts = Timeouts.calibrate([0.01] * 99 + [0.02], full=0.5)
+        self.assertEqual(Timeouts(0.05, 0.5), timeouts)
+        self.assertTrue(timeouts.tiered())
+
+    def test_quantile(self):
+        durations = [0.02] * 99 + [10.0]
+        self.assertAlmostEqual(0.1, Timeouts.calibrate(durations, full=0.5, quantile=0.99).short)
+        self.assertAlmostEqual(50.0, Timeouts.calibrate(durations, full=0.5, quantile=1.0).short)
+
+    def test_slow_host_raises_full_timeout(self):
+        timeouts = Timeouts.calibrate([0.2] * 10, full=0.5)
+        self.assertEqual(Timeouts(1.0, 1.0), timeouts)
+        self.assertFalse(timeouts.tiered())
+
+    def test_benign_samples(self):
+        for bug in [Grep3c3bdace(), Find07b941b1(HangOracle())]:
+            samples = bug.benign_samples()
+            self.assertLess(5, len(set(samples)))
+            self.assertTrue(all(cli_timeout(cli) is not None for cli in samples))
+
+
+if __name__ == "__main__":
+    unittest.main()
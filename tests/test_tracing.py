@@ -0,0 +1,87 @@
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from dbgbench.framework import tracing
+
+
+class TracingTest(unittest.TestCase):
+    def test_off_by_default(self):
+        with tracing.span("phase", samples=3) as span:
+            span.set(failing=1)
+        self.assertIsNone(tracing.disable())
+
+    def test_records_spans(self):
+        seen = []
+        with tracing.tracing(callback=seen.append) as tracer:
+            with tracing.span("outer", samples=2):
+                with tracing.span("inner") as span:
+                    span.set(failing=1)
+        self.assertEqual(["inner", "outer"], [span.name for span in tracer.spans])
+        self.assertEqual(tracer.spans, seen)
+        self.assertEqual({"failing": 1}, tracer.spans[0].args)
+        self.assertLessEqual(tracer.spans[1].start, tracer.spans[0].start)
+        self.assertGreaterEqual(tracer.spans[1].end, tracer.spans[0].end)
+
+    def test_records_errors(self):
+        with tracing.tracing() as tracer:
+            with self.assertRaises(ValueError):
+                with tracing.span("failing"):
+                    raise ValueError()
+        self.assertEqual("ValueError", tracer.spans[0].args["error"])
+
+    def test_chrome_trace(self):
+        with tracing.tracing() as tracer:
+            with tracing.span("phase", samples=5):
+                pass
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "trace.json"
+            tracer.export_chrome_trace(path)
+            events = [event for event in json.loads(path.read_text())["traceEvents"] if "X" == event["ph"]]
+        self.assertEqual(1, len(events))
+        self.assertEqual("X", events[0]["ph"])
+        self.assertEqual({"samples": 5}, events[0]["args"])
+        self.assertGreaterEqual(events[0]["dur"], 0)
+
+    @staticmethod
+    def tracks(tracer: tracing.Tracer) -> dict[str, int]:
+        return {event["name"]: event["tid"] for event in tracer.to_chrome_trace()["traceEvents"] if "X" == event["ph"]}
+
+    def test_spans_held_across_yields_get_their_own_track(self):
+        def stream():
+            with tracing.span("batch"):
+                yield 1
+                yield 2
+
+        with tracing.tracing() as tracer:
+            rows = stream()
+            with tracing.span("caller"):
+                next(rows)
+                with tracing.span("oracle"):
+                    pass
+            list(rows)
+        tracks = self.tracks(tracer)
+        self.assertEqual(tracks["caller"], tracks["oracle"])
+        self.assertNotEqual(tracks["caller"], tracks["batch"])
+
+    def test_tasks_get_their_own_tracks(self):
+        async def work(name):
+            with tracing.span(name):
+                await asyncio.sleep(0.01)
+
+        async def main():
+            await asyncio.gather(work("first"), work("second"))
+
+        with tracing.tracing() as tracer:
+            asyncio.run(main())
+        tracks = self.tracks(tracer)
+        self.assertNotEqual(tracks["first"], tracks["second"])
+        names = {event["tid"]: event["args"]["name"] for event in tracer.to_chrome_trace()["traceEvents"]
+                 if "M" == event["ph"]}
+        self.assertIn("task", names[tracks["first"]])
+
+
+if __name__ == "__main__":
+    unittest.main()